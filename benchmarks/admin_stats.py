@@ -0,0 +1,165 @@
+"""
+Бенчмарк статистики админ-панели на годе синтетических записей.
+
+Замеры за месяц, квартал и год:
+  counters/4  - только счётчики и доход: четыре прохода по appointments;
+  counters/1  - то же условными агрегатами за один проход;
+  legacy      - шесть отдельных запросов по appointments (как было раньше);
+  single-pass - счётчики за один проход + те же два GROUP BY;
+  rollup      - get_admin_stats() по суточным сводкам daily_stats и
+                daily_service_stats (O(дней) строк за период);
+  rollup+prev - то же со сравнением с предыдущим периодом в том же проходе;
+  fallback    - get_admin_stats() по самим записям (сводок за период нет).
+
+Запуск: python -m benchmarks.admin_stats [--per-day 60] [--repeat 20]
+База создаётся во временном каталоге, рабочая БД не затрагивается.
+"""
+import argparse
+import os
+import random
+import tempfile
+import timeit
+from datetime import date, timedelta
+
+# config проверяет обязательные настройки при импорте
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+os.environ.setdefault("ADMIN_IDS", "0")
+# Временная база без архива: синтетический год старше границы архива
+os.environ["ARCHIVE_DB_PATH"] = ""
+
+from sqlalchemy import create_engine, func, case, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from database.models import Base, Appointment, Service  # noqa: E402
+from database.queries import get_admin_stats, _fill_admin_stats, _appointments_source  # noqa: E402
+from database.stats import rebuild_statements  # noqa: E402
+
+BARBERS = 8
+SERVICES = 12
+STATUSES = ('booked', 'confirmed', 'completed', 'completed', 'completed', 'canceled')
+
+
+def populate(session, year_start: date, per_day: int):
+    """Год записей: per_day записей в день со случайными барбером/услугой/статусом"""
+    rnd = random.Random(42)
+    session.execute(
+        Service.__table__.insert(),
+        [{'id': i, 'name': f"Услуга {i}", 'duration': 30, 'price': 500 + 100 * i, 'is_active': True}
+         for i in range(1, SERVICES + 1)]
+    )
+
+    rows = []
+    for offset in range(365):
+        day = str(year_start + timedelta(days=offset))
+        for _ in range(per_day):
+            start_min = rnd.randrange(600, 1200, 30)
+            service_id = rnd.randint(1, SERVICES)
+            rows.append({
+                'user_id': rnd.randint(1, 5000),
+                'barber_id': rnd.randint(1, BARBERS),
+                'service_id': service_id,
+                'date': day,
+                'time_slot': f"{start_min // 60:02d}:{start_min % 60:02d}-"
+                             f"{(start_min + 30) // 60:02d}:{(start_min + 30) % 60:02d}",
+                'start_min': start_min,
+                'end_min': start_min + 30,
+                'status': rnd.choice(STATUSES),
+                'price': 500 + 100 * service_id,
+            })
+    session.execute(Appointment.__table__.insert(), rows)
+    for statement in rebuild_statements():
+        session.execute(text(statement), {"start_date": "0000-00-00", "end_date": "9999-99-99"})
+    session.commit()
+    return len(rows)
+
+
+def legacy_counters(session, start_date: str, end_date: str):
+    """Прежние счётчики: четыре прохода по сырым записям"""
+    period = Appointment.date.between(start_date, end_date)
+    session.query(Appointment).filter(period).count()
+    session.query(Appointment).filter(period, Appointment.status == 'completed').count()
+    session.query(Appointment).filter(period, Appointment.status == 'canceled').count()
+    session.query(func.sum(Service.price)).join(Appointment.service).filter(
+        period, Appointment.status == 'completed'
+    ).scalar()
+
+
+def single_pass_counters(session, start_date: str, end_date: str):
+    """Те же счётчики условными агрегатами за один проход"""
+    completed = Appointment.status == 'completed'
+    session.query(
+        func.count(Appointment.id),
+        func.sum(case((completed, 1), else_=0)),
+        func.sum(case((Appointment.status == 'canceled', 1), else_=0)),
+        func.sum(case((completed, Appointment.price), else_=0)),
+    ).filter(Appointment.date.between(start_date, end_date)).one()
+
+
+def legacy_stats(session, start_date: str, end_date: str):
+    """Прежняя реализация: шесть запросов по сырым записям"""
+    period = Appointment.date.between(start_date, end_date)
+    legacy_counters(session, start_date, end_date)
+    session.query(Service.name, func.count(Appointment.id)).join(Appointment.service).filter(
+        period, Appointment.status == 'completed'
+    ).group_by(Service.name).order_by(func.count(Appointment.id).desc()).limit(5).all()
+    session.query(Appointment.date, func.count(Appointment.id)).filter(
+        period, Appointment.status.in_(['booked', 'confirmed'])
+    ).group_by(Appointment.date).order_by(func.count(Appointment.id).desc()).limit(5).all()
+
+
+def single_pass_stats(session, start_date: str, end_date: str):
+    """Счётчики одним проходом по сырым записям (топы - как в legacy)"""
+    period = Appointment.date.between(start_date, end_date)
+    completed = Appointment.status == 'completed'
+    single_pass_counters(session, start_date, end_date)
+    session.query(Service.name, func.count(Appointment.id)).join(Appointment.service).filter(
+        period, completed
+    ).group_by(Service.name).order_by(func.count(Appointment.id).desc()).limit(5).all()
+    session.query(Appointment.date, func.count(Appointment.id)).filter(
+        period, Appointment.status.in_(['booked', 'confirmed'])
+    ).group_by(Appointment.date).order_by(func.count(Appointment.id).desc()).limit(5).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--per-day", type=int, default=60, help="Записей в день")
+    parser.add_argument("--repeat", type=int, default=20, help="Повторов на замер")
+    args = parser.parse_args()
+
+    year_start = date(date.today().year - 1, 1, 1)
+    periods = {
+        "month": (year_start.replace(month=6), year_start.replace(month=6, day=30)),
+        "quarter": (year_start.replace(month=4), year_start.replace(month=6, day=30)),
+        "year": (year_start, year_start.replace(month=12, day=31)),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        print(f"appointments: {populate(session, year_start, args.per_day)}")
+        for table in ("daily_stats", "daily_service_stats"):
+            print(f"{table} rows: {session.execute(text(f'SELECT COUNT(*) FROM {table}')).scalar()}")
+
+        variants = {
+            "counters/4": legacy_counters,
+            "counters/1": single_pass_counters,
+            "legacy": legacy_stats,
+            "single-pass": single_pass_stats,
+            "rollup": get_admin_stats,
+            "rollup+prev": lambda s, a, b: get_admin_stats(s, a, b, compare=True),
+            "fallback": lambda s, a, b: _fill_admin_stats(s, {}, _appointments_source(a, b), a, b, a),
+        }
+        for name, (start, end) in periods.items():
+            for variant, func_ in variants.items():
+                seconds = min(timeit.repeat(
+                    lambda: func_(session, str(start), str(end)),
+                    number=1, repeat=args.repeat
+                ))
+                print(f"{name:8} {variant:12} {seconds * 1000:8.2f} ms")
+
+        session.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
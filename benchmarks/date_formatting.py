@@ -0,0 +1,88 @@
+"""
+Бенчмарк форматирования дат: strptime/strftime против utils/formatting.
+
+Замеры на датах записей за год (строки 'YYYY-MM-DD', как в БД):
+  parse    - strptime('%Y-%m-%d') против parse_iso_date (срезы + int);
+  format   - strftime('%d %B %Y') против сборки всех пяти строк по таблицам (без кэша);
+  notify   - разбор + форматирование для каждого уведомления: как было
+             и format_long_date() с кэшем строк по дате;
+  short    - strptime + strftime('%d.%m.%Y') против format_short_date().
+
+strftime('%B') здесь работает в локали C: на ru_RU.UTF-8 она не быстрее,
+а на хостах без этой локали прежний код вообще не запускался.
+
+Запуск: python -m benchmarks.date_formatting [--number 20000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import timeit
+from datetime import date, datetime, timedelta
+
+# config проверяет обязательные настройки при импорте пакета utils
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+os.environ.setdefault("ADMIN_IDS", "0")
+
+from utils.formatting import (  # noqa: E402
+    _date_strings,
+    format_long_date,
+    format_short_date,
+    parse_iso_date,
+)
+
+
+def sample_dates(count: int):
+    """count дат записей: случайные дни одного года"""
+    rnd = random.Random(42)
+    year_start = date(date.today().year, 1, 1)
+    return [str(year_start + timedelta(days=rnd.randrange(365))) for _ in range(count)]
+
+
+def legacy_notify(value: str) -> str:
+    return datetime.strptime(value, "%Y-%m-%d").strftime('%d %B %Y')
+
+
+def uncached_notify(value: str) -> str:
+    return _date_strings.__wrapped__(parse_iso_date(value)).long
+
+
+def legacy_short(value: str) -> str:
+    return datetime.strptime(value, "%Y-%m-%d").strftime("%d.%m.%Y")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000, help="Дат на замер")
+    parser.add_argument("--repeat", type=int, default=5, help="Повторов на замер")
+    args = parser.parse_args()
+
+    values = sample_dates(args.number)
+    parsed = [datetime.strptime(value, "%Y-%m-%d") for value in values]
+
+    variants = {
+        "parse": {
+            "strptime": lambda: [datetime.strptime(value, "%Y-%m-%d") for value in values],
+            "parse_iso_date": lambda: [parse_iso_date(value) for value in values],
+        },
+        "format": {
+            "strftime": lambda: [day.strftime('%d %B %Y') for day in parsed],
+            "tables (all 5)": lambda: [_date_strings.__wrapped__(day).long for day in parsed],
+        },
+        "notify": {
+            "strptime+strftime": lambda: [legacy_notify(value) for value in values],
+            "parse+tables": lambda: [uncached_notify(value) for value in values],
+            "format_long_date": lambda: [format_long_date(value) for value in values],
+        },
+        "short": {
+            "strptime+strftime": lambda: [legacy_short(value) for value in values],
+            "format_short_date": lambda: [format_short_date(value) for value in values],
+        },
+    }
+    for name, group in variants.items():
+        for variant, func_ in group.items():
+            seconds = min(timeit.repeat(func_, number=1, repeat=args.repeat))
+            print(f"{name:7} {variant:18} {seconds / len(values) * 1e9:8.0f} ns/date")
+
+
+if __name__ == "__main__":
+    main()
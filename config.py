@@ -23,10 +23,48 @@ class Config:
     DB_NAME: str = os.getenv("DB_NAME", "barbershop.db")
     DB_PATH: str = os.path.join(os.path.dirname(__file__), "database", DB_NAME)
     SQLALCHEMY_DATABASE_URI: str = f"sqlite:///{DB_PATH}"
+    SQLALCHEMY_ASYNC_DATABASE_URI: str = f"sqlite+aiosqlite:///{DB_PATH}"
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 3600))  # в секундах
+    SQLITE_PRAGMA_PROFILE: str = os.getenv("SQLITE_PRAGMA_PROFILE", "wal")  # default / wal / durable
+    ARCHIVE_DB_PATH: str = os.getenv(
+        "ARCHIVE_DB_PATH",
+        os.path.join(os.path.dirname(__file__), "database", "archive.db")
+    )  # пустая строка - архив отключён
+    ARCHIVE_AFTER_DAYS: int = int(os.getenv("ARCHIVE_AFTER_DAYS", 180))  # старше - в архив
+    ARCHIVE_BATCH_SIZE: int = int(os.getenv("ARCHIVE_BATCH_SIZE", 500))  # строк за транзакцию
+    ARCHIVE_INTERVAL: int = int(os.getenv("ARCHIVE_INTERVAL", 24 * 3600))  # в секундах
+    DB_WRITE_RETRIES: int = int(os.getenv("DB_WRITE_RETRIES", 5))
+    DB_RETRY_BACKOFF: float = float(os.getenv("DB_RETRY_BACKOFF", 0.05))  # начальная задержка, сек
 
     # Настройки записей
     DEFAULT_APPOINTMENT_DURATION: int = 30  # в минутах
     REMINDER_HOURS_BEFORE: int = 24  # за сколько часов напоминать
+    REMINDER_RETRY_DELAY: int = int(os.getenv("REMINDER_RETRY_DELAY", 300))  # повтор недоставленного напоминания, сек (удваивается)
+    SCHEDULE_HORIZON_DAYS: int = int(os.getenv("SCHEDULE_HORIZON_DAYS", 30))  # на сколько дней вперед строить расписание
+    SCHEDULE_MATERIALIZE_INTERVAL: int = int(os.getenv("SCHEDULE_MATERIALIZE_INTERVAL", 6 * 3600))  # в секундах
+    SLOT_CACHE_TTL: float = float(os.getenv("SLOT_CACHE_TTL", 60))  # срок жизни результата поиска слотов, сек
+    APPOINTMENTS_PAGE_SIZE: int = int(os.getenv("APPOINTMENTS_PAGE_SIZE", 10))  # записей на странице списка
+    SLOT_CACHE_SIZE: int = int(os.getenv("SLOT_CACHE_SIZE", 512))  # максимум закэшированных результатов
+    FSM_TTL: int = int(os.getenv("FSM_TTL", 24 * 3600))  # через сколько секунд простоя диалог сбрасывается
+    FSM_CACHE_SIZE: int = int(os.getenv("FSM_CACHE_SIZE", 5000))  # диалогов в памяти (LRU)
+    FSM_FLUSH_INTERVAL: float = float(os.getenv("FSM_FLUSH_INTERVAL", 1.0))  # как часто сбрасывать изменения в БД, сек
+    FSM_FLUSH_BATCH: int = int(os.getenv("FSM_FLUSH_BATCH", 200))  # столько изменений - сбросить не дожидаясь интервала
+    FSM_SWEEP_TICK: float = float(os.getenv("FSM_SWEEP_TICK", 60))  # шаг колеса таймеров простоя диалогов, сек
+    FSM_PURGE_INTERVAL: int = int(os.getenv("FSM_PURGE_INTERVAL", 3600))  # как часто удалять простаивающие диалоги из БД, сек
+    AGENDA_SEND_TIME: str = os.getenv("AGENDA_SEND_TIME", "09:00")  # когда барберы получают расписание на день
+
+    # Очередь исходящих сообщений (лимиты Telegram: ~30 сообщений/сек на бота, ~1/сек в чат)
+    SEND_RATE: float = float(os.getenv("SEND_RATE", 25))  # сообщений в секунду на бота
+    SEND_BURST: int = int(os.getenv("SEND_BURST", 25))  # сообщений подряд без ожидания
+    SEND_CHAT_RATE: float = float(os.getenv("SEND_CHAT_RATE", 1))  # сообщений в секунду в один чат
+    SEND_CHAT_BURST: int = int(os.getenv("SEND_CHAT_BURST", 3))
+    SEND_CONCURRENCY: int = int(os.getenv("SEND_CONCURRENCY", 10))  # одновременных запросов к API
+    SEND_MAX_RETRIES: int = int(os.getenv("SEND_MAX_RETRIES", 3))  # повторов при сетевых ошибках
+    SEND_RETRY_BACKOFF: float = float(os.getenv("SEND_RETRY_BACKOFF", 1.0))  # начальная задержка, сек
+    BROADCAST_CONCURRENCY: int = int(os.getenv("BROADCAST_CONCURRENCY", 20))  # одновременных отправок рассылки
 
     # Настройки логирования
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
@@ -1,13 +1,19 @@
-from .db import get_db, init_db
+from .db import get_db, init_db, init_engine, dispose_engine
 from .models import Barber, Service, Appointment  # если используешь ORM
 from .queries import (
+    get_db_session,
     get_available_slots,
     get_active_barbers,
+    SlotTakenError,
 )
 
 __all__ = [
     'get_db',
     'init_db',
+    'init_engine',
+    'dispose_engine',
+    'get_db_session',
     'get_available_slots',
-    'get_active_barbers'
+    'get_active_barbers',
+    'SlotTakenError'
 ]
\ No newline at end of file
@@ -0,0 +1,165 @@
+"""
+Горячие и холодные данные: архив старых записей и слотов расписания.
+
+Строки schedule и appointments старше ARCHIVE_AFTER_DAYS переносятся
+пачками в отдельную БД (config.ARCHIVE_DB_PATH), которая подключается
+к каждому соединению через ATTACH как схема archive. В рабочих таблицах
+остаются только недавние и будущие дни - именно их читают запись,
+поиск слотов и индекс свободного времени.
+
+Списки записей (история клиента, выборки за период) объединяются
+с архивом только если период начинается раньше границы архива.
+Суточные сводки daily_stats и daily_service_stats не архивируются, поэтому
+статистика архива не касается; пересборка сводок за старый период читает архив.
+"""
+from datetime import datetime, timedelta
+from sqlite3 import Connection
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import Column, MetaData, Table, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateTable
+from config import config
+from database.db import ARCHIVE_SCHEMA, retry_on_locked
+from database.models import Appointment, Schedule
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Архивные копии таблиц: те же колонки, без внешних ключей и вторичных индексов
+_archive_metadata = MetaData(schema=ARCHIVE_SCHEMA)
+
+
+def _archive_table(table: Table) -> Table:
+    return Table(
+        table.name,
+        _archive_metadata,
+        *(
+            Column(column.name, column.type, primary_key=column.primary_key)
+            for column in table.columns
+        )
+    )
+
+
+archive_appointments = _archive_table(Appointment.__table__)
+archive_schedule = _archive_table(Schedule.__table__)
+
+ARCHIVE_INDEXES: List[str] = [
+    f"""CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.ix_appointments_date_start
+        ON appointments (date, start_min)""",
+    f"""CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.ix_appointments_user_date_start
+        ON appointments (user_id, date, start_min)""",
+    f"""CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.ix_schedule_barber_date_start
+        ON schedule (barber_id, date, start_min)""",
+]
+
+
+def is_archive_enabled() -> bool:
+    """Архивная БД настроена"""
+    return bool(config.ARCHIVE_DB_PATH)
+
+
+def archive_cutoff(today: datetime = None) -> str:
+    """Граница архива: дни строго раньше неё переносятся в архив"""
+    today = today or datetime.now()
+    return (today - timedelta(days=config.ARCHIVE_AFTER_DAYS)).strftime("%Y-%m-%d")
+
+
+def needs_archive(start_date: Optional[str]) -> bool:
+    """Нужно ли читать архив для периода, начинающегося с start_date (None - вся история)"""
+    return is_archive_enabled() and (start_date is None or start_date < archive_cutoff())
+
+
+def ensure_archive_schema(db: Connection):
+    """Создать архивные таблицы и дописать колонки, добавленные в модели позже"""
+    if not is_archive_enabled():
+        return
+
+    cursor = db.cursor()
+    for table in (archive_appointments, archive_schedule):
+        cursor.execute(str(CreateTable(table, if_not_exists=True).compile(dialect=sqlite.dialect())))
+        existing = {
+            row[1] for row in cursor.execute(f"PRAGMA {ARCHIVE_SCHEMA}.table_info({table.name})")
+        }
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=sqlite.dialect())
+                cursor.execute(
+                    f"ALTER TABLE {ARCHIVE_SCHEMA}.{table.name} ADD COLUMN {column.name} {column_type}"
+                )
+    for statement in ARCHIVE_INDEXES:
+        cursor.execute(statement)
+    db.commit()
+
+
+def _move_batch(session: Session, table: Table, cutoff: str, batch_size: int) -> int:
+    """Перенести в архив до batch_size строк таблицы с датой раньше cutoff"""
+    columns = ", ".join(column.name for column in table.columns)
+    params = {"cutoff": cutoff, "batch": batch_size}
+
+    ids = [row[0] for row in session.execute(text(
+        f"SELECT id FROM main.{table.name} WHERE date < :cutoff ORDER BY id LIMIT :batch"
+    ), params)]
+    if not ids:
+        return 0
+
+    # INSERT OR IGNORE: если прошлый запуск упал между вставкой и удалением,
+    # повтор не продублирует строки
+    id_params = {f"id{i}": value for i, value in enumerate(ids)}
+    placeholders = ", ".join(f":{name}" for name in id_params)
+    session.execute(text(
+        f"INSERT OR IGNORE INTO {ARCHIVE_SCHEMA}.{table.name} ({columns}) "
+        f"SELECT {columns} FROM main.{table.name} WHERE id IN ({placeholders})"
+    ), id_params)
+    session.execute(text(
+        f"DELETE FROM main.{table.name} WHERE id IN ({placeholders})"
+    ), id_params)
+    session.commit()
+    return len(ids)
+
+
+@retry_on_locked
+def archive_old_rows(
+        session: Session,
+        cutoff: str = None,
+        batch_size: int = None,
+        max_batches: int = None
+) -> Dict[str, int]:
+    """
+    Перенести в архив записи и слоты с датой раньше cutoff.
+
+    Каждая пачка - отдельная короткая транзакция, чтобы не держать блокировку
+    записи надолго. max_batches ограничивает работу одного запуска на таблицу.
+    """
+    moved = {"appointments": 0, "schedule": 0}
+    if not is_archive_enabled():
+        return moved
+
+    cutoff = cutoff or archive_cutoff()
+    batch_size = batch_size or config.ARCHIVE_BATCH_SIZE
+
+    try:
+        for table in (Appointment.__table__, Schedule.__table__):
+            batches = 0
+            while max_batches is None or batches < max_batches:
+                count = _move_batch(session, table, cutoff, batch_size)
+                moved[table.name] += count
+                batches += 1
+                if count < batch_size:
+                    break
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error archiving rows: {e}")
+        raise
+
+    return moved
+
+
+def archive_sources(table: Table, start_date: Optional[str]) -> Iterable[Table]:
+    """Рабочая таблица и, если период задевает архив, её архивная копия"""
+    yield table
+    if needs_archive(start_date):
+        yield {
+            Appointment.__table__.name: archive_appointments,
+            Schedule.__table__.name: archive_schedule,
+        }[table.name]
@@ -0,0 +1,133 @@
+"""
+Асинхронный интерфейс к запросам БД для обработчиков бота.
+
+Логика запросов живёт в database.queries (синхронный API остаётся для скриптов),
+здесь она выполняется через AsyncSession.run_sync поверх драйвера aiosqlite,
+поэтому медленный запрос не блокирует цикл событий.
+"""
+from functools import wraps
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import db
+from database import queries
+from database import archive
+from database import fsm
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def get_async_session() -> AsyncSession:
+    """Возвращает новую асинхронную сессию из общего пула"""
+    if db.async_engine is None:
+        db.init_async_engine()
+    return db.AsyncSessionLocal()
+
+
+def _async(func):
+    """Превращает синхронный запрос func(session, ...) в корутину"""
+    # Запросы с retry_on_locked повторяем здесь через asyncio.sleep,
+    # чтобы time.sleep не останавливал цикл событий
+    retry = hasattr(func, '__wrapped__')
+
+    @wraps(func)
+    async def wrapper(session: AsyncSession, *args, **kwargs):
+        if not retry or session.info.get(db.RETRY_FLAG):
+            return await session.run_sync(func, *args, **kwargs)
+
+        session.info[db.RETRY_FLAG] = True
+        try:
+            for delay in db.backoff_delays():
+                try:
+                    return await session.run_sync(func, *args, **kwargs)
+                except OperationalError as e:
+                    if not db.is_database_locked(e):
+                        raise
+                    await session.rollback()
+                    logger.warning(f"Database is locked in {func.__name__}, retry in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+            return await session.run_sync(func, *args, **kwargs)
+        finally:
+            session.info.pop(db.RETRY_FLAG, None)
+    return wrapper
+
+
+# ====================== БАРБЕРЫ ======================
+
+get_barber_record = _async(queries.get_barber_record)
+get_barber_by_id = _async(queries.get_barber_by_id)
+get_active_barbers = _async(queries.get_active_barbers)
+add_barber = _async(queries.add_barber)
+update_barber = _async(queries.update_barber)
+
+# ====================== УСЛУГИ ======================
+
+get_service_record = _async(queries.get_service_record)
+get_service_by_id = _async(queries.get_service_by_id)
+get_all_services = _async(queries.get_all_services)
+add_service = _async(queries.add_service)
+update_service = _async(queries.update_service)
+delete_service = _async(queries.delete_service)
+
+# ====================== УСЛУГИ БАРБЕРОВ ======================
+
+load_service_barber_map = _async(queries.load_service_barber_map)
+set_barber_services = _async(queries.set_barber_services)
+set_barber_service_terms = _async(queries.set_barber_service_terms)
+
+# ====================== РАСПИСАНИЕ ======================
+
+get_available_slots = _async(queries.get_available_slots)
+get_month_availability = _async(queries.get_month_availability)
+add_schedule_slot = _async(queries.add_schedule_slot)
+add_schedule_slots = _async(queries.add_schedule_slots)
+lock_time_slot = _async(queries.lock_time_slot)
+unlock_time_slot = _async(queries.unlock_time_slot)
+load_availability = _async(queries.load_availability)
+get_schedule_templates = _async(queries.get_schedule_templates)
+set_schedule_template = _async(queries.set_schedule_template)
+materialize_schedule = _async(queries.materialize_schedule)
+
+# ====================== ЗАПИСИ ======================
+
+create_appointment = _async(queries.create_appointment)
+get_appointment_by_id = _async(queries.get_appointment_by_id)
+get_appointments_by_date = _async(queries.get_appointments_by_date)
+get_appointments_between = _async(queries.get_appointments_between)
+get_appointment_row = _async(queries.get_appointment_row)
+get_appointment_rows = _async(queries.get_appointment_rows)
+get_appointment_page = _async(queries.get_appointment_page)
+get_overlapping_appointments = _async(queries.get_overlapping_appointments)
+get_user_appointments = _async(queries.get_user_appointments)
+confirm_appointment = _async(queries.confirm_appointment)
+cancel_appointment = _async(queries.cancel_appointment)
+
+# ====================== РАСПИСАНИЕ БАРБЕРОВ НА ДЕНЬ ======================
+
+get_daily_agenda = _async(queries.get_daily_agenda)
+
+# ====================== НАПОМИНАНИЯ ======================
+
+get_pending_reminders = _async(queries.get_pending_reminders)
+mark_reminder_sent = _async(queries.mark_reminder_sent)
+
+# ====================== ЗАБЛОКИРОВАННЫЕ ЧАТЫ ======================
+
+get_blocked_chats = _async(queries.get_blocked_chats)
+block_chat = _async(queries.block_chat)
+unblock_chat = _async(queries.unblock_chat)
+
+# ====================== АДМИНИСТРИРОВАНИЕ ======================
+
+get_admin_stats = _async(queries.get_admin_stats)
+
+# ====================== АРХИВ ======================
+
+archive_old_rows = _async(archive.archive_old_rows)
+
+# ====================== СОСТОЯНИЯ FSM ======================
+
+load_fsm_record = _async(fsm.load_fsm_record)
+save_fsm_records = _async(fsm.save_fsm_records)
+purge_fsm_records = _async(fsm.purge_fsm_records)
@@ -0,0 +1,225 @@
+"""
+Индекс свободного времени в памяти.
+
+Для каждой пары (барбер, дата) хранится битовая маска по сетке слотов дня
+(WORK_START-WORK_END с шагом DEFAULT_APPOINTMENT_DURATION): бит i установлен,
+если слот i есть в расписании и свободен. Маски барбера лежат подряд в array
+по дням, поэтому один барбер-день занимает одно машинное слово (1-8 байт).
+Индекс загружается при старте и обновляется запросами записи/отмены/блокировки;
+из него строятся свободные слоты (get_available_slots) и календарь записи.
+"""
+from array import array
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import config
+
+# Тип элемента array в зависимости от количества слотов в дне
+_TYPECODES = (('B', 8), ('H', 16), ('I', 32), ('Q', 64))
+
+
+class AvailabilityIndex:
+    """Битовые маски свободных слотов по барберам и дням"""
+
+    def __init__(
+            self,
+            start_min: int = config.WORK_START * 60,
+            end_min: int = config.WORK_END * 60,
+            step: int = config.DEFAULT_APPOINTMENT_DURATION
+    ):
+        self.start_min = start_min
+        self.step = step
+        self.size = (end_min - start_min) // step
+
+        for typecode, bits in _TYPECODES:
+            if self.size <= bits and array(typecode).itemsize * 8 >= bits:
+                self.typecode = typecode
+                break
+        else:
+            raise ValueError(f"Too many slots per day for availability index: {self.size}")
+
+        # barber_id -> (порядковый номер первого дня, маски по дням)
+        self._days: Dict[int, Tuple[int, array]] = {}
+
+    # ---------- сетка ----------
+
+    def slot_mask(self, start_min: int, end_min: int) -> int:
+        """Маска ячеек сетки, покрытых интервалом [start_min, end_min)"""
+        first = max((start_min - self.start_min) // self.step, 0)
+        last = min(-(-(end_min - self.start_min) // self.step), self.size)
+        if first >= last:
+            return 0
+        return ((1 << (last - first)) - 1) << first
+
+    def cell_start(self, bit: int) -> int:
+        """Минута начала ячейки сетки"""
+        return self.start_min + bit * self.step
+
+    def cells_for(self, duration: int) -> int:
+        """Сколько подряд идущих ячеек нужно для услуги длительностью duration минут"""
+        return max(-(-duration // self.step), 1)
+
+    @staticmethod
+    def run_starts(mask: int, cells: int) -> int:
+        """
+        Маска ячеек, с которых начинается cells свободных ячеек подряд.
+        Сдвиги удваиваются, поэтому нужно O(log cells) операций над маской.
+        """
+        width = 1
+        while width < cells and mask:
+            shift = min(width, cells - width)
+            mask &= mask >> shift
+            width += shift
+        return mask
+
+    def mask_starts(self, mask: int) -> List[int]:
+        """Минуты начала ячеек, отмеченных в маске"""
+        starts = []
+        while mask:
+            low = mask & -mask
+            starts.append(self.cell_start(low.bit_length() - 1))
+            mask ^= low
+        return starts
+
+    # ---------- хранение ----------
+
+    def _get(self, barber_id: int, day: int) -> int:
+        base, masks = self._days.get(barber_id, (0, None))
+        if masks is None or not 0 <= day - base < len(masks):
+            return 0
+        return masks[day - base]
+
+    def _set(self, barber_id: int, day: int, mask: int):
+        base, masks = self._days.get(barber_id, (day, None))
+        if masks is None:
+            masks = array(self.typecode)
+        if day < base:
+            # Редкий случай: дата раньше загруженного диапазона
+            masks = array(self.typecode, [0] * (base - day)) + masks
+            base = day
+        if day - base >= len(masks):
+            masks.extend([0] * (day - base - len(masks) + 1))
+        masks[day - base] = mask
+        self._days[barber_id] = (base, masks)
+
+    # ---------- изменения ----------
+
+    def clear(self):
+        """Очистить индекс"""
+        self._days.clear()
+
+    def load(self, rows: Iterable[Tuple[int, str, int, int, bool]]):
+        """Загрузить слоты (barber_id, date, start_min, end_min, is_available)"""
+        self.clear()
+        self.update(rows)
+
+    def update(self, rows: Iterable[Tuple[int, str, int, int, bool]]):
+        """Применить состояние слотов (barber_id, date, start_min, end_min, is_available)"""
+        for barber_id, day_str, start_min, end_min, is_available in rows:
+            if is_available:
+                self.set_free(barber_id, day_str, start_min, end_min)
+            else:
+                self.set_busy(barber_id, day_str, start_min, end_min)
+
+    def reset_day(self, barber_id: int, day_str: str):
+        """Сбросить маску дня (перед повторной загрузкой его слотов)"""
+        day = date.fromisoformat(day_str).toordinal()
+        if self._get(barber_id, day):
+            self._set(barber_id, day, 0)
+
+    def set_free(self, barber_id: int, day_str: str, start_min: int, end_min: int):
+        """Отметить интервал свободным"""
+        day = date.fromisoformat(day_str).toordinal()
+        self._set(barber_id, day, self._get(barber_id, day) | self.slot_mask(start_min, end_min))
+
+    def set_busy(self, barber_id: int, day_str: str, start_min: int, end_min: int):
+        """Отметить интервал занятым"""
+        day = date.fromisoformat(day_str).toordinal()
+        mask = self._get(barber_id, day)
+        if mask:
+            self._set(barber_id, day, mask & ~self.slot_mask(start_min, end_min))
+
+    # ---------- запросы ----------
+
+    def barbers(self) -> List[int]:
+        """Барберы, для которых загружены маски"""
+        return list(self._days.keys())
+
+    def free_mask(self, barber_id: int, day_str: str) -> int:
+        """Маска свободных ячеек барбера на дату"""
+        return self._get(barber_id, date.fromisoformat(day_str).toordinal())
+
+    def free_start_times(self, barber_id: int, day_str: str) -> List[int]:
+        """Минуты начала свободных слотов барбера на дату"""
+        mask = self.free_mask(barber_id, day_str)
+        return [self.cell_start(bit) for bit in range(self.size) if mask >> bit & 1]
+
+    def find_start_times(
+            self,
+            day_str: str,
+            duration: int,
+            barber_ids: Optional[Iterable[int]] = None
+    ) -> Dict[int, List[int]]:
+        """Для каждого барбера - минуты, с которых свободно duration минут подряд"""
+        cells = self.cells_for(duration)
+        day = date.fromisoformat(day_str).toordinal()
+        candidates = self._days.keys() if barber_ids is None else barber_ids
+
+        result = {}
+        for barber_id in candidates:
+            starts = self.run_starts(self._get(barber_id, day), cells)
+            if starts:
+                result[barber_id] = self.mask_starts(starts)
+        return result
+
+    def find_available_days(
+            self,
+            start_day: date,
+            days: int,
+            duration: int,
+            barber_ids: Optional[Iterable[int]] = None
+    ) -> Dict[str, int]:
+        """Даты периода, на которые хоть кто-то свободен duration минут подряд (дата -> число вариантов)"""
+        cells = self.cells_for(duration)
+        candidates = list(self._days.keys() if barber_ids is None else barber_ids)
+        first = start_day.toordinal()
+
+        result = {}
+        for day in range(first, first + days):
+            options = 0
+            for barber_id in candidates:
+                starts = self.run_starts(self._get(barber_id, day), cells)
+                if starts:
+                    options += bin(starts).count("1")
+            if options:
+                result[date.fromordinal(day).isoformat()] = options
+        return result
+
+    def month_heatmap(
+            self,
+            year: int,
+            month: int,
+            barber_ids: Optional[Iterable[int]] = None
+    ) -> Dict[str, int]:
+        """Количество свободных слотов по дням месяца (все барберы или выбранные)"""
+        first = date(year, month, 1)
+        next_month = date(year + (month == 12), month % 12 + 1, 1)
+        start, end = first.toordinal(), next_month.toordinal()
+        candidates = list(self._days.keys() if barber_ids is None else barber_ids)
+
+        heatmap = {}
+        for day in range(start, end):
+            free = 0
+            for barber_id in candidates:
+                mask = self._get(barber_id, day)
+                if mask:
+                    free += bin(mask).count("1")
+            heatmap[date.fromordinal(day).isoformat()] = free
+        return heatmap
+
+    def memory_usage(self) -> int:
+        """Примерный объём данных масок в байтах"""
+        return sum(masks.itemsize * len(masks) for _, masks in self._days.values())
+
+
+# Общий индекс процесса
+availability_index = AvailabilityIndex()
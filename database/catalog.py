@@ -0,0 +1,126 @@
+"""
+Справочники барбершопа в памяти процесса.
+
+ServiceBarberMap - какие барберы выполняют какую услугу (и на каких условиях).
+Загружается при старте и перечитывается после каждого изменения связей,
+поэтому клавиатуры и поиск слотов сужают список кандидатов без запроса к БД.
+
+CatalogCache - версионированный снимок барберов и услуг. Читается сквозь кэш
+(первое обращение после сброса загружает снимок из БД), сбрасывается
+запросами, изменяющими барберов и услуги. Отдаёт неизменяемые записи
+вместо ORM-объектов, поэтому их можно держать между сессиями.
+"""
+from typing import Callable, Dict, FrozenSet, Iterable, NamedTuple, Optional, Tuple
+
+
+class ServiceBarberMap:
+    """Прямая и обратная карты барбер <-> услуга"""
+
+    def __init__(self):
+        self._barbers: Dict[int, FrozenSet[int]] = {}
+        self._services: Dict[int, FrozenSet[int]] = {}
+        self._terms: Dict[Tuple[int, int], Tuple[Optional[int], Optional[int]]] = {}
+
+    def load(self, rows: Iterable[Tuple[int, int, Optional[int], Optional[int]]]):
+        """Загрузить связи (barber_id, service_id, duration, price)"""
+        barbers: Dict[int, set] = {}
+        services: Dict[int, set] = {}
+        terms = {}
+
+        for barber_id, service_id, duration, price in rows:
+            barbers.setdefault(service_id, set()).add(barber_id)
+            services.setdefault(barber_id, set()).add(service_id)
+            if duration is not None or price is not None:
+                terms[(barber_id, service_id)] = (duration, price)
+
+        self._barbers = {key: frozenset(value) for key, value in barbers.items()}
+        self._services = {key: frozenset(value) for key, value in services.items()}
+        self._terms = terms
+
+    def barbers_for(self, service_id: int) -> FrozenSet[int]:
+        """Барберы, выполняющие услугу"""
+        return self._barbers.get(service_id, frozenset())
+
+    def services_for(self, barber_id: int) -> FrozenSet[int]:
+        """Услуги, которые выполняет барбер"""
+        return self._services.get(barber_id, frozenset())
+
+    def terms(self, barber_id: int, service_id: int) -> Tuple[Optional[int], Optional[int]]:
+        """Индивидуальные (длительность, цена) барбера для услуги, None - как у услуги"""
+        return self._terms.get((barber_id, service_id), (None, None))
+
+
+class BarberRecord(NamedTuple):
+    """Неизменяемая запись барбера"""
+    id: int
+    name: str
+    description: Optional[str]
+    photo_id: Optional[str]
+    is_active: bool
+    telegram_id: Optional[int]  # Чат барбера для расписания на день
+
+
+class ServiceRecord(NamedTuple):
+    """Неизменяемая запись услуги"""
+    id: int
+    name: str
+    duration: int
+    price: int
+    is_active: bool
+
+
+class CatalogSnapshot(NamedTuple):
+    """Снимок справочников на момент загрузки"""
+    version: int
+    barbers: Tuple[BarberRecord, ...]
+    services: Tuple[ServiceRecord, ...]
+    barbers_by_id: Dict[int, BarberRecord]
+    services_by_id: Dict[int, ServiceRecord]
+
+
+CatalogLoader = Callable[[], Tuple[Iterable[BarberRecord], Iterable[ServiceRecord]]]
+
+
+class CatalogCache:
+    """Кэш справочников: снимок живёт до ближайшей записи в барберов/услуги"""
+
+    def __init__(self):
+        self.version = 0
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, loader: CatalogLoader) -> CatalogSnapshot:
+        """Текущий снимок; при отсутствии загружается через loader"""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+
+        self.misses += 1
+        version = self.version
+        barbers, services = loader()
+        barbers = tuple(barbers)
+        services = tuple(services)
+        snapshot = CatalogSnapshot(
+            version=version,
+            barbers=barbers,
+            services=services,
+            barbers_by_id={barber.id: barber for barber in barbers},
+            services_by_id={service.id: service for service in services}
+        )
+
+        # Если во время загрузки справочники сбросили - снимок не сохраняем
+        if self.version == version:
+            self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self):
+        """Сбросить снимок (вызывается после изменения барберов или услуг)"""
+        self.version += 1
+        self._snapshot = None
+
+
+# Общие справочники процесса
+service_barber_map = ServiceBarberMap()
+catalog_cache = CatalogCache()
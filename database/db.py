@@ -1,11 +1,258 @@
-from sqlite3 import connect, Connection
+from sqlite3 import connect, Connection, OperationalError as SQLiteOperationalError
+from contextlib import contextmanager
+from functools import wraps
+from typing import Optional, Dict, Iterator, List
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
+from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from config import config
+from database.migrations import apply_migrations
+import logging
+import random
+import time
 
 DB_PATH = config.DB_PATH
 
+logger = logging.getLogger(__name__)
+
+# Профили PRAGMA, выбираются через config.SQLITE_PRAGMA_PROFILE
+PRAGMA_PROFILES: Dict[str, Dict[str, object]] = {
+    # Настройки SQLite по умолчанию (rollback journal)
+    "default": {},
+    # WAL: читатели не блокируют писателя, fsync только на checkpoint
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,        # мс
+        "mmap_size": 268435456,      # 256 МБ
+        "cache_size": -20000,        # ~20 МБ (отрицательное значение - в КиБ)
+        "temp_store": "MEMORY",
+    },
+    # WAL с полной синхронизацией (медленнее, но переживает отключение питания)
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 10000,
+        "cache_size": -20000,
+        "temp_store": "MEMORY",
+    },
+}
+
+# Имя схемы, под которой подключается архивная БД (см. database/archive.py)
+ARCHIVE_SCHEMA = "archive"
+
+# Единый на процесс движок и фабрики сессий (создаются один раз в init_engine)
+engine: Optional[Engine] = None
+SessionLocal = sessionmaker(autoflush=False)
+Session = scoped_session(SessionLocal)
+
+# Асинхронный движок (aiosqlite) для обработчиков бота
+async_engine: Optional[AsyncEngine] = None
+AsyncSessionLocal = sessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+def get_pragma_profile() -> Dict[str, object]:
+    """PRAGMA-профиль из конфига"""
+    profile = config.SQLITE_PRAGMA_PROFILE
+    if profile not in PRAGMA_PROFILES:
+        raise ValueError(f"Unknown SQLite pragma profile: {profile}")
+    return PRAGMA_PROFILES[profile]
+
+
+def apply_pragmas(dbapi_connection, connection_record=None):
+    """Применяет PRAGMA-профиль к новому соединению (обработчик события connect)"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in get_pragma_profile().items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+
+def attach_archive(dbapi_connection, connection_record=None):
+    """Подключает архивную БД как схему archive (обработчик события connect)"""
+    if not config.ARCHIVE_DB_PATH:
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (config.ARCHIVE_DB_PATH,))
+        journal_mode = get_pragma_profile().get("journal_mode")
+        if journal_mode:
+            cursor.execute(f"PRAGMA {ARCHIVE_SCHEMA}.journal_mode = {journal_mode}")
+    finally:
+        cursor.close()
+
+
+def is_database_locked(error: Exception) -> bool:
+    """Проверить, что ошибка вызвана блокировкой SQLite (database is locked/busy)"""
+    if not isinstance(error, (OperationalError, SQLiteOperationalError)):
+        return False
+    message = str(getattr(error, "orig", error)).lower()
+    return "locked" in message or "busy" in message
+
+
+def is_missing_table(error: Exception) -> bool:
+    """Проверить, что ошибка вызвана отсутствующей таблицей (база ещё не обновлена миграциями)"""
+    if not isinstance(error, (OperationalError, SQLiteOperationalError)):
+        return False
+    return "no such table" in str(getattr(error, "orig", error)).lower()
+
+
+def backoff_delays() -> Iterator[float]:
+    """Задержки между повторами записи: экспоненциальный рост со случайным разбросом"""
+    delay = config.DB_RETRY_BACKOFF
+    for _ in range(config.DB_WRITE_RETRIES):
+        yield delay + random.uniform(0, delay)
+        delay *= 2
+
+
+# Флаг в session.info: повторы уже обрабатывает внешний вызов
+RETRY_FLAG = "retry_on_locked"
+
+
+def retry_on_locked(func):
+    """Повторяет запись func(session, ...) при блокировке БД"""
+    @wraps(func)
+    def wrapper(session, *args, **kwargs):
+        if session.info.get(RETRY_FLAG):
+            return func(session, *args, **kwargs)
+
+        session.info[RETRY_FLAG] = True
+        try:
+            for delay in backoff_delays():
+                try:
+                    return func(session, *args, **kwargs)
+                except OperationalError as e:
+                    if not is_database_locked(e):
+                        raise
+                    session.rollback()
+                    logger.warning(f"Database is locked in {func.__name__}, retry in {delay:.2f}s")
+                    time.sleep(delay)
+            return func(session, *args, **kwargs)
+        finally:
+            session.info.pop(RETRY_FLAG, None)
+    return wrapper
+
+
+def init_engine() -> Engine:
+    """Создаёт пул соединений SQLAlchemy (повторный вызов вернёт уже созданный движок)."""
+    global engine
+    if engine is not None:
+        return engine
+
+    engine = create_engine(
+        config.SQLALCHEMY_DATABASE_URI,
+        poolclass=QueuePool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        connect_args={"check_same_thread": False},
+    )
+    event.listen(engine, "connect", apply_pragmas)
+    event.listen(engine, "connect", attach_archive)
+    SessionLocal.configure(bind=engine)
+    return engine
+
+
+def dispose_engine():
+    """Закрывает все соединения пула (вызывается при остановке бота)."""
+    global engine
+    Session.remove()
+    if engine is not None:
+        engine.dispose()
+        engine = None
+
+
+def init_async_engine() -> AsyncEngine:
+    """Создаёт асинхронный пул соединений (повторный вызов вернёт уже созданный движок)."""
+    global async_engine
+    if async_engine is not None:
+        return async_engine
+
+    async_engine = create_async_engine(
+        config.SQLALCHEMY_ASYNC_DATABASE_URI,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+        pool_recycle=config.DB_POOL_RECYCLE,
+    )
+    event.listen(async_engine.sync_engine, "connect", apply_pragmas)
+    event.listen(async_engine.sync_engine, "connect", attach_archive)
+    AsyncSessionLocal.configure(bind=async_engine)
+    return async_engine
+
+
+async def dispose_async_engine():
+    """Закрывает асинхронный пул соединений."""
+    global async_engine
+    if async_engine is not None:
+        await async_engine.dispose()
+        async_engine = None
+
+
+class QueryCounter:
+    """SQL-запросы, выполненные внутри count_queries()"""
+
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries(*engines) -> Iterator[QueryCounter]:
+    """Считает SQL-запросы внутри блока (по умолчанию на обоих движках)"""
+    targets = [
+        target.sync_engine if isinstance(target, AsyncEngine) else target
+        for target in (engines or (engine, async_engine))
+        if target is not None
+    ]
+    counter = QueryCounter()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+
+    for target in targets:
+        event.listen(target, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        for target in targets:
+            event.remove(target, "before_cursor_execute", before_cursor_execute)
+
+
+@contextmanager
+def assert_max_queries(limit: int, *engines) -> Iterator[QueryCounter]:
+    """
+    Падает с AssertionError, если блок выполнил больше limit SQL-запросов.
+
+    Для проверки, что списки не делают запрос на каждую строку (N+1):
+
+        with assert_max_queries(1):
+            rows = get_appointment_rows(session, start_date, end_date)
+    """
+    with count_queries(*engines) as counter:
+        yield counter
+    if counter.count > limit:
+        raise AssertionError(
+            f"Expected at most {limit} queries, got {counter.count}:\n" +
+            "\n".join(counter.statements)
+        )
+
+
 def get_db() -> Connection:
     """Возвращает подключение к SQLite."""
-    return connect(DB_PATH)
+    connection = connect(DB_PATH)
+    apply_pragmas(connection)
+    attach_archive(connection)
+    return connection
 
 
 def init_db():
@@ -29,7 +276,7 @@ def init_db():
         CREATE TABLE IF NOT EXISTS services (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL,
-            duration INTEGER NOT NULL,  # в минутах
+            duration INTEGER NOT NULL,  -- в минутах
             price INTEGER NOT NULL
         )
         """)
@@ -39,8 +286,8 @@ def init_db():
         CREATE TABLE IF NOT EXISTS schedule (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             barber_id INTEGER NOT NULL,
-            date TEXT NOT NULL,       # 'YYYY-MM-DD'
-            time_slot TEXT NOT NULL,   # 'HH:MM-HH:MM'
+            date TEXT NOT NULL,       -- 'YYYY-MM-DD'
+            time_slot TEXT NOT NULL,   -- 'HH:MM-HH:MM'
             is_available BOOLEAN DEFAULT TRUE,
             FOREIGN KEY (barber_id) REFERENCES barbers (id)
         )
@@ -55,10 +302,17 @@ def init_db():
             service_id INTEGER NOT NULL,
             date TEXT NOT NULL,
             time_slot TEXT NOT NULL,
-            status TEXT DEFAULT 'booked',  # 'booked' / 'canceled' / 'completed'
+            status TEXT DEFAULT 'booked',  -- 'booked' / 'canceled' / 'completed'
             FOREIGN KEY (barber_id) REFERENCES barbers (id),
             FOREIGN KEY (service_id) REFERENCES services (id)
         )
         """)
 
-        db.commit()
\ No newline at end of file
+        db.commit()
+
+        # Индексы и прочие изменения схемы для уже существующих баз
+        apply_migrations(db)
+
+        # Таблицы архивной БД повторяют модели и создаются/дополняются при каждом запуске
+        from database.archive import ensure_archive_schema
+        ensure_archive_schema(db)
@@ -0,0 +1,39 @@
+"""
+События изменения данных для подписчиков вне слоя БД.
+
+Запросы в database/queries.py вызывают emit() после успешного commit,
+подписчики (например, планировщик напоминаний) регистрируются через
+subscribe(). Обработчики вызываются синхронно в потоке запроса, поэтому
+должны быть быстрыми; ошибка подписчика логируется и не влияет на запрос.
+"""
+from collections import defaultdict
+from typing import Callable, DefaultDict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+APPOINTMENT_CREATED = "appointment_created"
+APPOINTMENT_CANCELED = "appointment_canceled"
+
+_listeners: DefaultDict[str, List[Callable]] = defaultdict(list)
+
+
+def subscribe(event: str, listener: Callable):
+    """Подписаться на событие"""
+    if listener not in _listeners[event]:
+        _listeners[event].append(listener)
+
+
+def unsubscribe(event: str, listener: Callable):
+    """Отписаться от события"""
+    if listener in _listeners[event]:
+        _listeners[event].remove(listener)
+
+
+def emit(event: str, *args):
+    """Оповестить подписчиков события"""
+    for listener in list(_listeners[event]):
+        try:
+            listener(*args)
+        except Exception as e:
+            logger.error(f"Error in {event} listener: {e}")
@@ -0,0 +1,78 @@
+"""
+Таблица fsm_states - состояния диалогов бота (хранилище states/storage.py).
+
+Ключ строки - ключ хранилища aiogram, сведённый в строку; данные диалога
+лежат в JSON. Запись идёт пачками (UPSERT / DELETE), простаивающие
+дольше FSM_TTL строки удаляются purge_fsm_records.
+"""
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from database.db import retry_on_locked
+from database.models import FsmRecord
+import logging
+
+logger = logging.getLogger(__name__)
+
+DELETE_CHUNK = 500  # ключей в одном DELETE ... IN (...)
+
+
+def load_fsm_record(session: Session, key: str) -> Optional[Tuple[Optional[str], Optional[str], float]]:
+    """(state, data JSON, updated_at) диалога или None"""
+    return session.query(
+        FsmRecord.state,
+        FsmRecord.data,
+        FsmRecord.updated_at
+    ).filter(FsmRecord.key == key).first()
+
+
+@retry_on_locked
+def save_fsm_records(
+        session: Session,
+        rows: List[dict],
+        deleted: Iterable[str] = ()
+):
+    """
+    Записать пачку изменений одной транзакцией.
+
+    rows - словари {key, state, data, updated_at} для UPSERT,
+    deleted - ключи завершённых диалогов (без состояния и данных).
+    """
+    try:
+        if rows:
+            stmt = sqlite_insert(FsmRecord.__table__)
+            session.execute(stmt.on_conflict_do_update(
+                index_elements=['key'],
+                set_={
+                    'state': stmt.excluded.state,
+                    'data': stmt.excluded.data,
+                    'updated_at': stmt.excluded.updated_at,
+                }
+            ), rows)
+
+        deleted = list(deleted)
+        for start in range(0, len(deleted), DELETE_CHUNK):
+            session.query(FsmRecord).filter(
+                FsmRecord.key.in_(deleted[start:start + DELETE_CHUNK])
+            ).delete(synchronize_session=False)
+
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error saving FSM states: {e}")
+        raise
+
+
+@retry_on_locked
+def purge_fsm_records(session: Session, before: float) -> int:
+    """Удалить диалоги, не менявшиеся с момента before (time.time())"""
+    try:
+        deleted = session.query(FsmRecord).filter(
+            FsmRecord.updated_at < before
+        ).delete(synchronize_session=False)
+        session.commit()
+        return deleted
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error purging FSM states: {e}")
+        raise
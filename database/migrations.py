@@ -0,0 +1,364 @@
+"""
+Миграции схемы SQLite.
+
+Номер применённой миграции хранится в PRAGMA user_version. Каждый шаг
+написан идемпотентно (IF NOT EXISTS / проверка колонок), поэтому повторный
+запуск на уже обновлённой базе ничего не ломает.
+"""
+from sqlite3 import Connection
+from typing import Callable, List, Tuple, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Шаг миграции: SQL-строка или функция, получающая курсор
+Step = Union[str, Callable]
+
+
+# ====================== ИНДЕКСЫ ======================
+
+INDEXES_V1: List[str] = [
+    # Поиск конкретного слота: create/cancel_appointment, lock/unlock_time_slot
+    """CREATE INDEX IF NOT EXISTS ix_schedule_barber_date_slot
+       ON schedule (barber_id, date, time_slot)""",
+    # Только свободные слоты: get_available_slots
+    """CREATE INDEX IF NOT EXISTS ix_schedule_free_by_date
+       ON schedule (date, barber_id, time_slot)
+       WHERE is_available = 1""",
+    # Занятость барбера на дату
+    """CREATE INDEX IF NOT EXISTS ix_appointments_barber_date_slot
+       ON appointments (barber_id, date, time_slot)""",
+    # Выборки по дате и статистика (покрывающий для подсчётов по статусам)
+    """CREATE INDEX IF NOT EXISTS ix_appointments_date_status
+       ON appointments (date, status, service_id)""",
+    # История пользователя
+    """CREATE INDEX IF NOT EXISTS ix_appointments_user_date
+       ON appointments (user_id, date, time_slot)""",
+    # Предстоящие записи пользователя: get_user_appointments
+    """CREATE INDEX IF NOT EXISTS ix_appointments_user_booked
+       ON appointments (user_id, date, time_slot)
+       WHERE status = 'booked'""",
+    # Загруженные дни: активные записи по дате
+    """CREATE INDEX IF NOT EXISTS ix_appointments_active_by_date
+       ON appointments (date)
+       WHERE status IN ('booked', 'confirmed')""",
+]
+
+
+# ====================== УНИКАЛЬНОСТЬ СЛОТОВ ======================
+
+UNIQUE_SCHEDULE_SLOTS_V2: List[str] = [
+    # Убираем дубли слотов, оставляя занятый (если есть) или самый ранний
+    """DELETE FROM schedule WHERE id NOT IN (
+           SELECT COALESCE(MIN(CASE WHEN is_available = 0 THEN id END), MIN(id))
+           FROM schedule
+           GROUP BY barber_id, date, time_slot
+       )""",
+    # Уникальный индекс нужен для вставки пачкой с ON CONFLICT DO NOTHING
+    """CREATE UNIQUE INDEX IF NOT EXISTS uq_schedule_barber_date_slot
+       ON schedule (barber_id, date, time_slot)""",
+    # Прежний неуникальный индекс по тем же колонкам больше не нужен
+    "DROP INDEX IF EXISTS ix_schedule_barber_date_slot",
+]
+
+
+# ====================== ШАБЛОНЫ РАСПИСАНИЯ ======================
+
+SCHEDULE_TEMPLATES_V3: List[str] = [
+    """CREATE TABLE IF NOT EXISTS schedule_templates (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           barber_id INTEGER NOT NULL,
+           weekday INTEGER NOT NULL,        -- 0 - понедельник
+           start_min INTEGER NOT NULL,      -- минута от начала дня
+           end_min INTEGER NOT NULL,
+           slot_duration INTEGER NOT NULL,  -- в минутах
+           is_active BOOLEAN DEFAULT TRUE,
+           FOREIGN KEY (barber_id) REFERENCES barbers (id),
+           CONSTRAINT uq_schedule_templates_barber_weekday UNIQUE (barber_id, weekday)
+       )""",
+]
+
+
+# ====================== ВРЕМЯ СЛОТОВ В МИНУТАХ ======================
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def add_column_if_missing(cursor, table: str, column: str, definition: str):
+    """ALTER TABLE ADD COLUMN, если колонки ещё нет"""
+    columns = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _add_slot_minutes_columns(cursor):
+    """Колонки start_min/end_min, а также колонки моделей, которых не было в init_db"""
+    for table in ("schedule", "appointments"):
+        add_column_if_missing(cursor, table, "start_min", "INTEGER")
+        add_column_if_missing(cursor, table, "end_min", "INTEGER")
+    add_column_if_missing(cursor, "services", "is_active", "BOOLEAN DEFAULT TRUE")
+    add_column_if_missing(cursor, "appointments", "created_at", "DATETIME")
+
+
+def _backfill_slot_minutes(cursor):
+    """Заполнить start_min/end_min из 'HH:MM-HH:MM' пачками с коммитом после каждой"""
+    for table in ("schedule", "appointments"):
+        while True:
+            cursor.execute(f"""
+                UPDATE {table}
+                SET start_min = CAST(substr(time_slot, 1, 2) AS INTEGER) * 60
+                              + CAST(substr(time_slot, 4, 2) AS INTEGER),
+                    end_min = CAST(substr(time_slot, 7, 2) AS INTEGER) * 60
+                            + CAST(substr(time_slot, 10, 2) AS INTEGER)
+                WHERE id IN (
+                    SELECT id FROM {table} WHERE start_min IS NULL LIMIT ?
+                )
+            """, (BACKFILL_BATCH_SIZE,))
+            cursor.connection.commit()
+            if cursor.rowcount < BACKFILL_BATCH_SIZE:
+                break
+
+
+SLOT_MINUTES_V4: List[Step] = [
+    _add_slot_minutes_columns,
+    _backfill_slot_minutes,
+    """CREATE INDEX IF NOT EXISTS ix_schedule_barber_date_start
+       ON schedule (barber_id, date, start_min)""",
+    """CREATE INDEX IF NOT EXISTS ix_appointments_barber_date_start
+       ON appointments (barber_id, date, start_min, end_min)""",
+    # Свободные слоты и предстоящие записи теперь сортируются/сравниваются по минутам
+    "DROP INDEX IF EXISTS ix_schedule_free_by_date",
+    """CREATE INDEX IF NOT EXISTS ix_schedule_free_by_date_start
+       ON schedule (date, barber_id, start_min)
+       WHERE is_available = 1""",
+    "DROP INDEX IF EXISTS ix_appointments_user_booked",
+    """CREATE INDEX IF NOT EXISTS ix_appointments_user_booked_start
+       ON appointments (user_id, date, start_min)
+       WHERE status = 'booked'""",
+]
+
+
+# ====================== УСЛУГИ БАРБЕРОВ ======================
+
+BARBER_SERVICES_V5: List[str] = [
+    """CREATE TABLE IF NOT EXISTS barber_services (
+           barber_id INTEGER NOT NULL,
+           service_id INTEGER NOT NULL,
+           duration INTEGER,  -- в минутах, NULL - как у услуги
+           price INTEGER,     -- в рублях, NULL - как у услуги
+           PRIMARY KEY (barber_id, service_id),
+           FOREIGN KEY (barber_id) REFERENCES barbers (id),
+           FOREIGN KEY (service_id) REFERENCES services (id)
+       )""",
+    """CREATE INDEX IF NOT EXISTS ix_barber_services_service_barber
+       ON barber_services (service_id, barber_id)""",
+    # До появления таблицы любой барбер выполнял любую услугу - сохраняем это
+    """INSERT OR IGNORE INTO barber_services (barber_id, service_id)
+       SELECT barbers.id, services.id FROM barbers, services""",
+]
+
+
+# ====================== СУТОЧНАЯ СВОДКА ======================
+
+def _add_appointment_price(cursor):
+    """Цена записи на момент бронирования"""
+    add_column_if_missing(cursor, "appointments", "price", "INTEGER")
+
+
+def _rebuild_daily_stats(cursor):
+    """Заполнить сводку по всей истории записей (в схеме версии 6, её огрубляет миграция 12)"""
+    cursor.execute("DELETE FROM daily_stats")
+    cursor.execute(
+        """INSERT INTO daily_stats (date, barber_id, service_id, status, total, revenue)
+           SELECT appointments.date, appointments.barber_id, appointments.service_id,
+                  COALESCE(appointments.status, 'booked'), COUNT(*),
+                  COALESCE(SUM(COALESCE(appointments.price, services.price)), 0)
+           FROM appointments
+           LEFT JOIN services ON services.id = appointments.service_id
+           GROUP BY appointments.date, appointments.barber_id,
+                    appointments.service_id, COALESCE(appointments.status, 'booked')"""
+    )
+
+
+DAILY_STATS_V6: List[Step] = [
+    _add_appointment_price,
+    """CREATE TABLE IF NOT EXISTS daily_stats (
+           date VARCHAR(10) NOT NULL,
+           barber_id INTEGER NOT NULL,
+           service_id INTEGER NOT NULL,
+           status VARCHAR(20) NOT NULL,
+           total INTEGER NOT NULL DEFAULT 0,
+           revenue INTEGER NOT NULL DEFAULT 0,
+           PRIMARY KEY (date, barber_id, service_id, status)
+       )""",
+    _rebuild_daily_stats,
+]
+
+
+def _coarsen_daily_stats(cursor):
+    """
+    Сводка по (дата, статус) вместо (дата, барбер, услуга, статус) и отдельная
+    сводка завершённых записей по услугам. Строится из прежней сводки, а не из
+    appointments - так сохраняется история, уже перенесённая в архив.
+    """
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS daily_service_stats (
+               date VARCHAR(10) NOT NULL,
+               service_id INTEGER NOT NULL,
+               completed INTEGER NOT NULL DEFAULT 0,
+               PRIMARY KEY (date, service_id)
+           )"""
+    )
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(daily_stats)")}
+    if "barber_id" not in columns:
+        return
+
+    cursor.execute("DROP TABLE IF EXISTS daily_stats_coarse")
+    cursor.execute(
+        """CREATE TABLE daily_stats_coarse (
+               date VARCHAR(10) NOT NULL,
+               status VARCHAR(20) NOT NULL,
+               total INTEGER NOT NULL DEFAULT 0,
+               revenue INTEGER NOT NULL DEFAULT 0,
+               PRIMARY KEY (date, status)
+           )"""
+    )
+    cursor.execute(
+        """INSERT INTO daily_stats_coarse (date, status, total, revenue)
+           SELECT date, status, SUM(total), SUM(revenue)
+           FROM daily_stats GROUP BY date, status"""
+    )
+    cursor.execute("DELETE FROM daily_service_stats")
+    cursor.execute(
+        """INSERT INTO daily_service_stats (date, service_id, completed)
+           SELECT date, service_id, SUM(total)
+           FROM daily_stats WHERE status = 'completed'
+           GROUP BY date, service_id"""
+    )
+    cursor.execute("DROP TABLE daily_stats")
+    cursor.execute("ALTER TABLE daily_stats_coarse RENAME TO daily_stats")
+
+
+COARSE_DAILY_STATS_V12: List[Step] = [
+    _coarsen_daily_stats,
+]
+
+
+# ====================== ПАГИНАЦИЯ ======================
+
+# Ключ страницы (date, start_min, id); id входит в индекс неявно (rowid)
+KEYSET_INDEXES_V7: List[str] = [
+    """CREATE INDEX IF NOT EXISTS ix_appointments_date_start
+       ON appointments (date, start_min)""",
+    """CREATE INDEX IF NOT EXISTS ix_appointments_user_date_start
+       ON appointments (user_id, date, start_min)""",
+]
+
+
+# ====================== НАПОМИНАНИЯ ======================
+
+def _add_reminder_sent_at(cursor):
+    """Отметка об отправленном напоминании (чтобы не слать повторно после перезапуска)"""
+    add_column_if_missing(cursor, "appointments", "reminder_sent_at", "DATETIME")
+
+
+REMINDERS_V8: List[Step] = [
+    _add_reminder_sent_at,
+    """CREATE INDEX IF NOT EXISTS ix_appointments_reminder_pending
+       ON appointments (date, start_min)
+       WHERE status IN ('booked', 'confirmed') AND reminder_sent_at IS NULL""",
+]
+
+
+# ====================== РАССЫЛКИ ======================
+
+BLOCKED_CHATS_V9: List[str] = [
+    """CREATE TABLE IF NOT EXISTS blocked_chats (
+           chat_id INTEGER NOT NULL PRIMARY KEY,
+           blocked_at DATETIME,
+           reason VARCHAR(255)
+       )""",
+]
+
+
+def _add_barber_telegram_id(cursor):
+    """Чат барбера в Telegram - туда уходит утреннее расписание"""
+    add_column_if_missing(cursor, "barbers", "telegram_id", "INTEGER")
+
+
+BARBER_TELEGRAM_ID_V10: List[Step] = [
+    _add_barber_telegram_id,
+]
+
+
+# ====================== СОСТОЯНИЯ FSM ======================
+
+FSM_STATES_V11: List[str] = [
+    """CREATE TABLE IF NOT EXISTS fsm_states (
+           key VARCHAR(150) NOT NULL PRIMARY KEY,
+           state VARCHAR(100),
+           data TEXT,
+           updated_at FLOAT NOT NULL
+       )""",
+    # Удаление простаивающих диалогов: purge_fsm_records
+    """CREATE INDEX IF NOT EXISTS ix_fsm_states_updated_at
+       ON fsm_states (updated_at)""",
+]
+
+
+# Список миграций: (версия, описание, шаги)
+MIGRATIONS: List[Tuple[int, str, List[Step]]] = [
+    (1, "indexes for schedule and appointments", INDEXES_V1 + ["ANALYZE"]),
+    (2, "unique schedule slots", UNIQUE_SCHEDULE_SLOTS_V2),
+    (3, "weekly schedule templates", SCHEDULE_TEMPLATES_V3),
+    (4, "integer slot minutes", SLOT_MINUTES_V4),
+    (5, "barber services", BARBER_SERVICES_V5),
+    (6, "daily stats rollup", DAILY_STATS_V6),
+    (7, "keyset pagination indexes", KEYSET_INDEXES_V7),
+    (8, "appointment reminders", REMINDERS_V8),
+    (9, "blocked chats", BLOCKED_CHATS_V9),
+    (10, "barber telegram id", BARBER_TELEGRAM_ID_V10),
+    (11, "fsm states", FSM_STATES_V11),
+    (12, "coarse daily stats", COARSE_DAILY_STATS_V12),
+]
+
+
+def get_schema_version(db: Connection) -> int:
+    """Текущая версия схемы"""
+    return db.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(db: Connection) -> int:
+    """Применить все недостающие миграции, вернуть итоговую версию схемы"""
+    version = get_schema_version(db)
+
+    for number, description, steps in MIGRATIONS:
+        if number <= version:
+            continue
+
+        logger.info(f"Applying migration {number}: {description}")
+        cursor = db.cursor()
+        try:
+            for step in steps:
+                if callable(step):
+                    step(cursor)
+                else:
+                    cursor.execute(step)
+            # PRAGMA не принимает параметры, номер - целое из списка выше
+            cursor.execute(f"PRAGMA user_version = {int(number)}")
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error applying migration {number}: {e}")
+            raise
+
+        version = number
+
+    return version
+
+
+if __name__ == "__main__":
+    from database.db import get_db
+
+    with get_db() as connection:
+        print(f"Schema version: {apply_migrations(connection)}")
@@ -1,6 +1,6 @@
 from sqlalchemy import (
-    Column, Integer, String, Boolean,
-    ForeignKey, DateTime, Text
+    Column, Integer, String, Boolean, Float,
+    ForeignKey, DateTime, Text, Index, UniqueConstraint, text
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
@@ -17,10 +17,16 @@ class Barber(Base):
     name = Column(String(50), nullable=False)
     description = Column(Text)
     photo_id = Column(String(150))  # ID фото в Telegram
+    telegram_id = Column(Integer)   # Чат барбера для расписания на день
     is_active = Column(Boolean, default=True)
 
     # Связь с расписанием и записями
     schedule = relationship("Schedule", back_populates="barber")
+    templates = relationship("ScheduleTemplate", back_populates="barber")
+
+    # Услуги, которые выполняет барбер
+    service_links = relationship("BarberService", back_populates="barber")
+    services = relationship("Service", secondary="barber_services", viewonly=True)
     appointments = relationship("Appointment", back_populates="barber")
 
     def __repr__(self):
@@ -37,13 +43,36 @@ class Service(Base):
     price = Column(Integer, nullable=False)     # В рублях
     is_active = Column(Boolean, default=True)  # Флаг активности услуги
 
-    # Связь с записями
+    # Связь с записями и барберами
     appointments = relationship("Appointment", back_populates="service")
+    barber_links = relationship("BarberService", back_populates="service")
 
     def __repr__(self):
         return f"<Service(id={self.id}, name='{self.name}')>"
 
 
+class BarberService(Base):
+    """Модель связи барбер-услуга (с индивидуальными длительностью и ценой)."""
+    __tablename__ = 'barber_services'
+
+    barber_id = Column(Integer, ForeignKey('barbers.id'), primary_key=True)
+    service_id = Column(Integer, ForeignKey('services.id'), primary_key=True)
+    duration = Column(Integer)  # В минутах, None - как у услуги
+    price = Column(Integer)     # В рублях, None - как у услуги
+
+    # Поиск барберов по услуге (обратный порядок ключа)
+    __table_args__ = (
+        Index('ix_barber_services_service_barber', 'service_id', 'barber_id'),
+    )
+
+    # Связи
+    barber = relationship("Barber", back_populates="service_links")
+    service = relationship("Service", back_populates="barber_links")
+
+    def __repr__(self):
+        return f"<BarberService(barber_id={self.barber_id}, service_id={self.service_id})>"
+
+
 class Schedule(Base):
     """Модель расписания (свободные слоты)."""
     __tablename__ = 'schedule'
@@ -51,9 +80,19 @@ class Schedule(Base):
     id = Column(Integer, primary_key=True)
     barber_id = Column(Integer, ForeignKey('barbers.id'), nullable=False)
     date = Column(String(10), nullable=False)       # Формат: 'YYYY-MM-DD'
-    time_slot = Column(String(11), nullable=False)  # Формат: 'HH:MM-HH:MM'
+    time_slot = Column(String(11), nullable=False)  # Формат: 'HH:MM-HH:MM' (для отображения)
+    start_min = Column(Integer)                     # Минута от начала дня
+    end_min = Column(Integer)
     is_available = Column(Boolean, default=True)
 
+    # Индексы синхронизированы с database/migrations.py
+    __table_args__ = (
+        Index('uq_schedule_barber_date_slot', 'barber_id', 'date', 'time_slot', unique=True),
+        Index('ix_schedule_free_by_date_start', 'date', 'barber_id', 'start_min',
+              sqlite_where=text('is_available = 1')),
+        Index('ix_schedule_barber_date_start', 'barber_id', 'date', 'start_min'),
+    )
+
     # Связь с барбером
     barber = relationship("Barber", back_populates="schedule")
 
@@ -61,6 +100,29 @@ class Schedule(Base):
         return f"<Schedule(id={self.id}, barber_id={self.barber_id}, slot='{self.time_slot}')>"
 
 
+class ScheduleTemplate(Base):
+    """Модель недельного шаблона расписания (один день недели барбера)."""
+    __tablename__ = 'schedule_templates'
+
+    id = Column(Integer, primary_key=True)
+    barber_id = Column(Integer, ForeignKey('barbers.id'), nullable=False)
+    weekday = Column(Integer, nullable=False)        # 0 - понедельник
+    start_min = Column(Integer, nullable=False)      # Минута от начала дня
+    end_min = Column(Integer, nullable=False)
+    slot_duration = Column(Integer, nullable=False)  # В минутах
+    is_active = Column(Boolean, default=True)
+
+    __table_args__ = (
+        UniqueConstraint('barber_id', 'weekday', name='uq_schedule_templates_barber_weekday'),
+    )
+
+    # Связь с барбером
+    barber = relationship("Barber", back_populates="templates")
+
+    def __repr__(self):
+        return f"<ScheduleTemplate(barber_id={self.barber_id}, weekday={self.weekday})>"
+
+
 class Appointment(Base):
     """Модель записи клиента."""
     __tablename__ = 'appointments'
@@ -70,13 +132,87 @@ class Appointment(Base):
     barber_id = Column(Integer, ForeignKey('barbers.id'), nullable=False)
     service_id = Column(Integer, ForeignKey('services.id'), nullable=False)
     date = Column(String(10), nullable=False)
-    time_slot = Column(String(11), nullable=False)
+    time_slot = Column(String(11), nullable=False)  # Для отображения, см. start_min/end_min
+    start_min = Column(Integer)                     # Минута от начала дня
+    end_min = Column(Integer)
     status = Column(String(20), default='booked')  # booked/canceled/completed
+    price = Column(Integer)                         # Цена на момент записи, в рублях
     created_at = Column(DateTime, default=datetime.now)
+    reminder_sent_at = Column(DateTime)             # Когда отправлено напоминание
+
+    # Индексы синхронизированы с database/migrations.py
+    __table_args__ = (
+        Index('ix_appointments_barber_date_slot', 'barber_id', 'date', 'time_slot'),
+        Index('ix_appointments_date_status', 'date', 'status', 'service_id'),
+        Index('ix_appointments_user_date', 'user_id', 'date', 'time_slot'),
+        Index('ix_appointments_user_booked_start', 'user_id', 'date', 'start_min',
+              sqlite_where=text("status = 'booked'")),
+        Index('ix_appointments_barber_date_start', 'barber_id', 'date', 'start_min', 'end_min'),
+        Index('ix_appointments_date_start', 'date', 'start_min'),
+        Index('ix_appointments_user_date_start', 'user_id', 'date', 'start_min'),
+        Index('ix_appointments_reminder_pending', 'date', 'start_min',
+              sqlite_where=text("status IN ('booked', 'confirmed') AND reminder_sent_at IS NULL")),
+        Index('ix_appointments_active_by_date', 'date',
+              sqlite_where=text("status IN ('booked', 'confirmed')")),
+    )
 
     # Связи
     barber = relationship("Barber", back_populates="appointments")
     service = relationship("Service", back_populates="appointments")
 
     def __repr__(self):
-        return f"<Appointment(id={self.id}, user_id={self.user_id}, date='{self.date}')>"
\ No newline at end of file
+        return f"<Appointment(id={self.id}, user_id={self.user_id}, date='{self.date}')>"
+
+
+class DailyStat(Base):
+    """Суточная сводка записей по статусам (поддерживается инкрементально, см. database/stats.py)."""
+    __tablename__ = 'daily_stats'
+
+    date = Column(String(10), primary_key=True)
+    status = Column(String(20), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)    # Количество записей
+    revenue = Column(Integer, nullable=False, default=0)  # Сумма цен записей, в рублях
+
+    def __repr__(self):
+        return f"<DailyStat(date='{self.date}', status='{self.status}', total={self.total})>"
+
+
+class DailyServiceStat(Base):
+    """Завершённые записи по услугам за день (для топа услуг, см. database/stats.py)."""
+    __tablename__ = 'daily_service_stats'
+
+    date = Column(String(10), primary_key=True)
+    service_id = Column(Integer, primary_key=True)
+    completed = Column(Integer, nullable=False, default=0)  # Количество завершённых записей
+
+    def __repr__(self):
+        return f"<DailyServiceStat(date='{self.date}', service_id={self.service_id}, completed={self.completed})>"
+
+
+class BlockedChat(Base):
+    """Чат, в который бот не может писать (пользователь заблокировал бота)"""
+    __tablename__ = 'blocked_chats'
+
+    chat_id = Column(Integer, primary_key=True)  # ID чата в Telegram
+    blocked_at = Column(DateTime, default=datetime.now)
+    reason = Column(String(255))                 # Текст ошибки Telegram
+
+    def __repr__(self):
+        return f"<BlockedChat(chat_id={self.chat_id})>"
+
+
+class FsmRecord(Base):
+    """Состояние диалога пользователя (FSM), см. states/storage.py"""
+    __tablename__ = 'fsm_states'
+
+    key = Column(String(150), primary_key=True)   # bot:chat:user:thread:business:destiny
+    state = Column(String(100))                   # "BarberAddStates:waiting_for_name"
+    data = Column(Text)                           # Данные диалога, JSON
+    updated_at = Column(Float, nullable=False)    # time.time() последнего изменения
+
+    __table_args__ = (
+        Index('ix_fsm_states_updated_at', 'updated_at'),
+    )
+
+    def __repr__(self):
+        return f"<FsmRecord(key='{self.key}', state='{self.state}')>"
@@ -1,8 +1,27 @@
-from sqlalchemy import func, and_, or_, extract, not_
-from sqlalchemy.orm import Session
+from sqlalchemy import func, and_, or_, extract, not_, case, tuple_, select, union_all, literal, Table
+from sqlalchemy.sql import Select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, joinedload
 from datetime import datetime, timedelta, date
-from typing import List, Optional, Dict, Tuple
-from database.models import Barber, Service, Schedule, Appointment
+from typing import Any, List, Optional, Dict, Set, Tuple, Iterable, NamedTuple, Callable
+from database.models import (
+    Barber, Service, BarberService, Schedule, ScheduleTemplate, Appointment, DailyStat,
+    DailyServiceStat, BlockedChat
+)
+from database import db
+from database.db import retry_on_locked, is_database_locked, is_missing_table
+from database.availability import availability_index
+from database.slot_cache import slot_cache, SlotRecord
+from database.stats import record_status_change
+from database.archive import archive_sources
+from database import events
+from database.catalog import (
+    service_barber_map,
+    catalog_cache,
+    CatalogSnapshot,
+    BarberRecord,
+    ServiceRecord
+)
 from config import config
 import logging
 
@@ -14,16 +33,47 @@ WORK_END = config.WORK_END
 logger = logging.getLogger(__name__)
 
 
+class SlotTakenError(ValueError):
+    """Слот уже занят или отсутствует в расписании - запись не создана"""
+
+
 # ====================== БАЗОВЫЕ ФУНКЦИИ ======================
 
-def get_db_session():
-    """Создает и возвращает новую сессию БД"""
-    from sqlalchemy import create_engine
-    from sqlalchemy.orm import sessionmaker
+def get_db_session() -> Session:
+    """Возвращает новую сессию БД из общего пула соединений"""
+    if db.engine is None:
+        db.init_engine()
+    return db.SessionLocal()
+
+
+# ====================== СПРАВОЧНИКИ ======================
+
+def get_catalog(session: Session) -> CatalogSnapshot:
+    """Снимок барберов и услуг (из кэша, при сбросе - из БД)"""
+    def load():
+        barbers = session.query(
+            Barber.id, Barber.name, Barber.description, Barber.photo_id, Barber.is_active,
+            Barber.telegram_id
+        ).order_by(Barber.id).all()
+        services = session.query(
+            Service.id, Service.name, Service.duration, Service.price, Service.is_active
+        ).order_by(Service.id).all()
+        return (
+            [BarberRecord(*row) for row in barbers],
+            [ServiceRecord(*row) for row in services]
+        )
+
+    return catalog_cache.get(load)
 
-    engine = create_engine(f'sqlite:///{DB_PATH}')
-    Session = sessionmaker(bind=engine)
-    return Session()
+
+def get_barber_record(session: Session, barber_id: int) -> Optional[BarberRecord]:
+    """Барбер из справочника (без запроса к БД при актуальном снимке)"""
+    return get_catalog(session).barbers_by_id.get(barber_id)
+
+
+def get_service_record(session: Session, service_id: int) -> Optional[ServiceRecord]:
+    """Услуга из справочника (без запроса к БД при актуальном снимке)"""
+    return get_catalog(session).services_by_id.get(service_id)
 
 
 # ====================== ЗАПРОСЫ ДЛЯ БАРБЕРОВ ======================
@@ -33,26 +83,44 @@ def get_barber_by_id(session: Session, barber_id: int) -> Optional[Barber]:
     return session.query(Barber).filter(Barber.id == barber_id).first()
 
 
-def get_active_barbers(session: Session) -> List[Barber]:
-    """Получить всех активных барберов"""
-    return session.query(Barber).filter(Barber.is_active == True).all()
+def get_active_barbers(session: Session, service_id: int = None) -> List[BarberRecord]:
+    """Получить всех активных барберов (или только выполняющих услугу)"""
+    barbers = [barber for barber in get_catalog(session).barbers if barber.is_active]
+    if service_id:
+        allowed = service_barber_map.barbers_for(service_id)
+        barbers = [barber for barber in barbers if barber.id in allowed]
+    return barbers
 
 
+@retry_on_locked
 def add_barber(
         session: Session,
         name: str,
         description: str = None,
-        photo_id: str = None
+        photo_id: str = None,
+        all_services: bool = True,
+        telegram_id: int = None
 ) -> Barber:
-    """Добавить нового барбера"""
+    """Добавить нового барбера (по умолчанию со всеми активными услугами)"""
     try:
         new_barber = Barber(
             name=name,
             description=description,
-            photo_id=photo_id
+            photo_id=photo_id,
+            telegram_id=telegram_id
         )
         session.add(new_barber)
+        session.flush()
+
+        if all_services:
+            session.add_all(
+                BarberService(barber_id=new_barber.id, service_id=service_id)
+                for service_id, in session.query(Service.id).filter(Service.is_active == True)
+            )
+
         session.commit()
+        catalog_cache.invalidate()
+        load_service_barber_map(session)
         return new_barber
     except Exception as e:
         session.rollback()
@@ -60,13 +128,15 @@ def add_barber(
         raise
 
 
+@retry_on_locked
 def update_barber(
         session: Session,
         barber_id: int,
         name: str = None,
         description: str = None,
         photo_id: str = None,
-        is_active: bool = None
+        is_active: bool = None,
+        telegram_id: int = None
 ) -> bool:
     """Обновить данные барбера"""
     barber = get_barber_by_id(session, barber_id)
@@ -77,12 +147,16 @@ def update_barber(
         if name: barber.name = name
         if description: barber.description = description
         if photo_id: barber.photo_id = photo_id
+        if telegram_id: barber.telegram_id = telegram_id
         if is_active is not None: barber.is_active = is_active
 
         session.commit()
+        catalog_cache.invalidate()
         return True
     except Exception as e:
         session.rollback()
+        if is_database_locked(e):
+            raise
         logger.error(f"Error updating barber: {e}")
         return False
 
@@ -94,21 +168,30 @@ def get_service_by_id(session: Session, service_id: int) -> Optional[Service]:
     return session.query(Service).filter(Service.id == service_id).first()
 
 
-def get_all_services(session: Session, active_only: bool = True) -> List[Service]:
-    """Получить все услуги (по умолчанию только активные)"""
-    query = session.query(Service)
+def get_all_services(
+        session: Session,
+        active_only: bool = True,
+        barber_id: int = None
+) -> List[ServiceRecord]:
+    """Получить все услуги (по умолчанию только активные; или только услуги барбера)"""
+    services = list(get_catalog(session).services)
     if active_only:
-        query = query.filter(Service.is_active == True)
-    return query.all()
+        services = [service for service in services if service.is_active]
+    if barber_id:
+        allowed = service_barber_map.services_for(barber_id)
+        services = [service for service in services if service.id in allowed]
+    return services
 
 
+@retry_on_locked
 def add_service(
         session: Session,
         name: str,
         duration: int,
-        price: int
+        price: int,
+        all_barbers: bool = True
 ) -> Service:
-    """Добавить новую услугу"""
+    """Добавить новую услугу (по умолчанию её выполняют все активные барберы)"""
     try:
         new_service = Service(
             name=name,
@@ -116,7 +199,17 @@ def add_service(
             price=price
         )
         session.add(new_service)
+        session.flush()
+
+        if all_barbers:
+            session.add_all(
+                BarberService(barber_id=barber_id, service_id=new_service.id)
+                for barber_id, in session.query(Barber.id).filter(Barber.is_active == True)
+            )
+
         session.commit()
+        catalog_cache.invalidate()
+        load_service_barber_map(session)
         return new_service
     except Exception as e:
         session.rollback()
@@ -124,6 +217,7 @@ def add_service(
         raise
 
 
+@retry_on_locked
 def update_service(
         session: Session,
         service_id: int,
@@ -144,13 +238,18 @@ def update_service(
         if is_active is not None: service.is_active = is_active
 
         session.commit()
+        catalog_cache.invalidate()
+        slot_cache.clear()
         return True
     except Exception as e:
         session.rollback()
+        if is_database_locked(e):
+            raise
         logger.error(f"Error updating service: {e}")
         return False
 
 
+@retry_on_locked
 def delete_service(session: Session, service_id: int) -> bool:
     """Безопасное удаление услуги"""
     service = get_service_by_id(session, service_id)
@@ -167,33 +266,133 @@ def delete_service(session: Session, service_id: int) -> bool:
             # Если есть записи - деактивируем
             service.is_active = False
         else:
-            # Если нет записей - удаляем полностью
+            # Если нет записей - удаляем полностью вместе со связями с барберами
+            session.query(BarberService).filter(
+                BarberService.service_id == service_id
+            ).delete(synchronize_session=False)
             session.delete(service)
 
         session.commit()
+        catalog_cache.invalidate()
+        load_service_barber_map(session)
         return True
     except Exception as e:
         session.rollback()
+        if is_database_locked(e):
+            raise
         logger.error(f"Error deleting service: {e}")
         return False
 
 
-# ====================== ЗАПРОСЫ ДЛЯ РАСПИСАНИЯ ======================
+# ====================== УСЛУГИ БАРБЕРОВ ======================
+
+def load_service_barber_map(session: Session) -> int:
+    """Перечитать карту барбер <-> услуга в память"""
+    rows = session.query(
+        BarberService.barber_id,
+        BarberService.service_id,
+        BarberService.duration,
+        BarberService.price
+    ).all()
+    service_barber_map.load(rows)
+    # Состав и длительности услуг барберов влияют на результаты поиска слотов
+    slot_cache.clear()
+    return len(rows)
 
-def generate_time_slots(duration: int = 30) -> List[str]:
-    """Сгенерировать временные слоты на день"""
-    slots = []
-    current_time = datetime.strptime(f"{WORK_START}:00", "%H:%M")
-    end_time = datetime.strptime(f"{WORK_END}:00", "%H:%M")
 
-    while current_time + timedelta(minutes=duration) <= end_time:
-        slot_end = current_time + timedelta(minutes=duration)
-        slots.append(
-            f"{current_time.strftime('%H:%M')}-{slot_end.strftime('%H:%M')}"
+def get_service_terms(barber_id: int, service: ServiceRecord) -> Tuple[int, int]:
+    """Длительность и цена услуги у конкретного барбера (из карты в памяти)"""
+    duration, price = service_barber_map.terms(barber_id, service.id)
+    return duration or service.duration, price or service.price
+
+
+@retry_on_locked
+def set_barber_services(
+        session: Session,
+        barber_id: int,
+        service_ids: Iterable[int]
+) -> bool:
+    """Задать набор услуг барбера (индивидуальные условия сохранившихся услуг не меняются)"""
+    service_ids = set(service_ids)
+    try:
+        current = {
+            link.service_id: link
+            for link in session.query(BarberService).filter(BarberService.barber_id == barber_id)
+        }
+
+        for service_id, link in current.items():
+            if service_id not in service_ids:
+                session.delete(link)
+
+        session.add_all(
+            BarberService(barber_id=barber_id, service_id=service_id)
+            for service_id in service_ids - current.keys()
         )
-        current_time = slot_end
 
-    return slots
+        session.commit()
+        load_service_barber_map(session)
+        return True
+    except Exception as e:
+        session.rollback()
+        if is_database_locked(e):
+            raise
+        logger.error(f"Error setting barber services: {e}")
+        return False
+
+
+@retry_on_locked
+def set_barber_service_terms(
+        session: Session,
+        barber_id: int,
+        service_id: int,
+        duration: int = None,
+        price: int = None
+) -> bool:
+    """Задать индивидуальные длительность/цену барбера для услуги (None - как у услуги)"""
+    link = session.get(BarberService, (barber_id, service_id))
+    if not link:
+        return False
+
+    try:
+        link.duration = duration
+        link.price = price
+        session.commit()
+        load_service_barber_map(session)
+        return True
+    except Exception as e:
+        session.rollback()
+        if is_database_locked(e):
+            raise
+        logger.error(f"Error setting barber service terms: {e}")
+        return False
+
+
+# ====================== ЗАПРОСЫ ДЛЯ РАСПИСАНИЯ ======================
+
+def parse_time_slot(time_slot: str) -> Tuple[int, int]:
+    """'HH:MM-HH:MM' -> (минута начала, минута окончания) от начала дня"""
+    return (
+        int(time_slot[0:2]) * 60 + int(time_slot[3:5]),
+        int(time_slot[6:8]) * 60 + int(time_slot[9:11])
+    )
+
+
+def format_time_slot(start_min: int, end_min: int) -> str:
+    """(минута начала, минута окончания) -> 'HH:MM-HH:MM'"""
+    return f"{start_min // 60:02d}:{start_min % 60:02d}-{end_min // 60:02d}:{end_min % 60:02d}"
+
+
+def build_time_slots(start_min: int, end_min: int, duration: int) -> List[str]:
+    """Слоты 'HH:MM-HH:MM' длиной duration минут в интервале [start_min, end_min]"""
+    return [
+        format_time_slot(start, start + duration)
+        for start in range(start_min, end_min - duration + 1, duration)
+    ]
+
+
+def generate_time_slots(duration: int = 30) -> List[str]:
+    """Сгенерировать временные слоты на день"""
+    return build_time_slots(WORK_START * 60, WORK_END * 60, duration)
 
 
 def get_available_slots(
@@ -201,27 +400,109 @@ def get_available_slots(
         date: str,
         barber_id: int = None,
         service_id: int = None
-) -> List[Schedule]:
-    """Получить доступные слоты расписания"""
-    query = session.query(Schedule).filter(
-        Schedule.date == date,
-        Schedule.is_available == True
+) -> List[SlotRecord]:
+    """
+    Получить свободные слоты на дату (результат кэшируется, см. slot_cache).
+
+    Слоты строятся из индекса свободного времени без запроса к schedule:
+    сетка индекса совпадает с сеткой слотов (шаг DEFAULT_APPOINTMENT_DURATION),
+    индекс покрывает даты начиная с его загрузки при старте.
+    """
+    key = (date, barber_id or None, service_id or None)
+    cached = slot_cache.get(key)
+    if cached is not None:
+        return list(cached)
+    # Версия до чтения: запись, сбросившая кэш в это время, не даст сохранить старое
+    token = slot_cache.token(key)
+
+    candidates = _candidate_barbers(barber_id, service_id)
+    service = get_service_record(session, service_id) if service_id else None
+    if service:
+        # Только минуты, с которых у барбера свободно время на всю услугу
+        starts = {}
+        for duration, group in _barbers_by_duration(candidates, service).items():
+            for candidate, minutes in availability_index.find_start_times(date, duration, group).items():
+                starts[candidate] = (duration, minutes)
+    else:
+        step = availability_index.step
+        starts = {
+            candidate: (step, availability_index.free_start_times(candidate, date))
+            for candidate in candidates
+        }
+
+    slots = sorted(
+        (
+            SlotRecord(candidate, date, format_time_slot(start, start + duration), start, start + duration)
+            for candidate, (duration, minutes) in starts.items()
+            for start in minutes
+        ),
+        key=lambda slot: (slot.start_min, slot.barber_id)
     )
+    return list(slot_cache.put(key, slots, token))
 
-    if barber_id:
-        query = query.filter(Schedule.barber_id == barber_id)
 
+def _candidate_barbers(barber_id: int = None, service_id: int = None) -> List[int]:
+    """Барберы для поиска свободного времени: выбранный или все, выполняющие услугу"""
+    barber_ids = [barber_id] if barber_id else availability_index.barbers()
     if service_id:
-        service = get_service_by_id(session, service_id)
-        if service:
-            # Фильтр по продолжительности услуги
-            query = query.join(Barber).filter(
-                Barber.services.any(id=service_id)
-            )
+        allowed = service_barber_map.barbers_for(service_id)
+        barber_ids = [candidate for candidate in barber_ids if candidate in allowed]
+    return barber_ids
+
+
+def _barbers_by_duration(barber_ids: Iterable[int], service: ServiceRecord) -> Dict[int, List[int]]:
+    """Барберы, сгруппированные по длительности услуги у них (индивидуальные условия)"""
+    groups: Dict[int, List[int]] = {}
+    for candidate in barber_ids:
+        groups.setdefault(get_service_terms(candidate, service)[0], []).append(candidate)
+    return groups
+
+
+def get_month_availability(
+        session: Session,
+        year: int,
+        month: int,
+        barber_id: int = None,
+        service_id: int = None
+) -> Dict[str, int]:
+    """
+    Дни месяца со свободным временем и число вариантов (для календаря записи, из индекса).
+
+    С услугой считаются минуты, с которых свободна вся её длительность
+    (find_available_days), без услуги - просто свободные слоты (month_heatmap).
+    """
+    candidates = _candidate_barbers(barber_id, service_id)
+    service = get_service_record(session, service_id) if service_id else None
+    if not service:
+        heatmap = availability_index.month_heatmap(year, month, candidates)
+        return {day: free for day, free in heatmap.items() if free}
 
-    return query.order_by(Schedule.time_slot).all()
+    first = date(year, month, 1)
+    days = (date(year + (month == 12), month % 12 + 1, 1) - first).days
+    available: Dict[str, int] = {}
+    for duration, group in _barbers_by_duration(candidates, service).items():
+        for day, options in availability_index.find_available_days(first, days, duration, group).items():
+            available[day] = available.get(day, 0) + options
+    return dict(sorted(available.items()))
 
 
+def _slots_in_range(
+        session: Session,
+        barber_id: int,
+        date: str,
+        start_min: int,
+        end_min: int
+):
+    """Запрос слотов барбера, начинающихся в интервале [start_min, end_min)"""
+    return session.query(Schedule).filter(
+        Schedule.barber_id == barber_id,
+        Schedule.date == date,
+        Schedule.start_min >= start_min,
+        Schedule.start_min < end_min
+    )
+
+
+@retry_on_locked
 def add_schedule_slot(
         session: Session,
         barber_id: int,
@@ -230,13 +511,18 @@ def add_schedule_slot(
 ) -> Schedule:
     """Добавить слот в расписание"""
     try:
+        start_min, end_min = parse_time_slot(time_slot)
         new_slot = Schedule(
             barber_id=barber_id,
             date=date,
-            time_slot=time_slot
+            time_slot=time_slot,
+            start_min=start_min,
+            end_min=end_min
         )
         session.add(new_slot)
         session.commit()
+        availability_index.set_free(barber_id, date, start_min, end_min)
+        slot_cache.evict(date, barber_id)
         return new_slot
     except Exception as e:
         session.rollback()
@@ -244,6 +530,47 @@ def add_schedule_slot(
         raise
 
 
+@retry_on_locked
+def add_schedule_slots(
+        session: Session,
+        slots: Iterable[Tuple[int, str, str]]
+) -> int:
+    """
+    Добавить слоты в расписание пачкой (одна транзакция, executemany).
+
+    :param slots: кортежи (barber_id, date, time_slot)
+    :return: количество реально добавленных слотов (существующие пропускаются)
+    """
+    rows = []
+    for barber_id, date, time_slot in dict.fromkeys(slots):
+        start_min, end_min = parse_time_slot(time_slot)
+        rows.append({
+            'barber_id': barber_id,
+            'date': date,
+            'time_slot': time_slot,
+            'start_min': start_min,
+            'end_min': end_min,
+            'is_available': True
+        })
+    if not rows:
+        return 0
+
+    try:
+        stmt = sqlite_insert(Schedule.__table__).on_conflict_do_nothing(
+            index_elements=['barber_id', 'date', 'time_slot']
+        )
+        result = session.execute(stmt, rows)
+        session.commit()
+        # Конфликтующие строки не вставлялись - перечитываем затронутые дни целиком
+        refresh_availability(session, {(row['barber_id'], row['date']) for row in rows})
+        return result.rowcount
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error adding schedule slots: {e}")
+        raise
+
+
+@retry_on_locked
 def lock_time_slot(
         session: Session,
         barber_id: int,
@@ -260,10 +587,13 @@ def lock_time_slot(
     if slot:
         slot.is_available = False
         session.commit()
+        availability_index.set_busy(barber_id, date, *parse_time_slot(time_slot))
+        slot_cache.evict(date, barber_id)
         return True
     return False
 
 
+@retry_on_locked
 def unlock_time_slot(
         session: Session,
         barber_id: int,
@@ -280,12 +610,172 @@ def unlock_time_slot(
     if slot:
         slot.is_available = True
         session.commit()
+        availability_index.set_free(barber_id, date, *parse_time_slot(time_slot))
+        slot_cache.evict(date, barber_id)
         return True
     return False
 
 
+# ====================== ИНДЕКС СВОБОДНОГО ВРЕМЕНИ ======================
+
+def _availability_rows(query):
+    """Строки (barber_id, date, start_min, end_min, is_available) для индекса"""
+    return query.with_entities(
+        Schedule.barber_id,
+        Schedule.date,
+        Schedule.start_min,
+        Schedule.end_min,
+        Schedule.is_available
+    )
+
+
+def load_availability(session: Session, from_date: str = None) -> int:
+    """Загрузить индекс свободного времени начиная с даты (по умолчанию с сегодня)"""
+    from_date = from_date or datetime.now().strftime("%Y-%m-%d")
+    rows = _availability_rows(session.query(Schedule)).filter(
+        Schedule.date >= from_date
+    ).all()
+    availability_index.load(rows)
+    slot_cache.clear()
+    return len(rows)
+
+
+def refresh_availability(session: Session, days: Iterable[Tuple[int, str]]):
+    """Перечитать из БД маски указанных дней (barber_id, date)"""
+    days = set(days)
+    if not days:
+        return
+
+    rows = _availability_rows(session.query(Schedule)).filter(
+        Schedule.barber_id.in_({barber_id for barber_id, _ in days}),
+        Schedule.date.in_({day for _, day in days})
+    ).all()
+
+    for barber_id, day in days:
+        availability_index.reset_day(barber_id, day)
+        slot_cache.evict(day, barber_id)
+    availability_index.update(row for row in rows if (row[0], row[1]) in days)
+
+
+# ====================== ШАБЛОНЫ РАСПИСАНИЯ ======================
+
+def get_schedule_templates(
+        session: Session,
+        barber_id: int = None
+) -> List[ScheduleTemplate]:
+    """Получить активные недельные шаблоны (по умолчанию всех активных барберов)"""
+    query = session.query(ScheduleTemplate).join(Barber).filter(
+        ScheduleTemplate.is_active == True,
+        Barber.is_active == True
+    )
+
+    if barber_id:
+        query = query.filter(ScheduleTemplate.barber_id == barber_id)
+
+    return query.order_by(ScheduleTemplate.barber_id, ScheduleTemplate.weekday).all()
+
+
+@retry_on_locked
+def set_schedule_template(
+        session: Session,
+        barber_id: int,
+        weekdays: List[int] = None,
+        start_hour: int = WORK_START,
+        end_hour: int = WORK_END,
+        slot_duration: int = config.DEFAULT_APPOINTMENT_DURATION
+) -> List[ScheduleTemplate]:
+    """
+    Задать недельный шаблон барбера (по умолчанию рабочие дни и часы из конфига).
+    Дни недели, не вошедшие в weekdays, выключаются.
+    """
+    weekdays = config.WORK_DAYS if weekdays is None else weekdays
+
+    try:
+        existing = {
+            template.weekday: template
+            for template in session.query(ScheduleTemplate).filter(
+                ScheduleTemplate.barber_id == barber_id
+            )
+        }
+
+        for weekday in range(7):
+            template = existing.get(weekday)
+            if weekday not in weekdays:
+                if template:
+                    template.is_active = False
+                continue
+
+            if not template:
+                template = ScheduleTemplate(barber_id=barber_id, weekday=weekday)
+                session.add(template)
+                existing[weekday] = template
+
+            template.start_min = start_hour * 60
+            template.end_min = end_hour * 60
+            template.slot_duration = slot_duration
+            template.is_active = True
+
+        session.commit()
+        return [existing[weekday] for weekday in sorted(weekdays)]
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error setting schedule template: {e}")
+        raise
+
+
+@retry_on_locked
+def materialize_schedule(
+        session: Session,
+        start_date: date,
+        end_date: date,
+        barber_id: int = None
+) -> int:
+    """
+    Развернуть недельные шаблоны в слоты расписания на период (включительно).
+
+    Идемпотентно: дни, на которые у барбера уже есть слоты, пропускаются,
+    новые слоты вставляются одной пачкой через add_schedule_slots.
+    Возвращает количество добавленных слотов.
+    """
+    templates: Dict[int, List[ScheduleTemplate]] = {}
+    for template in get_schedule_templates(session, barber_id):
+        templates.setdefault(template.barber_id, []).append(template)
+
+    if not templates:
+        return 0
+
+    # Дни, которые уже есть в расписании - одним запросом
+    generated = set(
+        session.query(Schedule.barber_id, Schedule.date).filter(
+            Schedule.date.between(start_date.isoformat(), end_date.isoformat()),
+            Schedule.barber_id.in_(templates.keys())
+        ).distinct()
+    )
+
+    slots = []
+    day = start_date
+    while day <= end_date:
+        day_str = day.isoformat()
+        weekday = day.weekday()
+        for template_barber_id, barber_templates in templates.items():
+            if (template_barber_id, day_str) in generated:
+                continue
+            for template in barber_templates:
+                if template.weekday == weekday:
+                    slots.extend(
+                        (template_barber_id, day_str, time_slot)
+                        for time_slot in build_time_slots(
+                            template.start_min, template.end_min, template.slot_duration
+                        )
+                    )
+        day += timedelta(days=1)
+
+    return add_schedule_slots(session, slots)
+
+
 # ====================== ЗАПРОСЫ ДЛЯ ЗАПИСЕЙ ======================
 
+@retry_on_locked
 def create_appointment(
         session: Session,
         user_id: int,
@@ -294,42 +784,83 @@ def create_appointment(
         date: str,
         time_slot: str
 ) -> Appointment:
-    """Создать новую запись клиента"""
+    """
+    Создать новую запись клиента.
+
+    time_slot - выбранный слот начала; запись занимает столько слотов подряд,
+    сколько требует длительность услуги. Все они захватываются одним условным
+    UPDATE ... WHERE is_available, поэтому два одновременных нажатия не могут
+    занять время дважды. Если хотя бы одного слота нет или он занят - SlotTakenError.
+    """
     try:
-        # Блокируем слот
-        slot = session.query(Schedule).filter(
-            Schedule.barber_id == barber_id,
-            Schedule.date == date,
-            Schedule.time_slot == time_slot
-        ).first()
-
-        if not slot or not slot.is_available:
-            raise ValueError("Time slot not available")
-
-        slot.is_available = False
+        start_min, end_min = parse_time_slot(time_slot)
+        price = None
+        service = get_service_record(session, service_id)
+        if service:
+            link = session.get(BarberService, (barber_id, service_id))
+            if not link:
+                raise ValueError("Barber does not provide this service")
+            end_min = start_min + (link.duration or service.duration)
+            price = link.price or service.price
+
+        claimed = _slots_in_range(session, barber_id, date, start_min, end_min).filter(
+            Schedule.is_available == True
+        ).update({Schedule.is_available: False}, synchronize_session=False)
+
+        # Слоты должны покрывать всё время услуги без пропусков
+        total, covered = _slots_in_range(session, barber_id, date, start_min, end_min).with_entities(
+            func.count(Schedule.id),
+            func.coalesce(func.sum(Schedule.end_min - Schedule.start_min), 0)
+        ).one()
+
+        if not claimed or claimed != total or covered < end_min - start_min:
+            raise SlotTakenError(
+                f"Time {date} {format_time_slot(start_min, end_min)} is not available"
+            )
 
-        # Создаем запись
+        # Создаем запись в той же транзакции
         new_appointment = Appointment(
             user_id=user_id,
             barber_id=barber_id,
             service_id=service_id,
             date=date,
-            time_slot=time_slot,
-            status='booked'
+            time_slot=format_time_slot(start_min, end_min),
+            start_min=start_min,
+            end_min=end_min,
+            status='booked',
+            price=price
         )
 
         session.add(new_appointment)
+        record_status_change(session, new_appointment, None, 'booked')
         session.commit()
+        availability_index.set_busy(barber_id, date, start_min, end_min)
+        slot_cache.evict(date, barber_id)
+        events.emit(events.APPOINTMENT_CREATED, new_appointment)
         return new_appointment
+    except SlotTakenError as e:
+        session.rollback()
+        logger.info(f"Slot already taken: {e}")
+        raise
     except Exception as e:
         session.rollback()
         logger.error(f"Error creating appointment: {e}")
         raise
 
 
+def _with_details(query):
+    """Подгрузить барбера и услугу вместе с записями (для асинхронных сессий)"""
+    return query.options(
+        joinedload(Appointment.barber),
+        joinedload(Appointment.service)
+    )
+
+
 def get_appointment_by_id(session: Session, appointment_id: int) -> Optional[Appointment]:
     """Получить запись по ID"""
-    return session.query(Appointment).filter(Appointment.id == appointment_id).first()
+    return _with_details(session.query(Appointment)).filter(
+        Appointment.id == appointment_id
+    ).first()
 
 
 def get_appointments_by_date(
@@ -339,7 +870,7 @@ def get_appointments_by_date(
         service_id: int = None
 ) -> List[Appointment]:
     """Получить записи на конкретную дату"""
-    query = session.query(Appointment).filter(
+    query = _with_details(session.query(Appointment)).filter(
         Appointment.date == date
     )
 
@@ -349,7 +880,202 @@ def get_appointments_by_date(
     if service_id:
         query = query.filter(Appointment.service_id == service_id)
 
-    return query.order_by(Appointment.time_slot).all()
+    return query.order_by(Appointment.start_min).all()
+
+
+def get_appointments_between(
+        session: Session,
+        start_date: str,
+        end_date: str
+) -> List[Appointment]:
+    """Получить записи за период (включительно)"""
+    return _with_details(session.query(Appointment)).filter(
+        Appointment.date.between(start_date, end_date)
+    ).order_by(
+        Appointment.date,
+        Appointment.start_min
+    ).all()
+
+
+class AppointmentRow(NamedTuple):
+    """Плоская строка записи для списков: всё нужное для вывода одним запросом"""
+    id: int
+    user_id: int
+    barber_id: int
+    service_id: int
+    date: str
+    time_slot: str
+    start_min: int
+    end_min: int
+    status: str
+    barber_name: str
+    service_name: str
+    price: int
+
+
+def _appointment_rows(table: Table = Appointment.__table__) -> Select:
+    """Записи вместе с именем барбера, названием и ценой услуги - один SELECT с JOIN"""
+    c = table.c
+    return select(
+        c.id,
+        c.user_id,
+        c.barber_id,
+        c.service_id,
+        c.date,
+        c.time_slot,
+        c.start_min,
+        c.end_min,
+        c.status,
+        Barber.name.label('barber_name'),
+        Service.name.label('service_name'),
+        func.coalesce(c.price, Service.price).label('price')
+    ).select_from(table).join(
+        Barber, Barber.id == c.barber_id
+    ).join(
+        Service, Service.id == c.service_id
+    )
+
+
+def _select_appointment_rows(
+        session: Session,
+        start_date: Optional[str],
+        where: Callable,
+        reverse: bool = False,
+        limit: int = None
+) -> List[AppointmentRow]:
+    """
+    Плоские строки, упорядоченные по (date, start_min, id).
+
+    where(c) возвращает условия по колонкам таблицы. Если период начинается
+    раньше границы архива, та же выборка делается по архиву и объединяется
+    (UNION ALL) с рабочей таблицей; иначе архив не читается вовсе.
+    """
+    def ordered(stmt, c):
+        stmt = stmt.order_by(*(
+            column.desc() if reverse else column
+            for column in (c.date, c.start_min, c.id)
+        ))
+        return stmt.limit(limit) if limit else stmt
+
+    parts = [
+        ordered(_appointment_rows(table).where(*where(table.c)), table.c)
+        for table in archive_sources(Appointment.__table__, start_date)
+    ]
+    if len(parts) > 1:
+        # Каждая часть уже упорядочена и обрезана - объединяем и досортировываем
+        merged = union_all(*(select(part.subquery()) for part in parts)).subquery()
+        parts = [ordered(select(merged), merged.c)]
+
+    return [AppointmentRow(*row) for row in session.execute(parts[0])]
+
+
+def get_appointment_row(session: Session, appointment_id: int) -> Optional[AppointmentRow]:
+    """Получить запись по ID в виде плоской строки (если её уже нет в рабочей таблице - из архива)"""
+    def where(c):
+        return [c.id == appointment_id]
+
+    # Период «из будущего» архив не задевает, None - вся история вместе с архивом
+    rows = (
+        _select_appointment_rows(session, "9999-12-31", where, limit=1) or
+        _select_appointment_rows(session, None, where, limit=1)
+    )
+    return rows[0] if rows else None
+
+
+def get_appointment_rows(
+        session: Session,
+        start_date: str,
+        end_date: str = None,
+        barber_id: int = None,
+        user_id: int = None
+) -> List[AppointmentRow]:
+    """Записи за дату или период (включительно) в виде плоских строк"""
+    def where(c):
+        conditions = [c.date.between(start_date, end_date or start_date)]
+        if barber_id:
+            conditions.append(c.barber_id == barber_id)
+        if user_id:
+            conditions.append(c.user_id == user_id)
+        return conditions
+
+    return _select_appointment_rows(session, start_date, where)
+
+
+class AppointmentPage(NamedTuple):
+    """Страница списка записей и курсоры соседних страниц (None - страницы нет)"""
+    rows: List[AppointmentRow]
+    next_cursor: Optional[Tuple[str, int, int]]
+    prev_cursor: Optional[Tuple[str, int, int]]
+
+
+def get_appointment_page(
+        session: Session,
+        start_date: str = None,
+        end_date: str = None,
+        barber_id: int = None,
+        user_id: int = None,
+        cursor: Tuple[str, int, int] = None,
+        backward: bool = False,
+        descending: bool = False,
+        limit: int = config.APPOINTMENTS_PAGE_SIZE
+) -> AppointmentPage:
+    """
+    Страница записей с пагинацией по ключу (date, start_min, id).
+
+    cursor - ключ крайней строки уже показанной страницы: следующая страница
+    начинается строго после него, предыдущая (backward=True) - строго перед ним.
+    Условие по ключу вместо OFFSET: любая страница читает limit + 1 строк по индексу.
+    descending=True - новые записи первыми (история клиента).
+    """
+    # Направление чтения по ключу: назад по убывающему списку - это вперёд по ключу
+    reverse = descending != backward
+
+    def where(c):
+        conditions = []
+        if start_date:
+            conditions.append(c.date >= start_date)
+        if end_date:
+            conditions.append(c.date <= end_date)
+        if barber_id:
+            conditions.append(c.barber_id == barber_id)
+        if user_id:
+            conditions.append(c.user_id == user_id)
+        if cursor:
+            key = tuple_(c.date, c.start_min, c.id)
+            conditions.append(key < tuple_(*cursor) if reverse else key > tuple_(*cursor))
+        return conditions
+
+    rows = _select_appointment_rows(session, start_date, where, reverse, limit + 1)
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backward:
+        rows.reverse()
+    if not rows:
+        return AppointmentPage(rows, None, None)
+
+    first = (rows[0].date, rows[0].start_min, rows[0].id)
+    last = (rows[-1].date, rows[-1].start_min, rows[-1].id)
+    if backward:
+        return AppointmentPage(rows, last, first if has_more else None)
+    return AppointmentPage(rows, last if has_more else None, first if cursor else None)
+
+
+def get_overlapping_appointments(
+        session: Session,
+        barber_id: int,
+        date: str,
+        start_min: int,
+        end_min: int
+) -> List[Appointment]:
+    """Активные записи барбера, пересекающиеся с интервалом [start_min, end_min)"""
+    return session.query(Appointment).filter(
+        Appointment.barber_id == barber_id,
+        Appointment.date == date,
+        Appointment.start_min < end_min,
+        Appointment.end_min > start_min,
+        Appointment.status.in_(['booked', 'confirmed'])
+    ).order_by(Appointment.start_min).all()
 
 
 def get_user_appointments(
@@ -358,136 +1084,437 @@ def get_user_appointments(
         upcoming_only: bool = True
 ) -> List[Appointment]:
     """Получить записи пользователя"""
-    query = session.query(Appointment).filter(
+    query = _with_details(session.query(Appointment)).filter(
         Appointment.user_id == user_id
     )
 
     if upcoming_only:
-        today = datetime.now().strftime("%Y-%m-%d")
+        now = datetime.now()
+        today = now.strftime("%Y-%m-%d")
         query = query.filter(
             or_(
                 Appointment.date > today,
                 and_(
                     Appointment.date == today,
-                    Appointment.time_slot >= datetime.now().strftime("%H:%M")
+                    Appointment.start_min >= now.hour * 60 + now.minute
                 )
             )
         ).filter(
             Appointment.status == 'booked'
         )
 
-    return query.order_by(Appointment.date, Appointment.time_slot).all()
+    return query.order_by(Appointment.date, Appointment.start_min).all()
 
 
+@retry_on_locked
 def confirm_appointment(session: Session, appointment_id: int) -> bool:
-    """Подтвердить запись клиента"""
+    """Подтвердить забронированную запись клиента (отменённую или завершённую - нет, False)"""
     appointment = get_appointment_by_id(session, appointment_id)
-    if appointment:
+    if not appointment or appointment.status != 'booked':
+        return False
+
+    try:
+        # Условный UPDATE по статусу: отменённая тем временем запись (её слоты
+        # уже освобождены) не должна снова стать активной
+        changed = session.query(Appointment).filter(
+            Appointment.id == appointment_id,
+            Appointment.status == 'booked'
+        ).update({Appointment.status: 'confirmed'}, synchronize_session=False)
+        if not changed:
+            session.rollback()
+            return False
+
+        record_status_change(session, appointment, 'booked', 'confirmed')
         appointment.status = 'confirmed'
         session.commit()
         return True
-    return False
+    except Exception as e:
+        session.rollback()
+        if is_database_locked(e):
+            raise
+        logger.error(f"Error confirming appointment: {e}")
+        return False
 
 
+@retry_on_locked
 def cancel_appointment(session: Session, appointment_id: int) -> bool:
-    """Отменить запись клиента"""
+    """Отменить активную запись клиента (уже отменённую или завершённую - нет, False)"""
     appointment = get_appointment_by_id(session, appointment_id)
-    if not appointment:
+    if not appointment or appointment.status not in ('booked', 'confirmed'):
         return False
 
     try:
+        # Условный UPDATE по статусу: при повторной или одновременной отмене
+        # слоты освобождает только первая, иначе их могли уже занять снова
+        old_status = appointment.status
+        changed = session.query(Appointment).filter(
+            Appointment.id == appointment_id,
+            Appointment.status == old_status
+        ).update({Appointment.status: 'canceled'}, synchronize_session=False)
+        if not changed:
+            session.rollback()
+            return False
+
+        record_status_change(session, appointment, old_status, 'canceled')
         appointment.status = 'canceled'
 
-        # Разблокируем слот
-        slot = session.query(Schedule).filter(
-            Schedule.barber_id == appointment.barber_id,
-            Schedule.date == appointment.date,
-            Schedule.time_slot == appointment.time_slot
-        ).first()
-
-        if slot:
-            slot.is_available = True
+        # Разблокируем все слоты записи
+        start_min, end_min = parse_time_slot(appointment.time_slot)
+        released = _slots_in_range(
+            session, appointment.barber_id, appointment.date, start_min, end_min
+        ).update({Schedule.is_available: True}, synchronize_session=False)
 
         session.commit()
+        if released:
+            availability_index.set_free(appointment.barber_id, appointment.date, start_min, end_min)
+            slot_cache.evict(appointment.date, appointment.barber_id)
+        events.emit(events.APPOINTMENT_CANCELED, appointment)
         return True
     except Exception as e:
         session.rollback()
+        if is_database_locked(e):
+            raise
         logger.error(f"Error canceling appointment: {e}")
         return False
 
 
+# ====================== РАСПИСАНИЕ БАРБЕРОВ НА ДЕНЬ ======================
+
+class AgendaRow(NamedTuple):
+    """Строка утреннего расписания барбера"""
+    barber_id: int
+    telegram_id: int
+    barber_name: str
+    time_slot: str
+    service_name: str
+    user_id: int
+
+
+def get_daily_agenda(session: Session, day: str) -> List[AgendaRow]:
+    """
+    Активные записи на день для всех барберов с чатом в Telegram - один запрос с JOIN.
+
+    Строки упорядочены по (barber_id, start_min): записи одного барбера идут
+    подряд, и их можно сгруппировать за один проход (itertools.groupby).
+    """
+    rows = session.query(
+        Appointment.barber_id,
+        Barber.telegram_id,
+        Barber.name,
+        Appointment.time_slot,
+        Service.name,
+        Appointment.user_id
+    ).join(
+        Barber, Barber.id == Appointment.barber_id
+    ).join(
+        Service, Service.id == Appointment.service_id
+    ).filter(
+        Appointment.date == day,
+        Appointment.status.in_(['booked', 'confirmed']),
+        Barber.is_active == True,
+        Barber.telegram_id.isnot(None)
+    ).order_by(
+        Appointment.barber_id,
+        Appointment.start_min
+    )
+    return [AgendaRow(*row) for row in rows]
+
+
+# ====================== НАПОМИНАНИЯ ======================
+
+def get_pending_reminders(session: Session, from_date: str = None) -> List[Tuple[int, str, int]]:
+    """Активные записи без отправленного напоминания: (id, date, start_min)"""
+    from_date = from_date or datetime.now().strftime("%Y-%m-%d")
+    return session.query(
+        Appointment.id,
+        Appointment.date,
+        Appointment.start_min
+    ).filter(
+        Appointment.date >= from_date,
+        Appointment.status.in_(['booked', 'confirmed']),
+        Appointment.reminder_sent_at.is_(None)
+    ).all()
+
+
+@retry_on_locked
+def mark_reminder_sent(session: Session, appointment_id: int, sent: bool = True) -> bool:
+    """
+    Отметить напоминание отправленным (sent=False - снять отметку).
+
+    Отметка ставится условным UPDATE до отправки: True получает только тот,
+    кто первым «забрал» напоминание, поэтому после перезапуска или при
+    нескольких процессах оно не уйдёт дважды.
+    """
+    try:
+        query = session.query(Appointment).filter(Appointment.id == appointment_id)
+        if sent:
+            query = query.filter(
+                Appointment.status.in_(['booked', 'confirmed']),
+                Appointment.reminder_sent_at.is_(None)
+            )
+        updated = query.update(
+            {Appointment.reminder_sent_at: datetime.now() if sent else None},
+            synchronize_session=False
+        )
+        session.commit()
+        return updated > 0
+    except Exception as e:
+        session.rollback()
+        if is_database_locked(e):
+            raise
+        logger.error(f"Error marking reminder: {e}")
+        return False
+
+
+# ====================== ЗАБЛОКИРОВАННЫЕ ЧАТЫ ======================
+
+def get_blocked_chats(session: Session, chat_ids: Iterable[int] = None) -> Set[int]:
+    """Чаты, заблокировавшие бота (chat_ids - проверить только эти)"""
+    query = session.query(BlockedChat.chat_id)
+    if chat_ids is not None:
+        query = query.filter(BlockedChat.chat_id.in_(list(chat_ids)))
+    return {chat_id for chat_id, in query}
+
+
+@retry_on_locked
+def block_chat(session: Session, chat_id: int, reason: str = None) -> bool:
+    """Запомнить, что чат заблокировал бота - рассылки будут его пропускать"""
+    try:
+        session.execute(sqlite_insert(BlockedChat.__table__).values(
+            chat_id=chat_id,
+            blocked_at=datetime.now(),
+            reason=reason[:255] if reason else None
+        ).on_conflict_do_nothing(index_elements=['chat_id']))
+        session.commit()
+        return True
+    except Exception as e:
+        session.rollback()
+        if is_database_locked(e):
+            raise
+        logger.error(f"Error blocking chat: {e}")
+        return False
+
+
+@retry_on_locked
+def unblock_chat(session: Session, chat_id: int) -> bool:
+    """Снять блокировку (пользователь снова написал боту)"""
+    try:
+        deleted = session.query(BlockedChat).filter(
+            BlockedChat.chat_id == chat_id
+        ).delete(synchronize_session=False)
+        session.commit()
+        return deleted > 0
+    except Exception as e:
+        session.rollback()
+        if is_database_locked(e):
+            raise
+        logger.error(f"Error unblocking chat: {e}")
+        return False
+
+
 # ====================== ЗАПРОСЫ ДЛЯ АДМИНИСТРИРОВАНИЯ ======================
 
+def _previous_period(start_date: str, end_date: str) -> Tuple[str, str]:
+    """Период той же длины, заканчивающийся накануне start_date"""
+    start = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    prev_end = start - timedelta(days=1)
+    prev_start = prev_end - (end - start)
+    return str(prev_start), str(prev_end)
+
+
+class _StatsSource(NamedTuple):
+    """Строки, по которым считается статистика админ-панели"""
+    name: str
+    date: Any       # Дата строки
+    status: Any     # Статус записей строки
+    total: Any      # Сколько записей в строке
+    revenue: Any    # Их доход
+    services: Callable[[str, str], Select]  # (start, end) -> (service_id, count) завершённых записей
+
+
+def _rollup_source() -> _StatsSource:
+    """Суточные сводки daily_stats / daily_service_stats: O(дней) строк за период"""
+    def services(start_date: str, end_date: str) -> Select:
+        return select(
+            DailyServiceStat.service_id,
+            func.sum(DailyServiceStat.completed).label('count')
+        ).where(
+            DailyServiceStat.date.between(start_date, end_date)
+        ).group_by(DailyServiceStat.service_id)
+
+    return _StatsSource(
+        'daily_stats', DailyStat.date, DailyStat.status, DailyStat.total, DailyStat.revenue, services
+    )
+
+
+def _appointments_source(start_date: str, end_date: str) -> _StatsSource:
+    """Сами записи за start_date..end_date (с архивом, если период его задевает)"""
+    tables = list(archive_sources(Appointment.__table__, start_date))
+    if len(tables) == 1:
+        # Без архива - прямо по таблице, чтобы работал индекс (date, status, service_id)
+        rows = tables[0]
+    else:
+        rows = union_all(*(
+            select(table.c.date, table.c.service_id, table.c.status, table.c.price).where(
+                table.c.date.between(start_date, end_date)
+            )
+            for table in tables
+        )).subquery()
+    # Как при пересборке сводки: цена записи, у старых записей без цены - цена услуги
+    price = func.coalesce(
+        rows.c.price,
+        select(Service.price).where(Service.id == rows.c.service_id).scalar_subquery()
+    )
+
+    def services(start_date: str, end_date: str) -> Select:
+        return select(
+            rows.c.service_id,
+            func.count().label('count')
+        ).where(
+            rows.c.date.between(start_date, end_date),
+            rows.c.status == 'completed'
+        ).group_by(rows.c.service_id)
+
+    return _StatsSource(
+        'appointments', rows.c.date, rows.c.status, literal(1), price, services
+    )
+
+
+def _status_totals(source: _StatsSource) -> List:
+    """Условные агрегаты: записи, завершённые, отменённые, доход"""
+    completed = source.status == 'completed'
+    return [
+        func.sum(source.total),
+        func.sum(case((completed, source.total), else_=0)),
+        func.sum(case((source.status == 'canceled', source.total), else_=0)),
+        func.sum(case((completed, source.revenue), else_=0)),
+    ]
+
+
+def _fill_admin_stats(
+        session: Session,
+        stats: Dict[str, any],
+        source: _StatsSource,
+        start_date: str,
+        end_date: str,
+        scan_start: str
+) -> bool:
+    """Заполнить stats по источнику; False - в нём нет ни строки за scan_start..end_date"""
+    counters = ('total_appointments', 'completed_services', 'canceled_appointments', 'total_income')
+    stats['source'] = source.name
+
+    # Общая статистика и доход (и предыдущий период) - один проход,
+    # строки группируются по признаку «текущий период» (без сравнения
+    # группировать нечего - GROUP BY заметно замедляет проход по записям)
+    with_previous = scan_start < start_date
+    is_current = source.date >= start_date if with_previous else literal(True)
+    query = session.query(
+        is_current,
+        *_status_totals(source)
+    ).filter(
+        source.date.between(scan_start, end_date)
+    )
+    if with_previous:
+        query = query.group_by(is_current)
+    # Агрегат без GROUP BY по пустому периоду - одна строка из NULL
+    rows = [row for row in query.all() if row[1] is not None]
+    if not rows:
+        return False
+
+    for current, *values in rows:
+        target = stats if current else stats['previous']
+        target.update(zip(counters, (value or 0 for value in values)))
+
+    # Популярные услуги (топ-5): сначала сворачиваем строки по service_id,
+    # названия подтягиваем уже к десятку сгруппированных строк
+    by_service = source.services(start_date, end_date).subquery()
+    stats['popular_services'] = session.query(
+        Service.name,
+        func.sum(by_service.c.count).label('count')
+    ).join(
+        by_service, Service.id == by_service.c.service_id
+    ).group_by(
+        Service.name
+    ).order_by(
+        func.sum(by_service.c.count).desc()
+    ).limit(5).all()
+
+    # Самые загруженные дни (топ-5)
+    stats['busy_days'] = session.query(
+        source.date,
+        func.sum(source.total).label('count')
+    ).filter(
+        source.date.between(start_date, end_date),
+        source.status.in_(['booked', 'confirmed'])
+    ).group_by(
+        source.date
+    ).having(
+        func.sum(source.total) > 0
+    ).order_by(
+        func.sum(source.total).desc()
+    ).limit(5).all()
+
+    return True
+
+
 def get_admin_stats(
         session: Session,
         start_date: str,
-        end_date: str
+        end_date: str,
+        compare: bool = False
 ) -> Dict[str, any]:
-    """Получить статистику для админ-панели"""
+    """
+    Получить статистику для админ-панели за произвольный период.
+
+    Счётчики и доход считаются одним проходом условных агрегатов
+    (SUM(CASE ...)). При compare=True тот же проход захватывает предыдущий
+    период той же длины, его счётчики попадают в stats['previous'].
+
+    Основной источник - суточные сводки daily_stats (не больше четырёх строк
+    на день) и daily_service_stats (топ услуг). Если сводок нет (база ещё
+    не обновлена миграциями) или за период в них нет ни строки (сводку не
+    собрали, например после импорта записей в обход бота), тот же проход
+    делается по самим записям appointments. Использованный источник - в
+    stats['source'], причина перехода на записи пишется в лог.
+    """
     stats = {
         'total_appointments': 0,
         'completed_services': 0,
         'canceled_appointments': 0,
         'total_income': 0,
         'popular_services': [],
-        'busy_days': []
+        'busy_days': [],
+        'source': None
     }
+    scan_start = start_date
+    if compare:
+        prev_start, prev_end = _previous_period(start_date, end_date)
+        scan_start = prev_start
+        stats['previous'] = {
+            'total_appointments': 0,
+            'completed_services': 0,
+            'canceled_appointments': 0,
+            'total_income': 0
+        }
+        stats['previous_period'] = (prev_start, prev_end)
 
     try:
-        # Общая статистика
-        stats['total_appointments'] = session.query(Appointment).filter(
-            Appointment.date.between(start_date, end_date)
-        ).count()
-
-        stats['completed_services'] = session.query(Appointment).filter(
-            Appointment.date.between(start_date, end_date),
-            Appointment.status == 'completed'
-        ).count()
-
-        stats['canceled_appointments'] = session.query(Appointment).filter(
-            Appointment.date.between(start_date, end_date),
-            Appointment.status == 'canceled'
-        ).count()
-
-        # Общий доход
-        income = session.query(
-            func.sum(Service.price)
-        ).join(
-            Appointment.service
-        ).filter(
-            Appointment.date.between(start_date, end_date),
-            Appointment.status == 'completed'
-        ).scalar()
-
-        stats['total_income'] = income if income else 0
-
-        # Популярные услуги (топ-5)
-        stats['popular_services'] = session.query(
-            Service.name,
-            func.count(Appointment.id).label('count')
-        ).join(
-            Appointment.service
-        ).filter(
-            Appointment.date.between(start_date, end_date),
-            Appointment.status == 'completed'
-        ).group_by(
-            Service.name
-        ).order_by(
-            func.count(Appointment.id).desc()
-        ).limit(5).all()
-
-        # Самые загруженные дни (топ-5)
-        stats['busy_days'] = session.query(
-            Appointment.date,
-            func.count(Appointment.id).label('count')
-        ).filter(
-            Appointment.date.between(start_date, end_date),
-            Appointment.status.in_(['booked', 'confirmed'])
-        ).group_by(
-            Appointment.date
-        ).order_by(
-            func.count(Appointment.id).desc()
-        ).limit(5).all()
+        try:
+            found = _fill_admin_stats(session, stats, _rollup_source(), start_date, end_date, scan_start)
+            reason = None if found else "no daily_stats rows for the period"
+        except Exception as e:
+            if not is_missing_table(e):
+                raise
+            session.rollback()
+            found, reason = False, f"daily stats tables are missing: {getattr(e, 'orig', e)}"
+
+        if not found:
+            logger.info(f"Admin stats {start_date}..{end_date} from appointments: {reason}")
+            _fill_admin_stats(
+                session, stats, _appointments_source(scan_start, end_date),
+                start_date, end_date, scan_start
+            )
 
     except Exception as e:
         logger.error(f"Error getting stats: {e}")
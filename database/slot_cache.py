@@ -0,0 +1,138 @@
+"""
+Кэш результатов поиска свободных слотов.
+
+Ключ - (дата, барбер, услуга); барбер или услуга могут быть None
+(«любой барбер», «без учёта длительности»). Значение - кортеж неизменяемых
+SlotRecord, поэтому один результат безопасно отдавать многим клиентам.
+Запись живёт не дольше ttl секунд, при переполнении вытесняется самая давно
+использованная. Запись/отмена/блокировка слота сбрасывает только записи
+затронутой пары (дата, барбер), включая результаты «любой барбер» на эту дату.
+
+Сброс также увеличивает версию пары (дата, барбер) и даты. Версия снимается
+до чтения данных (token) и сверяется в put: результат, прочитанный до
+сброса, в кэш не попадает и не раздаётся до конца ttl.
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, NamedTuple, Optional, Set, Tuple
+from config import config
+
+SlotKey = Tuple[str, Optional[int], Optional[int]]
+SlotToken = Tuple[int, int]
+
+
+class SlotRecord(NamedTuple):
+    """Неизменяемая запись свободного слота (барбер, дата, время)"""
+    barber_id: int
+    date: str
+    time_slot: str
+    start_min: int
+    end_min: int
+
+
+class SlotCache:
+    """TTL + LRU кэш свободных слотов с точечной инвалидацией по (дата, барбер)"""
+
+    def __init__(
+            self,
+            maxsize: int = config.SLOT_CACHE_SIZE,
+            ttl: float = config.SLOT_CACHE_TTL
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[SlotKey, Tuple[float, Tuple[SlotRecord, ...]]]" = OrderedDict()
+        # дата -> ключи кэша на эту дату
+        self._by_date: Dict[str, Set[SlotKey]] = {}
+        # Версии по дате и по (дата, барбер); epoch растёт при полном сбросе
+        self._generations: Dict[object, int] = {}
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_puts = 0
+
+    def get(self, key: SlotKey) -> Optional[Tuple[SlotRecord, ...]]:
+        """Результат из кэша или None (промах / истёк срок)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires, slots = entry
+        if expires <= time.monotonic():
+            self._discard(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return slots
+
+    def token(self, key: SlotKey) -> SlotToken:
+        """Версия данных ключа - снять до чтения и передать в put"""
+        date, barber_id = key[0], key[1]
+        scope = date if barber_id is None else (date, barber_id)
+        return self._epoch, self._generations.get(scope, 0)
+
+    def put(
+            self,
+            key: SlotKey,
+            slots: Iterable[SlotRecord],
+            token: Optional[SlotToken] = None
+    ) -> Tuple[SlotRecord, ...]:
+        """Сохранить результат поиска (если с момента token ключ не сбрасывали)"""
+        slots = tuple(slots)
+        if token is not None and token != self.token(key):
+            # Пока считали результат, слоты барбера изменились - не кэшируем
+            self.stale_puts += 1
+            return slots
+
+        self._entries[key] = (time.monotonic() + self.ttl, slots)
+        self._entries.move_to_end(key)
+        self._by_date.setdefault(key[0], set()).add(key)
+
+        while len(self._entries) > self.maxsize:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self.evictions += 1
+        return slots
+
+    def evict(self, date: str, barber_id: int):
+        """Сбросить результаты, которые могли измениться для барбера в эту дату"""
+        for scope in (date, (date, barber_id)):
+            self._generations[scope] = self._generations.get(scope, 0) + 1
+
+        keys = self._by_date.get(date)
+        if not keys:
+            return
+        for key in [key for key in keys if key[1] is None or key[1] == barber_id]:
+            self._discard(key)
+
+    def clear(self):
+        """Сбросить весь кэш (перезагрузка расписания или справочников)"""
+        self._entries.clear()
+        self._by_date.clear()
+        self._generations.clear()
+        self._epoch += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Счётчики попаданий/промахов"""
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "stale_puts": self.stale_puts,
+        }
+
+    def _discard(self, key: SlotKey):
+        self._entries.pop(key, None)
+        keys = self._by_date.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_date[key[0]]
+
+
+# Общий кэш процесса
+slot_cache = SlotCache()
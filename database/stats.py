@@ -0,0 +1,175 @@
+"""
+Суточные сводки записей daily_stats и daily_service_stats.
+
+daily_stats - (дата, статус) -> количество записей и сумма их цен, не больше
+четырёх строк на день, поэтому счётчики за месяц или год читают O(дней)
+строк. daily_service_stats - (дата, услуга) -> число завершённых записей,
+для топа услуг. Сводки обновляются в той же транзакции, что и запись:
+создание добавляет запись в 'booked', смена статуса переносит её между
+строками. Статистика админ-панели читает только сводки. Для исторических
+данных или после ручных правок appointments сводки можно пересобрать:
+
+    python -m database.stats --from 2024-01-01 --to 2024-12-31
+"""
+from typing import List, Optional
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from database.archive import needs_archive
+from database.db import ARCHIVE_SCHEMA, retry_on_locked
+from database.models import Appointment, DailyStat, DailyServiceStat, Service
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Параметры :start_date/:end_date понимают и sqlite3, и SQLAlchemy text()
+DELETE_DAILY_STATS_SQL = """
+    DELETE FROM daily_stats WHERE date BETWEEN :start_date AND :end_date
+"""
+
+DELETE_DAILY_SERVICE_STATS_SQL = """
+    DELETE FROM daily_service_stats WHERE date BETWEEN :start_date AND :end_date
+"""
+
+_REBUILD_DAILY_STATS_TEMPLATE = """
+    INSERT INTO daily_stats (date, status, total, revenue)
+    SELECT appointments.date,
+           COALESCE(appointments.status, 'booked'),
+           COUNT(*),
+           COALESCE(SUM(COALESCE(appointments.price, services.price)), 0)
+    FROM {source} AS appointments
+    LEFT JOIN services ON services.id = appointments.service_id
+    WHERE appointments.date BETWEEN :start_date AND :end_date
+    GROUP BY appointments.date, COALESCE(appointments.status, 'booked')
+"""
+
+_REBUILD_DAILY_SERVICE_STATS_TEMPLATE = """
+    INSERT INTO daily_service_stats (date, service_id, completed)
+    SELECT appointments.date, appointments.service_id, COUNT(*)
+    FROM {source} AS appointments
+    WHERE appointments.date BETWEEN :start_date AND :end_date
+      AND appointments.status = 'completed'
+    GROUP BY appointments.date, appointments.service_id
+"""
+
+_MAIN_SOURCE = "main.appointments"
+
+# Пересборка старого периода: записи, перенесённые в архив, тоже учитываются
+_ARCHIVE_SOURCE = f"""(
+        SELECT date, service_id, status, price FROM main.appointments
+        UNION ALL
+        SELECT date, service_id, status, price FROM {ARCHIVE_SCHEMA}.appointments
+    )"""
+
+REBUILD_DAILY_STATS_SQL = _REBUILD_DAILY_STATS_TEMPLATE.format(source=_MAIN_SOURCE)
+REBUILD_DAILY_SERVICE_STATS_SQL = _REBUILD_DAILY_SERVICE_STATS_TEMPLATE.format(source=_MAIN_SOURCE)
+REBUILD_DAILY_STATS_WITH_ARCHIVE_SQL = _REBUILD_DAILY_STATS_TEMPLATE.format(source=_ARCHIVE_SOURCE)
+REBUILD_DAILY_SERVICE_STATS_WITH_ARCHIVE_SQL = _REBUILD_DAILY_SERVICE_STATS_TEMPLATE.format(
+    source=_ARCHIVE_SOURCE
+)
+
+
+def rebuild_statements(with_archive: bool = False) -> List[str]:
+    """SQL заполнения обеих сводок за период :start_date..:end_date (строки периода удаляются заранее)"""
+    if with_archive:
+        return [REBUILD_DAILY_STATS_WITH_ARCHIVE_SQL, REBUILD_DAILY_SERVICE_STATS_WITH_ARCHIVE_SQL]
+    return [REBUILD_DAILY_STATS_SQL, REBUILD_DAILY_SERVICE_STATS_SQL]
+
+
+def bump_daily_stats(
+        session: Session,
+        appointment: Appointment,
+        status: str,
+        delta: int
+):
+    """Прибавить (delta=1) или вычесть (delta=-1) запись в строках сводок её статуса"""
+    # Как при пересборке: у старых записей без сохранённой цены - цена услуги
+    price = appointment.price
+    if price is None:
+        price = func.coalesce(
+            select(Service.price).where(Service.id == appointment.service_id).scalar_subquery(),
+            0
+        )
+    stmt = sqlite_insert(DailyStat.__table__).values(
+        date=appointment.date,
+        status=status,
+        total=delta,
+        revenue=delta * price
+    )
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=['date', 'status'],
+        set_={
+            'total': DailyStat.total + stmt.excluded.total,
+            'revenue': DailyStat.revenue + stmt.excluded.revenue,
+        }
+    ))
+
+    if status != 'completed':
+        return
+    stmt = sqlite_insert(DailyServiceStat.__table__).values(
+        date=appointment.date,
+        service_id=appointment.service_id,
+        completed=delta
+    )
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=['date', 'service_id'],
+        set_={'completed': DailyServiceStat.completed + stmt.excluded.completed}
+    ))
+
+
+def record_status_change(
+        session: Session,
+        appointment: Appointment,
+        old_status: Optional[str],
+        new_status: str
+):
+    """Перенести запись между строками сводки (old_status=None - новая запись)"""
+    if old_status == new_status:
+        return
+    if old_status is not None:
+        bump_daily_stats(session, appointment, old_status, -1)
+    bump_daily_stats(session, appointment, new_status, 1)
+
+
+@retry_on_locked
+def rebuild_daily_stats(
+        session: Session,
+        start_date: str = None,
+        end_date: str = None
+) -> int:
+    """Пересобрать сводки за период (по умолчанию за всю историю), вернуть число строк"""
+    params = {
+        "start_date": start_date or "0000-00-00",
+        "end_date": end_date or "9999-99-99",
+    }
+    try:
+        session.execute(text(DELETE_DAILY_STATS_SQL), params)
+        session.execute(text(DELETE_DAILY_SERVICE_STATS_SQL), params)
+        rows = 0
+        for statement in rebuild_statements(needs_archive(start_date)):
+            rows += session.execute(text(statement), params).rowcount
+        session.commit()
+        return rows
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error rebuilding daily stats: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    import argparse
+    from database.db import init_db
+    from database.queries import get_db_session
+
+    parser = argparse.ArgumentParser(description="Пересобрать суточные сводки записей")
+    parser.add_argument("--from", dest="start_date", help="Начальная дата, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end_date", help="Конечная дата, YYYY-MM-DD")
+    args = parser.parse_args()
+
+    init_db()
+    session = get_db_session()
+    try:
+        rows = rebuild_daily_stats(session, args.start_date, args.end_date)
+        print(f"Daily stats rows: {rows}")
+    finally:
+        session.close()
@@ -1,7 +1,9 @@
 from .client.start import register_handlers as register_client_handlers
+from .client.booking import register_handlers as register_booking_handlers
 from .admin.panel import register_handlers as register_admin_handlers
 
 def register_all_handlers(dp):
     """Регистрирует все обработчики."""
     register_client_handlers(dp)
+    register_booking_handlers(dp)
     register_admin_handlers(dp)
\ No newline at end of file
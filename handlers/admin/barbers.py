@@ -1,15 +1,39 @@
 from aiogram import types, Dispatcher
 from aiogram.fsm.context import FSMContext
-from database.models import Barber
-from database.db import Session
+from typing import Optional
+from database.async_queries import (
+    get_async_session,
+    get_active_barbers,
+    get_barber_record,
+    add_barber,
+    update_barber
+)
 from states import BarberAddStates
 from keyboards.admin import (
     barbers_keyboard,
+    barber_actions_keyboard,
     confirm_keyboard,
-    cancel_keyboard
+    cancel_keyboard,
+    skip_keyboard
 )
 from utils.notifications import notify_admins
 
+TELEGRAM_ID_PROMPT = (
+    "Перешлите любое сообщение барбера или введите его числовой chat id - "
+    "туда будет приходить расписание на день.\n"
+    "Барбер должен сам написать боту /start, иначе сообщения не дойдут."
+)
+
+
+def parse_telegram_id(message: types.Message) -> Optional[int]:
+    """Chat id из пересланного сообщения или из введённого числа (None - не распознан)"""
+    if message.forward_from:
+        return message.forward_from.id
+    text = (message.text or "").strip()
+    if text.lstrip("-").isdigit():
+        return int(text)
+    return None
+
 
 # Добавление нового барбера
 async def add_barber_start(message: types.Message):
@@ -54,11 +78,37 @@ async def process_barber_photo(message: types.Message, state: FSMContext):
     async with state.proxy() as data:
         data['photo_id'] = message.photo[-1].file_id
 
+    await BarberAddStates.next()
+    await message.answer(TELEGRAM_ID_PROMPT, reply_markup=skip_keyboard())
+
+
+async def process_barber_telegram_id(message: types.Message, state: FSMContext):
+    """Обработка чата барбера (можно пропустить и привязать позже)"""
+    if message.text == "Отмена":
+        await message.answer("Добавление отменено", reply_markup=barbers_keyboard())
+        await state.finish()
+        return
+
+    telegram_id = None
+    if message.text != "Пропустить":
+        telegram_id = parse_telegram_id(message)
+        if telegram_id is None:
+            await message.answer(
+                "Не удалось определить chat id. Если пересылка скрыта настройками "
+                "приватности, введите id числом.",
+                reply_markup=skip_keyboard()
+            )
+            return
+
+    async with state.proxy() as data:
+        data['telegram_id'] = telegram_id
+
         # Формируем сообщение для подтверждения
         confirm_message = (
             f"Добавить нового барбера?\n\n"
             f"Имя: {data['name']}\n"
-            f"Описание: {data['description']}"
+            f"Описание: {data['description']}\n"
+            f"Чат для расписания: {telegram_id or 'не указан'}"
         )
 
     await BarberAddStates.next()
@@ -77,14 +127,14 @@ async def confirm_add_barber(message: types.Message, state: FSMContext):
         return
 
     async with state.proxy() as data:
-        with Session() as session:
-            new_barber = Barber(
+        async with get_async_session() as session:
+            await add_barber(
+                session,
                 name=data['name'],
                 description=data['description'],
-                photo_id=data['photo_id']
+                photo_id=data['photo_id'],
+                telegram_id=data.get('telegram_id')
             )
-            session.add(new_barber)
-            session.commit()
 
     await message.answer(
         "Барбер успешно добавлен!",
@@ -97,8 +147,8 @@ async def confirm_add_barber(message: types.Message, state: FSMContext):
 # Удаление барбера
 async def delete_barber_start(message: types.Message):
     """Начало процесса удаления барбера"""
-    with Session() as session:
-        barbers = session.query(Barber).filter(Barber.is_active == True).all()
+    async with get_async_session() as session:
+        barbers = await get_active_barbers(session)
 
     if not barbers:
         await message.answer("Нет активных барберов для удаления")
@@ -124,15 +174,12 @@ async def process_barber_deletion(message: types.Message, state: FSMContext):
         return
 
     barber_name = message.text.replace("Удалить ", "")
-    with Session() as session:
-        barber = session.query(Barber).filter(
-            Barber.name == barber_name,
-            Barber.is_active == True
-        ).first()
+    async with get_async_session() as session:
+        barbers = await get_active_barbers(session)
+        barber = next((b for b in barbers if b.name == barber_name), None)
 
         if barber:
-            barber.is_active = False
-            session.commit()
+            await update_barber(session, barber.id, is_active=False)
             await message.answer(
                 f"Барбер {barber_name} деактивирован",
                 reply_markup=barbers_keyboard()
@@ -144,25 +191,98 @@ async def process_barber_deletion(message: types.Message, state: FSMContext):
     await state.finish()
 
 
+# Изменение барбера: привязка чата для расписания на день
+async def edit_barber_start(callback: types.CallbackQuery, state: FSMContext):
+    """Начало изменения барбера из списка"""
+    barber_id = int(callback.data.split(':')[1])
+    async with get_async_session() as session:
+        barber = await get_barber_record(session, barber_id)
+
+    if not barber:
+        await callback.answer("Барбер не найден")
+        return
+
+    async with state.proxy() as data:
+        data['barber_id'] = barber_id
+        data['name'] = barber.name
+
+    await callback.message.answer(
+        f"Барбер {barber.name}. {TELEGRAM_ID_PROMPT}",
+        reply_markup=cancel_keyboard()
+    )
+    await BarberAddStates.waiting_for_new_telegram_id.set()
+    await callback.answer()
+
+
+async def process_new_telegram_id(message: types.Message, state: FSMContext):
+    """Сохранение чата барбера"""
+    if message.text == "Отмена":
+        await message.answer("Отменено", reply_markup=barbers_keyboard())
+        await state.finish()
+        return
+
+    telegram_id = parse_telegram_id(message)
+    if telegram_id is None:
+        await message.answer(
+            "Не удалось определить chat id. Если пересылка скрыта настройками "
+            "приватности, введите id числом.",
+            reply_markup=cancel_keyboard()
+        )
+        return
+
+    async with state.proxy() as data:
+        barber_id = data['barber_id']
+        name = data['name']
+
+    async with get_async_session() as session:
+        updated = await update_barber(session, barber_id, telegram_id=telegram_id)
+
+    await message.answer(
+        f"Чат барбера {name} сохранён" if updated else "Барбер не найден",
+        reply_markup=barbers_keyboard()
+    )
+    await state.finish()
+
+
+async def delete_barber_callback(callback: types.CallbackQuery):
+    """Деактивация барбера из списка"""
+    barber_id = int(callback.data.split(':')[1])
+    async with get_async_session() as session:
+        barber = await get_barber_record(session, barber_id)
+        updated = barber and await update_barber(session, barber_id, is_active=False)
+
+    if not updated:
+        await callback.answer("Барбер не найден")
+        return
+
+    await callback.message.answer(f"Барбер {barber.name} деактивирован", reply_markup=barbers_keyboard())
+    await callback.answer()
+    await notify_admins(f"Барбер {barber.name} деактивирован")
+
+
 # Список барберов
 async def show_barbers(message: types.Message):
     """Показать всех активных барберов"""
-    with Session() as session:
-        barbers = session.query(Barber).filter(Barber.is_active == True).all()
+    async with get_async_session() as session:
+        barbers = await get_active_barbers(session)
 
     if not barbers:
         await message.answer("Нет активных барберов")
         return
 
     for barber in barbers:
-        caption = f"{barber.name}\n\n{barber.description or 'Нет описания'}"
+        caption = (
+            f"{barber.name}\n\n{barber.description or 'Нет описания'}\n\n"
+            f"Чат для расписания: {barber.telegram_id or 'не привязан'}"
+        )
         try:
             await message.answer_photo(
                 photo=barber.photo_id,
-                caption=caption
+                caption=caption,
+                reply_markup=barber_actions_keyboard(barber.id)
             )
         except:
-            await message.answer(caption)
+            await message.answer(caption, reply_markup=barber_actions_keyboard(barber.id))
 
 
 # Регистрация обработчиков
@@ -197,6 +317,11 @@ def register_handlers(dp: Dispatcher):
         content_types=['photo'],
         state=BarberAddStates.waiting_for_photo
     )
+    dp.register_message_handler(
+        process_barber_telegram_id,
+        content_types=types.ContentTypes.ANY,
+        state=BarberAddStates.waiting_for_telegram_id
+    )
     dp.register_message_handler(
         confirm_add_barber,
         state=BarberAddStates.waiting_for_confirmation
@@ -204,4 +329,23 @@ def register_handlers(dp: Dispatcher):
     dp.register_message_handler(
         process_barber_deletion,
         state=BarberAddStates.waiting_for_deletion
+    )
+
+    # Действия из списка барберов
+    dp.register_callback_query_handler(
+        edit_barber_start,
+        lambda c: c.data.startswith('edit_barber:'),
+        is_admin=True,
+        state='*'
+    )
+    dp.register_message_handler(
+        process_new_telegram_id,
+        content_types=types.ContentTypes.ANY,
+        state=BarberAddStates.waiting_for_new_telegram_id
+    )
+    dp.register_callback_query_handler(
+        delete_barber_callback,
+        lambda c: c.data.startswith('delete_barber:'),
+        is_admin=True,
+        state='*'
     )
\ No newline at end of file
@@ -1,12 +1,12 @@
 from aiogram import types, Dispatcher
 from aiogram.dispatcher.filters import Text
-from database.queries import get_admin_stats
+from database.async_queries import get_async_session, get_admin_stats
 from keyboards.admin import (
     admin_main_keyboard,
     admin_management_keyboard,
     stats_keyboard
 )
-from utils.date_utils import get_month_range
+from utils.date_utils import get_month_range, format_short_date
 
 
 # Главное меню админа
@@ -39,15 +39,17 @@ async def show_stats_menu(message: types.Message):
 async def show_current_month_stats(message: types.Message):
     """Показывает статистику за текущий месяц"""
     start_date, end_date = get_month_range()
-    stats = await get_admin_stats(start_date, end_date)
+    async with get_async_session() as session:
+        stats = await get_admin_stats(session, str(start_date), str(end_date), compare=True)
 
+    previous = stats['previous']
     stats_message = (
         f"📈 Статистика за текущий месяц:\n\n"
-        f"• Новые записи: {stats['new_appointments']}\n"
-        f"• Завершенные услуги: {stats['completed_services']}\n"
-        f"• Отмененные записи: {stats['canceled_appointments']}\n"
-        f"• Общий доход: {stats['total_income']} руб.\n\n"
-        f"📅 Период: {start_date.strftime('%d.%m.%Y')}-{end_date.strftime('%d.%m.%Y')}"
+        f"• Новые записи: {stats['total_appointments']} (ранее: {previous['total_appointments']})\n"
+        f"• Завершенные услуги: {stats['completed_services']} (ранее: {previous['completed_services']})\n"
+        f"• Отмененные записи: {stats['canceled_appointments']} (ранее: {previous['canceled_appointments']})\n"
+        f"• Общий доход: {stats['total_income']} руб. (ранее: {previous['total_income']} руб.)\n\n"
+        f"📅 Период: {format_short_date(start_date)}-{format_short_date(end_date)}"
     )
 
     await message.answer(stats_message)
@@ -2,12 +2,15 @@ from aiogram import types, Dispatcher
 from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher.filters.state import State, StatesGroup
 from datetime import datetime, timedelta
-from database.queries import (
-    get_db_session,
+from config import config
+from database.queries import generate_time_slots
+from database.async_queries import (
+    get_async_session,
     get_active_barbers,
     get_available_slots,
-    add_schedule_slot,
-    generate_time_slots
+    add_schedule_slots,
+    set_schedule_template,
+    materialize_schedule
 )
 from keyboards.admin import (
     schedule_menu_keyboard,
@@ -17,6 +20,7 @@ from keyboards.admin import (
     confirm_keyboard
 )
 from utils.date_utils import get_next_dates
+from utils.formatting import parse_short_date, format_short_date
 
 
 class ScheduleStates(StatesGroup):
@@ -26,6 +30,7 @@ class ScheduleStates(StatesGroup):
     select_slots = State()
     confirm_slots = State()
     custom_day = State()
+    select_template_barber = State()
 
 
 # Главное меню расписания
@@ -40,8 +45,8 @@ async def show_schedule_menu(message: types.Message):
 # Начало настройки расписания
 async def setup_schedule_start(message: types.Message):
     """Начало настройки расписания"""
-    with get_db_session() as session:
-        barbers = get_active_barbers(session)
+    async with get_async_session() as session:
+        barbers = await get_active_barbers(session)
 
     if not barbers:
         await message.answer("Нет активных барберов для настройки расписания")
@@ -122,9 +127,9 @@ async def process_selected_day(message: types.Message, state: FSMContext):
 async def process_custom_day(message: types.Message, state: FSMContext):
     """Обработка введенной вручную даты"""
     try:
-        date = datetime.strptime(message.text, "%d.%m.%Y").date()
+        date = parse_short_date(message.text)
         async with state.proxy() as data:
-            data['date'] = date.strftime("%Y-%m-%d")
+            data['date'] = date.isoformat()
 
         slots = generate_time_slots()
 
@@ -146,7 +151,7 @@ async def confirm_selected_slots(callback: types.CallbackQuery, state: FSMContex
     async with state.proxy() as data:
         data['selected_slots'] = selected_slots
         barber_name = data['barber_name']
-        date = datetime.strptime(data['date'], "%Y-%m-%d").strftime("%d.%m.%Y")
+        date = format_short_date(data['date'])
 
     slots_text = "\n".join(f"• {slot}" for slot in selected_slots)
 
@@ -173,14 +178,11 @@ async def save_schedule(message: types.Message, state: FSMContext):
         date = data['date']
         slots = data['selected_slots']
 
-    with get_db_session() as session:
-        for slot in slots:
-            add_schedule_slot(
-                session=session,
-                barber_id=barber_id,
-                date=date,
-                time_slot=slot
-            )
+    async with get_async_session() as session:
+        await add_schedule_slots(
+            session,
+            [(barber_id, date, slot) for slot in slots]
+        )
 
     await message.answer(
         "Расписание успешно сохранено!",
@@ -189,6 +191,55 @@ async def save_schedule(message: types.Message, state: FSMContext):
     await state.finish()
 
 
+# Недельные шаблоны
+async def setup_template_start(message: types.Message):
+    """Начало настройки стандартного недельного шаблона"""
+    async with get_async_session() as session:
+        barbers = await get_active_barbers(session)
+
+    if not barbers:
+        await message.answer("Нет активных барберов для настройки шаблона")
+        return
+
+    await message.answer(
+        "Выберите барбера. Ему будет задан стандартный шаблон "
+        "(рабочие дни и часы барбершопа):",
+        reply_markup=barbers_for_schedule_keyboard(barbers)
+    )
+    await ScheduleStates.select_template_barber.set()
+
+
+async def apply_schedule_template(message: types.Message, state: FSMContext):
+    """Сохранение шаблона и построение расписания по нему"""
+    if message.text == "Отмена":
+        await message.answer("Отменено", reply_markup=schedule_menu_keyboard())
+        await state.finish()
+        return
+
+    try:
+        barber_id = int(message.text.split('[')[-1].replace(']', ''))
+    except ValueError:
+        await message.answer("Ошибка выбора барбера")
+        await state.finish()
+        return
+
+    today = datetime.now().date()
+    async with get_async_session() as session:
+        await set_schedule_template(session, barber_id)
+        created = await materialize_schedule(
+            session,
+            today,
+            today + timedelta(days=config.SCHEDULE_HORIZON_DAYS),
+            barber_id=barber_id
+        )
+
+    await message.answer(
+        f"Шаблон сохранен. Добавлено слотов на {config.SCHEDULE_HORIZON_DAYS} дней: {created}",
+        reply_markup=schedule_menu_keyboard()
+    )
+    await state.finish()
+
+
 # Вспомогательные функции
 def create_slots_keyboard(slots: list) -> types.InlineKeyboardMarkup:
     """Создает инлайн-клавиатуру для выбора слотов"""
@@ -226,6 +277,17 @@ def register_handlers(dp: Dispatcher):
         is_admin=True
     )
 
+    dp.register_message_handler(
+        setup_template_start,
+        text="Шаблоны",
+        is_admin=True
+    )
+
+    dp.register_message_handler(
+        apply_schedule_template,
+        state=ScheduleStates.select_template_barber
+    )
+
     dp.register_message_handler(
         select_day_for_schedule,
         state=ScheduleStates.select_barber
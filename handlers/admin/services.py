@@ -1,8 +1,8 @@
 from aiogram import types, Dispatcher
 from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher.filters.state import State, StatesGroup
-from database.queries import (
-    get_db_session,
+from database.async_queries import (
+    get_async_session,
     get_all_services,
     get_service_by_id,
     add_service,
@@ -112,8 +112,8 @@ async def confirm_add_service(message: types.Message, state: FSMContext):
         return
 
     async with state.proxy() as data:
-        with get_db_session() as session:
-            new_service = add_service(
+        async with get_async_session() as session:
+            new_service = await add_service(
                 session=session,
                 name=data['name'],
                 duration=data['duration'],
@@ -131,8 +131,8 @@ async def confirm_add_service(message: types.Message, state: FSMContext):
 # Удаление услуги
 async def delete_service_start(message: types.Message):
     """Начало процесса удаления услуги"""
-    with get_db_session() as session:
-        services = get_all_services(session)
+    async with get_async_session() as session:
+        services = await get_all_services(session)
 
     if not services:
         await message.answer("Нет доступных услуг для удаления")
@@ -160,15 +160,15 @@ async def process_service_deletion(message: types.Message, state: FSMContext):
         await message.answer("Пожалуйста, введите числовой ID!")
         return
 
-    with get_db_session() as session:
-        service = get_service_by_id(session, service_id)
+    async with get_async_session() as session:
+        service = await get_service_by_id(session, service_id)
         if not service:
             await message.answer("Услуга с таким ID не найдена!")
             await state.finish()
             return
 
         try:
-            success = delete_service(session, service_id)
+            success = await delete_service(session, service_id)
             if success:
                 await message.answer(
                     f"Услуга «{service.name}» полностью удалена!",
@@ -192,8 +192,8 @@ async def process_service_deletion(message: types.Message, state: FSMContext):
 # Просмотр списка услуг
 async def show_services_list(message: types.Message):
     """Показать список всех услуг"""
-    with get_db_session() as session:
-        services = get_all_services(session)
+    async with get_async_session() as session:
+        services = await get_all_services(session)
 
     if not services:
         await message.answer("Список услуг пуст")
@@ -1,26 +1,29 @@
 from aiogram import types, Dispatcher
 from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher.filters.state import State, StatesGroup
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from database.queries import (
-    get_db_session,
-    get_appointments_by_date,
-    get_appointment_by_id,
+from datetime import date, datetime, timedelta
+from typing import List
+from database.async_queries import (
+    get_async_session,
+    get_appointment_page,
+    get_appointment_row,
     cancel_appointment,
     confirm_appointment
 )
-from database.models import Appointment, Barber, Service
+from database.queries import AppointmentRow
 from keyboards.admin import (
     appointments_keyboard,
     appointment_actions_keyboard,
     confirm_keyboard,
     cancel_keyboard
 )
+from keyboards.builder import build_page_keyboard
 from utils.date_utils import (
     get_current_date,
-    format_appointment_date
+    format_appointment_date,
+    format_short_date
 )
+from utils.pagination import parse_page_callback
 
 
 class AppointmentStates(StatesGroup):
@@ -37,30 +40,18 @@ async def show_appointments_menu(message: types.Message):
     )
 
 
-async def show_week_appointments(message: types.Message):
-    """Показать записи на неделю вперед"""
-    with get_db_session() as session:
-        start_date = get_current_date()
-        end_date = start_date + timedelta(days=7)
-
-        appointments = session.query(Appointment).filter(
-            Appointment.date.between(start_date, end_date)
-        ).order_by(
-            Appointment.date,
-            Appointment.time_slot
-        ).all()
-
-    if not appointments:
-        await message.answer(
-            "На ближайшую неделю записей нет",
-            reply_markup=appointments_keyboard()
-        )
-        return
+def _week_range() -> tuple:
+    """Неделя вперед от сегодняшнего дня"""
+    start_date = get_current_date()
+    return start_date, start_date + timedelta(days=7)
+
 
+def format_week_page(appointments: List[AppointmentRow]) -> str:
+    """Текст страницы записей на неделю"""
     # Группируем записи по дням
     appointments_by_day = {}
     for app in appointments:
-        day = app.date.strftime("%d.%m.%Y")
+        day = format_short_date(app.date)
         if day not in appointments_by_day:
             appointments_by_day[day] = []
         appointments_by_day[day].append(app)
@@ -72,13 +63,29 @@ async def show_week_appointments(message: types.Message):
         for app in day_appointments:
             status_icon = "✅" if app.status == 'confirmed' else "🕒" if app.status == 'booked' else "❌"
             response.append(
-                f"{status_icon} {app.time_slot} - {app.barber.name}\n"
-                f"Услуга: {app.service.name} | ID: {app.id}"
+                f"{status_icon} {app.time_slot} - {app.barber_name}\n"
+                f"Услуга: {app.service_name} | ID: {app.id}"
             )
+    return "\n".join(response)
+
+
+async def show_week_appointments(message: types.Message):
+    """Показать записи на неделю вперед (постранично)"""
+    start_date, end_date = _week_range()
+
+    async with get_async_session() as session:
+        page = await get_appointment_page(session, str(start_date), str(end_date))
+
+    if not page.rows:
+        await message.answer(
+            "На ближайшую неделю записей нет",
+            reply_markup=appointments_keyboard()
+        )
+        return
 
     await message.answer(
-        "\n".join(response),
-        reply_markup=appointments_keyboard()
+        format_week_page(page.rows),
+        reply_markup=build_page_keyboard("w", page.prev_cursor, page.next_cursor) or appointments_keyboard()
     )
 
 
@@ -103,46 +110,98 @@ async def show_appointments_by_date(message: types.Message):
     await view_appointments_on_date(message, selected_date)
 
 
-async def view_appointments_on_date(message: types.Message, date: datetime.date):
-    """Показать записи на конкретную дату"""
-    with get_db_session() as session:
-        appointments = get_appointments_by_date(session, date)
-
-    if not appointments:
-        await message.answer(
-            f"На {format_appointment_date(date)} записей нет",
-            reply_markup=appointments_keyboard()
-        )
-        return
-
-    response = [f"📅 Записи на {format_appointment_date(date)}:\n"]
+def format_date_page(day: date, appointments: List[AppointmentRow]) -> str:
+    """Текст страницы записей на дату"""
+    response = [f"📅 Записи на {format_appointment_date(day)}:\n"]
     for app in appointments:
         status_icon = "✅" if app.status == 'confirmed' else "🕒" if app.status == 'booked' else "❌"
         response.append(
-            f"\n{status_icon} {app.time_slot} - {app.barber.name}\n"
-            f"Услуга: {app.service.name} ({app.service.price} руб.)\n"
+            f"\n{status_icon} {app.time_slot} - {app.barber_name}\n"
+            f"Услуга: {app.service_name} ({app.price} руб.)\n"
             f"ID записи: {app.id}"
         )
+    return "\n".join(response)
+
+
+def date_page_keyboard(day: date, page) -> types.InlineKeyboardMarkup:
+    """Действия с первой записью страницы и кнопки листания"""
+    return build_page_keyboard(
+        f"d{day.strftime('%Y%m%d')}",
+        page.prev_cursor,
+        page.next_cursor,
+        appointment_actions_keyboard(page.rows[0].id)
+    )
+
+
+async def view_appointments_on_date(message: types.Message, day: date):
+    """Показать записи на конкретную дату (постранично)"""
+    async with get_async_session() as session:
+        page = await get_appointment_page(session, str(day), str(day))
+
+    if not page.rows:
+        await message.answer(
+            f"На {format_appointment_date(day)} записей нет",
+            reply_markup=appointments_keyboard()
+        )
+        return
 
     await message.answer(
-        "\n".join(response),
-        reply_markup=appointment_actions_keyboard(appointments[0].id)
+        format_date_page(day, page.rows),
+        reply_markup=date_page_keyboard(day, page)
     )
 
 
+async def turn_appointments_page(callback: types.CallbackQuery):
+    """Листание списков записей на неделю/дату"""
+    request = parse_page_callback(callback.data)
+    if not request:
+        await callback.answer("Список устарел")
+        return
+
+    if request.listing == "w":
+        start_date, end_date = _week_range()
+    else:
+        start_date = end_date = datetime.strptime(request.listing[1:], "%Y%m%d").date()
+
+    async with get_async_session() as session:
+        page = await get_appointment_page(
+            session,
+            str(start_date),
+            str(end_date),
+            cursor=request.cursor,
+            backward=request.backward
+        )
+
+    if not page.rows:
+        await callback.answer("Записей больше нет")
+        return
+
+    if request.listing == "w":
+        text = format_week_page(page.rows)
+        keyboard = build_page_keyboard("w", page.prev_cursor, page.next_cursor)
+    else:
+        text = format_date_page(start_date, page.rows)
+        keyboard = date_page_keyboard(start_date, page)
+
+    await callback.message.edit_text(text, reply_markup=keyboard)
+    await callback.answer()
+
+
 async def handle_appointment_action(callback: types.CallbackQuery, state: FSMContext):
     """Обработка действий с записью"""
     action, appointment_id = callback.data.split(':')
     appointment_id = int(appointment_id)
 
-    with get_db_session() as session:
-        appointment = get_appointment_by_id(session, appointment_id)
+    async with get_async_session() as session:
+        appointment = await get_appointment_row(session, appointment_id)
         if not appointment:
             await callback.answer("Запись не найдена!")
             return
 
         if action == "confirm_app":
-            confirm_appointment(session, appointment_id)
+            if not await confirm_appointment(session, appointment_id):
+                await callback.answer(f"Запись ID {appointment_id} уже отменена или завершена")
+                return
             await callback.message.edit_text(
                 f"✅ Запись ID {appointment_id} подтверждена\n"
                 f"{format_appointment_details(appointment)}",
@@ -160,13 +219,14 @@ async def handle_appointment_action(callback: types.CallbackQuery, state: FSMCon
             await AppointmentStates.cancel_confirmation.set()
 
 
-def format_appointment_details(appointment: Appointment) -> str:
-    """Форматирование деталей записи"""
+def format_appointment_details(appointment: AppointmentRow) -> str:
+    """Форматирование деталей записи (плоская строка - без обращений к БД)"""
     return (
-        f"📅 {format_appointment_date(appointment.date)} {appointment.time_slot}\n"
-        f"🧔 Барбер: {appointment.barber.name}\n"
-        f"✂️ Услуга: {appointment.service.name}\n"
-        f"💰 Стоимость: {appointment.service.price} руб."
+        f"📅 {format_appointment_date(appointment.date)} "
+        f"{appointment.time_slot}\n"
+        f"🧔 Барбер: {appointment.barber_name}\n"
+        f"✂️ Услуга: {appointment.service_name}\n"
+        f"💰 Стоимость: {appointment.price} руб."
     )
 
 
@@ -180,9 +240,17 @@ async def confirm_appointment_cancellation(message: types.Message, state: FSMCon
     async with state.proxy() as data:
         appointment_id = data['appointment_id']
 
-    with get_db_session() as session:
-        appointment = get_appointment_by_id(session, appointment_id)
-        cancel_appointment(session, appointment_id)
+    async with get_async_session() as session:
+        appointment = await get_appointment_row(session, appointment_id)
+        canceled = await cancel_appointment(session, appointment_id)
+
+    if not canceled:
+        await message.answer(
+            f"Запись ID {appointment_id} уже отменена или завершена",
+            reply_markup=appointments_keyboard()
+        )
+        await state.finish()
+        return
 
     await message.answer(
         f"❌ Запись ID {appointment_id} отменена\n"
@@ -203,6 +271,11 @@ def register_handlers(dp: Dispatcher):
         text=["Сегодня", "Завтра", "Неделя"],
         is_admin=True
     )
+    dp.register_callback_query_handler(
+        turn_appointments_page,
+        lambda c: c.data.startswith(('apg:w:', 'apg:d')),
+        is_admin=True
+    )
     dp.register_callback_query_handler(
         handle_appointment_action,
         lambda c: c.data.startswith(('confirm_app:', 'cancel_app:')),
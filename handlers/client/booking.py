@@ -0,0 +1,328 @@
+from aiogram import types, Dispatcher
+from aiogram.dispatcher import FSMContext
+from datetime import datetime
+from database.async_queries import (
+    get_async_session,
+    get_active_barbers,
+    get_all_services,
+    get_barber_record,
+    get_service_record,
+    get_month_availability,
+    get_available_slots,
+    create_appointment
+)
+from database.queries import SlotTakenError, get_service_terms
+from keyboards.builder import (
+    build_barbers_keyboard,
+    build_services_keyboard,
+    build_calendar_keyboard,
+    build_time_slots_keyboard
+)
+from keyboards.client import confirm_appointment_keyboard, main_menu_keyboard
+from states.appointment_states import AppointmentStates
+from utils.formatting import format_appointment_date
+
+
+# Запись клиента: услуга и барбер -> день из календаря -> время -> подтверждение.
+# Барберы и услуги сужаются по карте barber_services, свободные дни и время
+# берутся из индекса свободного времени (get_month_availability, get_available_slots).
+
+
+# ====================== УСЛУГА И БАРБЕР ======================
+
+async def offer_barbers(message: types.Message, state: FSMContext, service_id: int) -> bool:
+    """Выбор барбера из тех, кто выполняет услугу (False - таких нет)"""
+    async with get_async_session() as session:
+        barbers = await get_active_barbers(session, service_id=service_id)
+
+    keyboard = build_barbers_keyboard(barbers, selected_service_id=service_id, with_back_button=False)
+    if not keyboard.inline_keyboard:
+        return False
+
+    await state.reset_data()
+    await message.answer("🧔 Выберите барбера:", reply_markup=keyboard)
+    await AppointmentStates.select_barber.set()
+    return True
+
+
+async def offer_services(message: types.Message, state: FSMContext, barber_id: int) -> bool:
+    """Выбор одной из услуг барбера с его ценами (False - услуг нет)"""
+    async with get_async_session() as session:
+        services = await get_all_services(session, barber_id=barber_id)
+
+    keyboard = build_services_keyboard(services, selected_barber_id=barber_id, with_back_button=False)
+    if not keyboard.inline_keyboard:
+        return False
+
+    await state.reset_data()
+    await message.answer("✂️ Выберите услугу:", reply_markup=keyboard)
+    await AppointmentStates.select_service.set()
+    return True
+
+
+async def book_service(callback: types.CallbackQuery, state: FSMContext):
+    """Запись на выбранную услугу"""
+    if not await offer_barbers(callback.message, state, int(callback.data.split(':')[1])):
+        await callback.answer("Эту услугу сейчас никто не выполняет")
+        return
+    await callback.answer()
+
+
+async def book_barber(callback: types.CallbackQuery, state: FSMContext):
+    """Запись к выбранному барберу"""
+    if not await offer_services(callback.message, state, int(callback.data.split(':')[1])):
+        await callback.answer("У барбера пока нет услуг для записи")
+        return
+    await callback.answer()
+
+
+async def choose_from_menu(message: types.Message, state: FSMContext):
+    """Кнопка услуги или барбера из меню клиента («✂️ Название» / «🧔 Имя»)"""
+    name = message.text.split(' ', 1)[1]
+    is_service = message.text.startswith("✂️")
+    async with get_async_session() as session:
+        records = await (get_all_services(session) if is_service else get_active_barbers(session))
+
+    record = next((record for record in records if record.name == name), None)
+    offer = offer_barbers if is_service else offer_services
+    if not record or not await offer(message, state, record.id):
+        await message.answer("Сейчас записаться на это нельзя, выберите другой пункт меню")
+
+
+async def process_barber_or_service(callback: types.CallbackQuery, state: FSMContext):
+    """Выбраны и барбер, и услуга - показываем календарь"""
+    kind, first_id, second_id = callback.data.split(':')
+    if kind == "select_barber":
+        barber_id, service_id = int(first_id), int(second_id)
+    else:
+        service_id, barber_id = int(first_id), int(second_id)
+
+    async with state.proxy() as data:
+        data['barber_id'] = barber_id
+        data['service_id'] = service_id
+
+    await show_calendar(callback, state)
+
+
+# ====================== ДЕНЬ И ВРЕМЯ ======================
+
+async def show_calendar(callback: types.CallbackQuery, state: FSMContext, year: int = None, month: int = None):
+    """Календарь, в котором выбираются только дни со свободным временем на услугу"""
+    now = datetime.now()
+    year = year or now.year
+    month = month or now.month
+
+    async with state.proxy() as data:
+        barber_id = data['barber_id']
+        service_id = data['service_id']
+
+    async with get_async_session() as session:
+        free_days = await get_month_availability(session, year, month, barber_id, service_id)
+
+    await callback.message.edit_text(
+        "📅 Выберите дату:" if free_days else "📅 В этом месяце свободного времени нет",
+        reply_markup=build_calendar_keyboard(year, month, free_days=free_days)
+    )
+    await AppointmentStates.select_date.set()
+    await callback.answer()
+
+
+async def turn_calendar(callback: types.CallbackQuery, state: FSMContext):
+    """Переход к предыдущему/следующему месяцу"""
+    direction, year, month = callback.data.split(':')
+    year, month = int(year), int(month)
+    if direction == "next_month":
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    else:
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+
+    if (year, month) < (datetime.now().year, datetime.now().month):
+        await callback.answer()
+        return
+    await show_calendar(callback, state, year, month)
+
+
+async def change_date(callback: types.CallbackQuery, state: FSMContext):
+    """Вернуться к календарю на месяц выбранной даты"""
+    async with state.proxy() as data:
+        day = datetime.strptime(data['date'], "%Y-%m-%d")
+    await show_calendar(callback, state, day.year, day.month)
+
+
+async def show_time_slots(callback: types.CallbackQuery, state: FSMContext, page: int = 0):
+    """Свободное время на выбранную дату"""
+    async with state.proxy() as data:
+        day = data['date']
+        barber_id = data['barber_id']
+        service_id = data['service_id']
+
+    async with get_async_session() as session:
+        slots = await get_available_slots(session, day, barber_id, service_id)
+
+    if not slots:
+        await callback.answer("На эту дату свободного времени уже нет")
+        return
+
+    await callback.message.edit_text(
+        f"⏰ Свободное время на {format_appointment_date(day)}:",
+        reply_markup=build_time_slots_keyboard(slots, datetime.strptime(day, "%Y-%m-%d"), page)
+    )
+    await AppointmentStates.select_time.set()
+    await callback.answer()
+
+
+async def process_date(callback: types.CallbackQuery, state: FSMContext):
+    """Выбор даты из календаря"""
+    async with state.proxy() as data:
+        data['date'] = callback.data.split(':')[1]
+    await show_time_slots(callback, state)
+
+
+async def turn_slots_page(callback: types.CallbackQuery, state: FSMContext):
+    """Листание свободного времени"""
+    await show_time_slots(callback, state, int(callback.data.split(':')[1]))
+
+
+async def process_slot(callback: types.CallbackQuery, state: FSMContext):
+    """Выбор времени - показываем детали записи на подтверждение"""
+    _, barber_id, start_min = callback.data.split(':')
+    barber_id, start_min = int(barber_id), int(start_min)
+
+    async with state.proxy() as data:
+        day = data['date']
+        service_id = data['service_id']
+
+    async with get_async_session() as session:
+        slots = await get_available_slots(session, day, barber_id, service_id)
+        barber = await get_barber_record(session, barber_id)
+        service = await get_service_record(session, service_id)
+
+    slot = next((slot for slot in slots if slot.start_min == start_min), None)
+    if not slot or not barber or not service:
+        await callback.answer("Это время уже занято, выберите другое")
+        return
+
+    async with state.proxy() as data:
+        data['barber_id'] = barber_id
+        data['time_slot'] = slot.time_slot
+
+    await callback.message.edit_text(
+        "Проверьте запись:\n\n"
+        f"📅 {format_appointment_date(day)} {slot.time_slot}\n"
+        f"🧔 Барбер: {barber.name}\n"
+        f"✂️ Услуга: {service.name}\n"
+        f"💰 Стоимость: {get_service_terms(barber_id, service)[1]} руб.",
+        reply_markup=confirm_appointment_keyboard()
+    )
+    await AppointmentStates.confirm_details.set()
+    await callback.answer()
+
+
+# ====================== ПОДТВЕРЖДЕНИЕ ======================
+
+async def confirm_booking(callback: types.CallbackQuery, state: FSMContext):
+    """Создание записи"""
+    async with state.proxy() as data:
+        day = data['date']
+        barber_id = data['barber_id']
+        service_id = data['service_id']
+        time_slot = data['time_slot']
+
+    try:
+        async with get_async_session() as session:
+            appointment = await create_appointment(
+                session,
+                callback.from_user.id,
+                barber_id,
+                service_id,
+                day,
+                time_slot
+            )
+            time_slot = appointment.time_slot
+    except SlotTakenError:
+        await callback.message.answer("Это время только что заняли, выберите другое")
+        await show_time_slots(callback, state)
+        return
+
+    await callback.message.edit_text(
+        f"✅ Вы записаны на {format_appointment_date(day)} {time_slot}\n"
+        "Напомним о визите заранее. Отменить запись можно в разделе «Мои записи»."
+    )
+    await state.finish()
+    await callback.answer()
+
+
+async def cancel_booking(callback: types.CallbackQuery, state: FSMContext):
+    """Отказ от записи на шаге подтверждения"""
+    await state.finish()
+    await callback.message.edit_text("Запись отменена")
+    await callback.message.answer("Главное меню:", reply_markup=main_menu_keyboard())
+    await callback.answer()
+
+
+async def ignore_callback(callback: types.CallbackQuery):
+    """Неактивные кнопки календаря"""
+    await callback.answer()
+
+
+def register_handlers(dp: Dispatcher):
+    dp.register_callback_query_handler(
+        book_service,
+        lambda c: c.data.startswith('book_service:'),
+        state='*'
+    )
+    dp.register_callback_query_handler(
+        book_barber,
+        lambda c: c.data.startswith('book_barber:'),
+        state='*'
+    )
+    dp.register_message_handler(
+        choose_from_menu,
+        lambda m: m.text and m.text.startswith(("✂️ ", "🧔 ")),
+        state='*'
+    )
+    dp.register_callback_query_handler(
+        process_barber_or_service,
+        lambda c: c.data.startswith(('select_barber:', 'select_service:')),
+        state=[AppointmentStates.select_barber, AppointmentStates.select_service]
+    )
+    dp.register_callback_query_handler(
+        turn_calendar,
+        lambda c: c.data.startswith(('prev_month:', 'next_month:')),
+        state=AppointmentStates.select_date
+    )
+    dp.register_callback_query_handler(
+        process_date,
+        lambda c: c.data.startswith('select_date:'),
+        state=AppointmentStates.select_date
+    )
+    dp.register_callback_query_handler(
+        turn_slots_page,
+        lambda c: c.data.startswith('slots_page:'),
+        state=AppointmentStates.select_time
+    )
+    dp.register_callback_query_handler(
+        change_date,
+        lambda c: c.data == 'change_date',
+        state=AppointmentStates.select_time
+    )
+    dp.register_callback_query_handler(
+        process_slot,
+        lambda c: c.data.startswith('select_slot:'),
+        state=AppointmentStates.select_time
+    )
+    dp.register_callback_query_handler(
+        confirm_booking,
+        lambda c: c.data == 'confirm_appointment',
+        state=AppointmentStates.confirm_details
+    )
+    dp.register_callback_query_handler(
+        cancel_booking,
+        lambda c: c.data == 'cancel_appointment',
+        state=AppointmentStates.confirm_details
+    )
+    dp.register_callback_query_handler(
+        ignore_callback,
+        lambda c: c.data == 'ignore',
+        state='*'
+    )
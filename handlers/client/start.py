@@ -1,27 +1,38 @@
 from aiogram import types, Dispatcher
 from aiogram.dispatcher import FSMContext
-from database.queries import get_db_session
+from database.async_queries import (
+    get_async_session,
+    get_active_barbers,
+    get_all_services,
+    get_appointment_page,
+    unblock_chat
+)
+from keyboards.builder import build_page_keyboard
 from keyboards.client import (
     main_menu_keyboard,
     services_menu_keyboard,
-    barbers_menu_keyboard
+    barbers_menu_keyboard,
+    my_appointments_keyboard
 )
 from utils.notifications import send_welcome_message
+from utils.pagination import parse_page_callback
 
 
 async def cmd_start(message: types.Message):
     """Обработчик команды /start"""
+    # Пользователь снова пишет боту - рассылки до него опять доходят
+    async with get_async_session() as session:
+        await unblock_chat(session, message.chat.id)
+
     await send_welcome_message(message)
 
-    with get_db_session() as session:
-        # Проверяем, есть ли пользователь в базе
-        # Здесь может быть ваша логика проверки/регистрации пользователя
+    # Здесь может быть ваша логика проверки/регистрации пользователя
 
-        await message.answer(
-            "🪒 Добро пожаловать в наш барбершоп!\n\n"
-            "Выберите действие в меню ниже:",
-            reply_markup=main_menu_keyboard()
-        )
+    await message.answer(
+        "🪒 Добро пожаловать в наш барбершоп!\n\n"
+        "Выберите действие в меню ниже:",
+        reply_markup=main_menu_keyboard()
+    )
 
 
 async def show_main_menu(message: types.Message):
@@ -34,23 +45,70 @@ async def show_main_menu(message: types.Message):
 
 async def show_services_menu(message: types.Message):
     """Показать меню услуг"""
-    with get_db_session() as session:
-        # Здесь можно получить список услуг из базы
-        await message.answer(
-            "✂️ Наши услуги:",
-            reply_mup=services_menu_keyboard()
-        )
+    async with get_async_session() as session:
+        services = await get_all_services(session)
+
+    await message.answer(
+        "✂️ Наши услуги:",
+        reply_markup=services_menu_keyboard(services)
+    )
 
 
 async def show_barbers_menu(message: types.Message):
     """Показать меню барберов"""
-    with get_db_session() as session:
-        # Здесь можно получить список барберов из базы
-        await message.answer(
-            "🧔 Наши барберы:",
-            reply_markup=barbers_menu_keyboard()
+    async with get_async_session() as session:
+        barbers = await get_active_barbers(session)
+
+    await message.answer(
+        "🧔 Наши барберы:",
+        reply_markup=barbers_menu_keyboard(barbers)
+    )
+
+
+async def show_my_appointments(message: types.Message):
+    """Показать историю записей клиента (новые первыми, постранично)"""
+    async with get_async_session() as session:
+        page = await get_appointment_page(session, user_id=message.from_user.id, descending=True)
+
+    if not page.rows:
+        await message.answer("У вас пока нет записей")
+        return
+
+    await message.answer(
+        "📅 Ваши записи:",
+        reply_markup=build_page_keyboard(
+            "u", page.prev_cursor, page.next_cursor, my_appointments_keyboard(page.rows)
+        )
+    )
+
+
+async def turn_my_appointments_page(callback: types.CallbackQuery):
+    """Листание истории записей клиента"""
+    request = parse_page_callback(callback.data)
+    if not request:
+        await callback.answer("Список устарел")
+        return
+
+    async with get_async_session() as session:
+        page = await get_appointment_page(
+            session,
+            user_id=callback.from_user.id,
+            cursor=request.cursor,
+            backward=request.backward,
+            descending=True
         )
 
+    if not page.rows:
+        await callback.answer("Записей больше нет")
+        return
+
+    await callback.message.edit_reply_markup(
+        reply_markup=build_page_keyboard(
+            "u", page.prev_cursor, page.next_cursor, my_appointments_keyboard(page.rows)
+        )
+    )
+    await callback.answer()
+
 
 async def show_contacts(message: types.Message):
     """Показать контакты"""
@@ -84,17 +142,27 @@ def register_handlers(dp: Dispatcher):
     )
     dp.register_message_handler(
         show_main_menu,
-        text="Главное меню",
+        text=["Главное меню", "🏠 Главное меню"],
         state='*'
     )
     dp.register_message_handler(
         show_services_menu,
-        text="Услуги",
+        text=["Услуги", "✂️ Услуги"],
         state='*'
     )
     dp.register_message_handler(
         show_barbers_menu,
-        text="Барберы",
+        text=["Барберы", "🧔 Барберы"],
+        state='*'
+    )
+    dp.register_message_handler(
+        show_my_appointments,
+        text="📅 Мои записи",
+        state='*'
+    )
+    dp.register_callback_query_handler(
+        turn_my_appointments_page,
+        lambda c: c.data.startswith('apg:u:'),
         state='*'
     )
     dp.register_message_handler(
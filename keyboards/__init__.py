@@ -27,7 +27,8 @@ from .admin import (
 from .builder import (
     build_time_slots_keyboard,
     build_barbers_keyboard,
-    build_services_keyboard
+    build_services_keyboard,
+    build_page_keyboard
 )
 
 __all__ = [
@@ -64,5 +65,6 @@ __all__ = [
     # Билдеры клавиатур
     'build_time_slots_keyboard',
     'build_barbers_keyboard',
-    'build_services_keyboard'
+    'build_services_keyboard',
+    'build_page_keyboard'
 ]
\ No newline at end of file
@@ -4,8 +4,10 @@ from aiogram.types import (
     InlineKeyboardMarkup,
     InlineKeyboardButton
 )
-from database.queries import get_db_session, get_active_barbers, get_all_services
+from typing import List
+from database.models import Barber, Service
 from datetime import datetime, timedelta
+from utils.formatting import format_day_button, format_short_date
 
 
 # ====================== ГЛАВНЫЕ МЕНЮ ======================
@@ -47,11 +49,8 @@ def barbers_keyboard():
     )
 
 
-def barbers_for_schedule_keyboard():
+def barbers_for_schedule_keyboard(barbers: List[Barber]):
     """Клавиатура выбора барберов для расписания"""
-    with get_db_session() as session:
-        barbers = get_active_barbers(session)
-
     keyboard = ReplyKeyboardMarkup(resize_keyboard=True)
     for barber in barbers:
         keyboard.add(KeyboardButton(f"{barber.name} [{barber.id}]"))
@@ -107,7 +106,7 @@ def days_keyboard(days: list):
     """Клавиатура выбора дней"""
     keyboard = ReplyKeyboardMarkup(resize_keyboard=True)
     for day in days:
-        keyboard.add(KeyboardButton(day.strftime("%a, %d.%m")))  # "Пн, 15.01"
+        keyboard.add(KeyboardButton(format_day_button(day)))  # "Пн, 15.01"
     keyboard.add(KeyboardButton("Другой день"))
     keyboard.add(KeyboardButton("Отмена"))
     return keyboard
@@ -153,11 +152,8 @@ def appointments_keyboard():
     )
 
 
-def barbers_filter_keyboard():
+def barbers_filter_keyboard(barbers: List[Barber]):
     """Клавиатура фильтрации по барберам"""
-    with get_db_session() as session:
-        barbers = get_active_barbers(session)
-
     keyboard = ReplyKeyboardMarkup(resize_keyboard=True)
     for barber in barbers:
         keyboard.add(KeyboardButton(f"{barber.name} [{barber.id}]"))
@@ -166,11 +162,8 @@ def barbers_filter_keyboard():
     return keyboard
 
 
-def services_filter_keyboard():
+def services_filter_keyboard(services: List[Service]):
     """Клавиатура фильтрации по услугам"""
-    with get_db_session() as session:
-        services = get_all_services(session)
-
     keyboard = ReplyKeyboardMarkup(resize_keyboard=True)
     for service in services:
         keyboard.add(KeyboardButton(f"{service.name} [{service.id}]"))
@@ -184,7 +177,7 @@ def date_selection_keyboard(days_ahead: int = 7):
     dates = [datetime.now() + timedelta(days=i) for i in range(1, days_ahead + 1)]
     keyboard = ReplyKeyboardMarkup(resize_keyboard=True)
     for date in dates:
-        keyboard.add(KeyboardButton(date.strftime("%d.%m.%Y")))
+        keyboard.add(KeyboardButton(format_short_date(date)))
     keyboard.add(KeyboardButton("Отмена"))
     return keyboard
 
@@ -234,6 +227,15 @@ def cancel_keyboard():
     )
 
 
+def skip_keyboard():
+    """Клавиатура необязательного шага"""
+    return ReplyKeyboardMarkup(
+        keyboard=[[KeyboardButton("Пропустить"), KeyboardButton("Отмена")]],
+        resize_keyboard=True,
+        one_time_keyboard=True
+    )
+
+
 def back_keyboard():
     """Кнопка назад"""
     return ReplyKeyboardMarkup(
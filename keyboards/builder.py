@@ -1,11 +1,15 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from typing import List, Dict, Optional
-from database.models import Barber, Service, Schedule
+from typing import List, Dict, Optional, Tuple
+from database.models import Barber, Service
+from database.slot_cache import SlotRecord
+from database.catalog import service_barber_map
+from utils.formatting import WEEKDAYS_SHORT, format_month_title
+from utils.pagination import page_callback
 from datetime import datetime, timedelta
 
 
 def build_time_slots_keyboard(
-        available_slots: List[Schedule],
+        available_slots: List[SlotRecord],
         selected_date: datetime,
         page: int = 0,
         slots_per_page: int = 6
@@ -13,7 +17,7 @@ def build_time_slots_keyboard(
     """
     Строит инлайн-клавиатуру для выбора времени с пагинацией
 
-    :param available_slots: Список доступных слотов
+    :param available_slots: Список доступных слотов (get_available_slots)
     :param selected_date: Выбранная дата
     :param page: Текущая страница
     :param slots_per_page: Количество слотов на странице
@@ -31,7 +35,7 @@ def build_time_slots_keyboard(
         keyboard.insert(
             InlineKeyboardButton(
                 text=slot.time_slot.split('-')[0],
-                callback_data=f"select_slot:{slot.id}"
+                callback_data=f"select_slot:{slot.barber_id}:{slot.start_min}"
             )
         )
 
@@ -75,7 +79,7 @@ def build_barbers_keyboard(
     """
     Строит инлайн-клавиатуру для выбора барбера
 
-    :param barbers: Список объектов Barber
+    :param barbers: Список барберов (уже отобранных по услуге)
     :param selected_service_id: ID выбранной услуги (для callback)
     :param with_back_button: Добавить кнопку "Назад"
     :return: Объект InlineKeyboardMarkup
@@ -113,8 +117,8 @@ def build_services_keyboard(
     """
     Строит инлайн-клавиатуру для выбора услуги
 
-    :param services: Список объектов Service
-    :param selected_barber_id: ID выбранного барбера (для callback)
+    :param services: Список услуг (уже отобранных по барберу)
+    :param selected_barber_id: ID выбранного барбера (для callback и цен барбера)
     :param with_back_button: Добавить кнопку "Назад"
     :return: Объект InlineKeyboardMarkup
     """
@@ -122,12 +126,15 @@ def build_services_keyboard(
 
     for service in services:
         callback_data = f"select_service:{service.id}"
+        price = service.price
         if selected_barber_id:
             callback_data += f":{selected_barber_id}"
+            # Индивидуальная цена барбера, если задана
+            price = service_barber_map.terms(selected_barber_id, service.id)[1] or price
 
         keyboard.insert(
             InlineKeyboardButton(
-                text=f"✂️ {service.name} ({service.price} руб.)",
+                text=f"✂️ {service.name} ({price} руб.)",
                 callback_data=callback_data
             )
         )
@@ -146,7 +153,8 @@ def build_services_keyboard(
 def build_calendar_keyboard(
         year: int = None,
         month: int = None,
-        ignore_past_dates: bool = True
+        ignore_past_dates: bool = True,
+        free_days: Optional[Dict[str, int]] = None
 ) -> InlineKeyboardMarkup:
     """
     Строит клавиатуру-календарь для выбора даты
@@ -154,6 +162,8 @@ def build_calendar_keyboard(
     :param year: Год (если None - текущий)
     :param month: Месяц (если None - текущий)
     :param ignore_past_dates: Игнорировать прошедшие даты
+    :param free_days: Свободные дни {'YYYY-MM-DD': вариантов} (get_month_availability);
+        если задан, остальные дни не выбираются
     :return: Объект InlineKeyboardMarkup
     """
     now = datetime.now()
@@ -163,25 +173,19 @@ def build_calendar_keyboard(
     keyboard = InlineKeyboardMarkup(row_width=7)
 
     # Заголовок с месяцем и годом
-    month_name = [
-        "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
-        "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"
-    ][month - 1]
-
     keyboard.row(
         InlineKeyboardButton(
-            text=f"{month_name} {year}",
+            text=format_month_title(year, month),
             callback_data="ignore"
         )
     )
 
     # Дни недели
-    week_days = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
     keyboard.row(*[
         InlineKeyboardButton(
             text=day,
             callback_data="ignore"
-        ) for day in week_days
+        ) for day in WEEKDAYS_SHORT
     ])
 
     # Даты
@@ -207,7 +211,7 @@ def build_calendar_keyboard(
     for day in range(1, last_day.day + 1):
         date = datetime(year, month, day).date()
 
-        if date >= current_date:
+        if date >= current_date and (free_days is None or str(date) in free_days):
             keyboard.insert(
                 InlineKeyboardButton(
                     text=str(day),
@@ -234,4 +238,43 @@ def build_calendar_keyboard(
         )
     )
 
-    return keyboard
\ No newline at end of file
+    return keyboard
+
+
+def build_page_keyboard(
+        listing: str,
+        prev_cursor: Optional[Tuple[str, int, int]],
+        next_cursor: Optional[Tuple[str, int, int]],
+        keyboard: Optional[InlineKeyboardMarkup] = None
+) -> Optional[InlineKeyboardMarkup]:
+    """
+    Добавляет кнопки листания списка записей (пагинация по курсору)
+
+    :param listing: Код списка в callback (см. utils/pagination.py)
+    :param prev_cursor: Курсор предыдущей страницы или None
+    :param next_cursor: Курсор следующей страницы или None
+    :param keyboard: Клавиатура, к которой добавить ряд (по умолчанию новая)
+    :return: Объект InlineKeyboardMarkup или None, если листать некуда и клавиатуры нет
+    """
+    pagination_row = []
+    if prev_cursor:
+        pagination_row.append(
+            InlineKeyboardButton(
+                text="⬅️ Назад",
+                callback_data=page_callback(listing, True, prev_cursor)
+            )
+        )
+
+    if next_cursor:
+        pagination_row.append(
+            InlineKeyboardButton(
+                text="Вперед ➡️",
+                callback_data=page_callback(listing, False, next_cursor)
+            )
+        )
+
+    if pagination_row:
+        keyboard = keyboard or InlineKeyboardMarkup()
+        keyboard.row(*pagination_row)
+
+    return keyboard
@@ -5,7 +5,9 @@ from aiogram.types import (
     InlineKeyboardButton
 )
 from datetime import datetime, timedelta
-from database.queries import get_db_session, get_active_barbers, get_all_services
+from typing import List
+from database.models import Barber, Service
+from utils.formatting import format_day_button
 
 
 # ====================== ОСНОВНЫЕ МЕНЮ ======================
@@ -33,11 +35,8 @@ def back_to_main_keyboard():
 
 # ====================== МЕНЮ УСЛУГ ======================
 
-def services_menu_keyboard():
+def services_menu_keyboard(services: List[Service]):
     """Меню выбора услуг"""
-    with get_db_session() as session:
-        services = get_all_services(session)
-
     keyboard = ReplyKeyboardMarkup(resize_keyboard=True)
 
     # Добавляем услуги по 2 в ряд
@@ -59,11 +58,8 @@ def service_details_keyboard(service_id: int):
 
 # ====================== МЕНЮ БАРБЕРОВ ======================
 
-def barbers_menu_keyboard():
+def barbers_menu_keyboard(barbers: List[Barber]):
     """Меню выбора барберов"""
-    with get_db_session() as session:
-        barbers = get_active_barbers(session)
-
     keyboard = ReplyKeyboardMarkup(resize_keyboard=True)
 
     # Добавляем барберов по 2 в ряд
@@ -130,7 +126,7 @@ def my_appointments_keyboard(appointments: list):
 
     for app in appointments:
         keyboard.add(InlineKeyboardButton(
-            text=f"{app.date} {app.time_slot} - {app.service.name}",
+            text=f"{format_day_button(app.date)} {app.time_slot} - {app.service_name}",
             callback_data=f"appointment_{app.id}"
         ))
 
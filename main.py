@@ -1,11 +1,23 @@
 import logging
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.client.default import DefaultBotProperties
 from config import config
 from handlers import register_all_handlers
-from database.db import init_db
+from states.storage import SQLiteStorage
+from database.db import (
+    init_db,
+    init_engine,
+    dispose_engine,
+    init_async_engine,
+    dispose_async_engine
+)
+from database.async_queries import (
+    get_async_session,
+    load_availability,
+    load_service_barber_map
+)
+from utils.jobs import start_background_jobs, stop_background_jobs
 import asyncio
 
 # Настройка логирования
@@ -19,17 +31,30 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Состояния диалогов переживают перезапуск (таблица fsm_states)
+storage = SQLiteStorage()
+
 
 async def on_startup(bot: Bot):
     """Действия при запуске бота"""
     logger.info("Бот запускается...")
-    await init_db()  # Инициализация базы данных
+    init_db()  # Инициализация базы данных
+    init_engine()  # Общий пул соединений на весь процесс
+    init_async_engine()  # Асинхронный пул для обработчиков
+    async with get_async_session() as session:
+        await load_availability(session)  # Битовые маски свободных слотов
+        await load_service_barber_map(session)  # Карта барбер <-> услуга
+    start_background_jobs(bot)  # Напоминания, расписание по шаблонам и прочие фоновые задачи
     logger.info("Бот успешно запущен")
 
 
 async def on_shutdown(bot: Bot):
     """Действия при остановке бота"""
     logger.info("Бот останавливается...")
+    await stop_background_jobs()
+    await storage.close()  # Несохранённые изменения диалогов - в БД до закрытия пула
+    await dispose_async_engine()
+    dispose_engine()
     logger.info("Бот успешно остановлен")
 
 
@@ -43,14 +68,16 @@ async def main():
         )
 
         # Инициализация диспетчера с хранилищем состояний
-        dp = Dispatcher(storage=MemoryStorage())
+        dp = Dispatcher(storage=storage)
 
         # Регистрация обработчиков
         register_all_handlers(dp)
+        dp.startup.register(on_startup)
+        dp.shutdown.register(on_shutdown)
 
         # Запуск бота
         await bot.delete_webhook(drop_pending_updates=True)
-        await dp.start_polling(bot, on_startup=on_startup, on_shutdown=on_shutdown)
+        await dp.start_polling(bot)
 
     except Exception as e:
         logger.critical(f"Ошибка при запуске бота: {e}")
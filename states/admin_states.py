@@ -16,8 +16,10 @@ class BarberAddStates(StatesGroup):
     waiting_for_name = State()
     waiting_for_description = State()
     waiting_for_photo = State()
+    waiting_for_telegram_id = State()
     waiting_for_confirmation = State()
     waiting_for_deletion = State()
+    waiting_for_new_telegram_id = State()
 
 class ServiceManagementStates(StatesGroup):
     """Состояния управления услугами"""
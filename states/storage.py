@@ -0,0 +1,301 @@
+"""
+Хранилище состояний FSM в SQLite (таблица fsm_states) вместо MemoryStorage.
+
+Чтение - из LRU-кэша в памяти (не больше FSM_CACHE_SIZE диалогов); промах
+читает одну строку из БД, отсутствие диалога тоже кэшируется, поэтому
+сообщения пользователей вне диалога не ходят в БД. Запись меняет кэш сразу,
+а в БД попадает пачкой: фоновая задача раз в FSM_FLUSH_INTERVAL секунд
+(или при накоплении FSM_FLUSH_BATCH изменений) сбрасывает последние версии
+изменённых диалогов одной транзакцией - несколько изменений одного диалога
+между сбросами дают одну запись.
+
+Диалог, не менявшийся дольше FSM_TTL, сбрасывается: срок простоя каждого
+диалога стоит в колесе таймеров (utils/timing_wheel.py), и раз в
+FSM_SWEEP_TICK секунд истёкшие диалоги убираются из памяти и из БД без
+просмотра всех остальных. Строки, не загружавшиеся в этот процесс (например,
+оставшиеся с прошлого запуска), периодически удаляются запросом по updated_at.
+После перезапуска незавершённые диалоги продолжаются с того же шага (теряются
+только изменения последнего интервала записи).
+
+conversation_stats() показывает число живых диалогов и примерный объём
+их данных в памяти по группам состояний.
+"""
+from collections import OrderedDict
+from math import ceil
+from typing import Any, Dict, Mapping, Optional
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from config import config
+from database.async_queries import (
+    get_async_session,
+    load_fsm_record,
+    save_fsm_records,
+    purge_fsm_records
+)
+from utils.timing_wheel import TimingWheel
+import asyncio
+import json
+import logging
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    """Диалог в кэше: состояние, данные и их JSON для записи в БД"""
+
+    __slots__ = ("state", "data", "data_json", "updated")
+
+    def __init__(self, state: Optional[str], data: Dict[str, Any], data_json: Optional[str], updated: float):
+        self.state = state
+        self.data = data
+        self.data_json = data_json
+        self.updated = updated
+
+    @property
+    def is_empty(self) -> bool:
+        return self.state is None and not self.data
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM-хранилище: LRU-кэш в памяти + отложенная пакетная запись в SQLite"""
+
+    def __init__(
+            self,
+            ttl: float = config.FSM_TTL,
+            cache_size: int = config.FSM_CACHE_SIZE,
+            flush_interval: float = config.FSM_FLUSH_INTERVAL,
+            flush_batch: int = config.FSM_FLUSH_BATCH,
+            purge_interval: float = config.FSM_PURGE_INTERVAL,
+            sweep_tick: float = config.FSM_SWEEP_TICK
+    ):
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.purge_interval = purge_interval
+        self.sweep_tick = sweep_tick
+
+        self._cache: "OrderedDict[str, _Entry]" = OrderedDict()
+        # Изменённые, но ещё не записанные диалоги (главнее кэша и БД)
+        self._dirty: Dict[str, _Entry] = {}
+        self._wakeup = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        self._last_purge = time.time()
+        # Сроки простоя живых диалогов; оборот колеса покрывает ttl целиком
+        self._wheel = TimingWheel(sweep_tick, ceil(ttl / sweep_tick) + 1)
+        self._last_sweep = time.time()
+
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+        self.expired = 0
+
+    # ---------- ключи и записи ----------
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        parts = (
+            key.bot_id,
+            key.chat_id,
+            key.user_id,
+            key.thread_id,
+            getattr(key, "business_connection_id", None),
+            key.destiny,
+        )
+        return ":".join("" if part is None else str(part) for part in parts)
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return not entry.is_empty and entry.updated + self.ttl <= now
+
+    def _remember(self, key: str, entry: _Entry):
+        """Положить в LRU; вытесненные несохранённые диалоги остаются в _dirty"""
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _entry(self, key: str) -> _Entry:
+        entry = self._dirty.get(key) or self._cache.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._remember(key, entry)
+        else:
+            self.misses += 1
+            async with get_async_session() as session:
+                row = await load_fsm_record(session, key)
+
+            # Пока шёл запрос, диалог могли изменить - свежая версия главнее
+            entry = self._dirty.get(key) or self._cache.get(key)
+            if entry is None:
+                if row is None:
+                    entry = _Entry(None, {}, None, 0.0)
+                else:
+                    state, data_json, updated = row
+                    entry = _Entry(state, json.loads(data_json) if data_json else {}, data_json, updated)
+                    self._schedule_expiry(key, entry)
+                self._remember(key, entry)
+
+        now = time.time()
+        if self._expired(entry, now):
+            # Простаивал дольше ttl - начинаем диалог заново
+            entry = _Entry(None, {}, None, now)
+            self._write(key, entry)
+        return entry
+
+    def _write(self, key: str, entry: _Entry):
+        self._remember(key, entry)
+        self._dirty[key] = entry
+        self._schedule_expiry(key, entry)
+        if len(self._dirty) >= self.flush_batch:
+            self._wakeup.set()
+
+    def _schedule_expiry(self, key: str, entry: _Entry):
+        if entry.is_empty:
+            self._wheel.cancel(key)
+        else:
+            self._wheel.schedule(key, entry.updated + self.ttl)
+        self._start()
+
+    # ---------- интерфейс BaseStorage ----------
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        k = self._key(key)
+        entry = await self._entry(k)
+        state = state.state if isinstance(state, State) else state
+        self._write(k, _Entry(state, entry.data, entry.data_json, time.time()))
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._entry(self._key(key))).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        k = self._key(key)
+        entry = await self._entry(k)
+        data = dict(data)
+        # Сериализуем сразу: несериализуемое значение - ошибка в обработчике, а не при записи пачки
+        data_json = json.dumps(data, ensure_ascii=False) if data else None
+        self._write(k, _Entry(entry.state, data, data_json, time.time()))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return dict((await self._entry(self._key(key))).data)
+
+    async def close(self) -> None:
+        """Остановить фоновую запись и сохранить всё несохранённое"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+
+    # ---------- запись в БД ----------
+
+    def _start(self):
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                if time.time() - self._last_sweep >= self.sweep_tick:
+                    self.sweep()
+                await self.flush()
+                if time.time() - self._last_purge >= self.purge_interval:
+                    await self.purge()
+                    logger.info(f"FSM conversations: {self.conversation_stats()}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error flushing FSM storage: {e}")
+
+    async def flush(self) -> int:
+        """Записать изменённые диалоги одной транзакцией, вернуть их число"""
+        if not self._dirty:
+            return 0
+
+        batch, self._dirty = self._dirty, {}
+        rows = [
+            {"key": key, "state": entry.state, "data": entry.data_json, "updated_at": entry.updated}
+            for key, entry in batch.items() if not entry.is_empty
+        ]
+        deleted = [key for key, entry in batch.items() if entry.is_empty]
+        try:
+            async with get_async_session() as session:
+                await save_fsm_records(session, rows, deleted)
+        except BaseException:
+            # Не записалось - вернём в очередь (более поздние изменения главнее)
+            for key, entry in batch.items():
+                self._dirty.setdefault(key, entry)
+            raise
+
+        self.flushes += 1
+        return len(batch)
+
+    def sweep(self, now: float = None) -> int:
+        """Сбросить диалоги, у которых истёк срок простоя (удаление из БД - при записи)"""
+        now = time.time() if now is None else now
+        self._last_sweep = now
+        expired = 0
+        for key in self._wheel.advance(now):
+            entry = self._dirty.get(key) or self._cache.get(key)
+            if entry is not None and not self._expired(entry, now):
+                continue
+            self._cache.pop(key, None)
+            self._dirty[key] = _Entry(None, {}, None, now)
+            expired += 1
+
+        if expired:
+            self.expired += expired
+            logger.info(f"Idle FSM conversations expired: {expired}, live: {len(self._wheel)}")
+        return expired
+
+    async def purge(self) -> int:
+        """Удалить из БД диалоги, простаивающие дольше ttl"""
+        self._last_purge = time.time()
+        async with get_async_session() as session:
+            deleted = await purge_fsm_records(session, self._last_purge - self.ttl)
+        if deleted:
+            logger.info(f"Expired FSM states purged: {deleted}")
+        return deleted
+
+    def stats(self) -> Dict[str, int]:
+        """Живые диалоги, размер кэша, очередь записи и попадания в кэш"""
+        return {
+            "live": len(self._wheel),
+            "cached": len(self._cache),
+            "dirty": len(self._dirty),
+            "hits": self.hits,
+            "misses": self.misses,
+            "flushes": self.flushes,
+            "expired": self.expired,
+        }
+
+    def conversation_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Диалоги в памяти по группам состояний: {группа: {conversations, bytes}}.
+
+        bytes - примерный объём: ключ, состояние, словарь данных и его JSON
+        (sys.getsizeof без обхода вложенных объектов).
+        """
+        groups: Dict[str, Dict[str, int]] = {}
+        entries = dict(self._cache)
+        entries.update(self._dirty)
+        for key, entry in entries.items():
+            if entry.is_empty:
+                continue
+            group = entry.state.split(':', 1)[0] if entry.state else "-"
+            totals = groups.setdefault(group, {"conversations": 0, "bytes": 0})
+            totals["conversations"] += 1
+            totals["bytes"] += (
+                sys.getsizeof(key)
+                + sys.getsizeof(entry.state)
+                + sys.getsizeof(entry.data)
+                + sys.getsizeof(entry.data_json)
+            )
+        return groups
@@ -0,0 +1,98 @@
+"""
+Списки записей не должны делать запрос на каждую строку (N+1).
+
+Каждый список читается при N записях и должен уложиться в один SQL-запрос
+вместе с обращением к именам барберов и услуг.
+"""
+import os
+from datetime import date, timedelta
+
+# config проверяет обязательные настройки при импорте
+os.environ.setdefault("BOT_TOKEN", "test")
+os.environ.setdefault("ADMIN_IDS", "0")
+# Временная база без архива
+os.environ["ARCHIVE_DB_PATH"] = ""
+
+import pytest  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from database.db import assert_max_queries  # noqa: E402
+from database.models import Base, Appointment, Barber, Service  # noqa: E402
+from database.queries import (  # noqa: E402
+    get_appointment_rows,
+    get_appointment_page,
+    get_user_appointments,
+    get_daily_agenda
+)
+
+APPOINTMENTS = 30
+USER_ID = 42
+
+
+@pytest.fixture
+def seeded(tmp_path):
+    """Временная БД с APPOINTMENTS записями одного клиента к трём барберам на завтра"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'queries.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+
+    session.add_all(
+        Barber(id=i, name=f"Барбер {i}", telegram_id=1000 + i) for i in range(1, 4)
+    )
+    session.add_all(
+        Service(id=i, name=f"Услуга {i}", duration=30, price=500 + 100 * i) for i in range(1, 4)
+    )
+    day = str(date.today() + timedelta(days=1))
+    for i in range(APPOINTMENTS):
+        start_min = 600 + 30 * (i // 3)
+        session.add(Appointment(
+            user_id=USER_ID,
+            barber_id=i % 3 + 1,
+            service_id=i % 3 + 1,
+            date=day,
+            time_slot=f"{start_min // 60:02d}:{start_min % 60:02d}-"
+                      f"{(start_min + 30) // 60:02d}:{(start_min + 30) % 60:02d}",
+            start_min=start_min,
+            end_min=start_min + 30,
+            status='booked',
+            price=600
+        ))
+    session.commit()
+    session.expire_all()
+
+    yield session, engine, day
+
+    session.close()
+    engine.dispose()
+
+
+def test_appointment_rows_single_query(seeded):
+    session, engine, day = seeded
+    with assert_max_queries(1, engine):
+        rows = get_appointment_rows(session, day)
+        names = [(row.barber_name, row.service_name) for row in rows]
+    assert len(names) == APPOINTMENTS
+
+
+def test_appointment_page_single_query(seeded):
+    session, engine, day = seeded
+    with assert_max_queries(1, engine):
+        page = get_appointment_page(session, day, day, limit=10)
+        names = [(row.barber_name, row.service_name) for row in page.rows]
+    assert len(names) == 10
+
+
+def test_user_appointments_single_query(seeded):
+    session, engine, day = seeded
+    with assert_max_queries(1, engine):
+        appointments = get_user_appointments(session, USER_ID)
+        names = [(appointment.barber.name, appointment.service.name) for appointment in appointments]
+    assert len(names) == APPOINTMENTS
+
+
+def test_daily_agenda_single_query(seeded):
+    session, engine, day = seeded
+    with assert_max_queries(1, engine):
+        agenda = get_daily_agenda(session, day)
+    assert len(agenda) == APPOINTMENTS
+    assert {row.telegram_id for row in agenda} == {1001, 1002, 1003}
@@ -1,11 +1,17 @@
 from datetime import datetime, timedelta, date
 from typing import List, Tuple, Optional
-from config import WORK_START, WORK_END, WORK_DAYS
+from zoneinfo import ZoneInfo
+from config import config
+from utils import formatting
+from utils.formatting import DateLike
 import calendar
-import locale
 
-# Устанавливаем локаль для корректного отображения названий дней недели
-locale.setlocale(locale.LC_TIME, 'ru_RU.UTF-8')
+WORK_START = config.WORK_START
+WORK_END = config.WORK_END
+WORK_DAYS = config.WORK_DAYS
+
+# Часовой пояс барбершопа: даты и время записей - местные
+SHOP_TZ = ZoneInfo(config.TIMEZONE)
 
 
 def get_current_date() -> date:
@@ -18,17 +24,22 @@ def get_current_datetime() -> datetime:
     return datetime.now()
 
 
-def format_appointment_date(dt: date) -> str:
+def get_shop_datetime() -> datetime:
+    """Текущие дата и время барбершопа (config.TIMEZONE), независимо от пояса сервера"""
+    return datetime.now(SHOP_TZ)
+
+
+def format_appointment_date(dt: DateLike) -> str:
     """
-    Форматировать дату для отображения
+    Форматировать дату для отображения (date, datetime или 'YYYY-MM-DD')
     Пример: "12 мая, пятница"
     """
-    return dt.strftime("%d %B, %A").lower()
+    return formatting.format_appointment_date(dt)
 
 
-def format_short_date(dt: date) -> str:
+def format_short_date(dt: DateLike) -> str:
     """Короткий формат даты (12.05.2023)"""
-    return dt.strftime("%d.%m.%Y")
+    return formatting.format_short_date(dt)
 
 
 def format_time_slot(start_time: str, end_time: str) -> str:
@@ -45,7 +56,7 @@ def parse_appointment_date(date_str: str) -> Optional[date]:
     Возвращает date или None при ошибке
     """
     try:
-        return datetime.strptime(date_str, "%d.%m.%Y").date()
+        return formatting.parse_short_date(date_str)
     except ValueError:
         return None
 
@@ -66,18 +77,10 @@ def generate_time_slots(
     Returns:
         Список кортежей (начало, конец) в формате "HH:MM"
     """
-    slots = []
-    current_time = datetime.strptime(f"{work_start}:00", "%H:%M")
-    end_time = datetime.strptime(f"{work_end}:00", "%H:%M")
-
-    while current_time + timedelta(minutes=duration) <= end_time:
-        slot_end = current_time + timedelta(minutes=duration)
-        slots.append(
-            (current_time.strftime("%H:%M"), slot_end.strftime("%H:%M"))
-        )
-        current_time = slot_end
-
-    return slots
+    return [
+        (formatting.format_time(start), formatting.format_time(start + duration))
+        for start in range(work_start * 60, work_end * 60 - duration + 1, duration)
+    ]
 
 
 def get_week_dates(start_date: date = None) -> List[date]:
@@ -88,6 +91,14 @@ def get_week_dates(start_date: date = None) -> List[date]:
     return [start + timedelta(days=i) for i in range(7)]
 
 
+def get_next_dates(days: int = 7, start_date: date = None) -> List[date]:
+    """
+    Получить следующие days дней после указанной даты (по умолчанию после текущей)
+    """
+    start = start_date or get_current_date()
+    return [start + timedelta(days=i) for i in range(1, days + 1)]
+
+
 def is_work_day(check_date: date) -> bool:
     """
     Проверить, является ли дата рабочим днем
@@ -168,7 +179,7 @@ def get_human_readable_schedule(schedule: dict) -> str:
     """
     result = []
     for day, slots in schedule.items():
-        day_name = day.strftime("%A").capitalize()
+        day_name = formatting.format_weekday(day)
         slots_str = ", ".join(slots)
         result.append(f"{day_name}: {slots_str}")
 
@@ -186,6 +197,4 @@ def calculate_end_time(start_time: str, duration: int) -> str:
     Returns:
         Время окончания "HH:MM"
     """
-    start = datetime.strptime(start_time, "%H:%M")
-    end = start + timedelta(minutes=duration)
-    return end.strftime("%H:%M")
\ No newline at end of file
+    return formatting.format_time((formatting.parse_time(start_time) + duration) % (24 * 60))
\ No newline at end of file
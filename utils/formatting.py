@@ -0,0 +1,155 @@
+"""
+Русские названия дат без системной локали.
+
+Названия месяцев и дней недели берутся из статических таблиц, а не из
+strftime('%B') под locale.setlocale(): смена локали действует на весь процесс,
+не потокобезопасна и падает на хостах без ru_RU.UTF-8. Даты 'YYYY-MM-DD'
+и 'DD.MM.YYYY' разбираются срезами и int() вместо strptime.
+
+Все строки для показа одной даты собираются один раз и кэшируются
+(date_strings), поэтому повторные уведомления и клавиатуры на ту же дату
+не форматируют её заново.
+
+    format_appointment_date("2024-05-17")  # "17 мая, пятница"
+    format_long_date("2024-05-17")         # "17 мая 2024"
+    format_day_button("2024-05-17")        # "Пт, 17.05"
+"""
+from datetime import date, datetime
+from functools import lru_cache
+from typing import NamedTuple, Tuple, Union
+
+DateLike = Union[str, date, datetime]
+
+MONTHS: Tuple[str, ...] = (
+    "январь", "февраль", "март", "апрель", "май", "июнь",
+    "июль", "август", "сентябрь", "октябрь", "ноябрь", "декабрь",
+)
+# Родительный падеж: "17 мая"
+MONTHS_GENITIVE: Tuple[str, ...] = (
+    "января", "февраля", "марта", "апреля", "мая", "июня",
+    "июля", "августа", "сентября", "октября", "ноября", "декабря",
+)
+WEEKDAYS: Tuple[str, ...] = (
+    "понедельник", "вторник", "среда", "четверг", "пятница", "суббота", "воскресенье",
+)
+WEEKDAYS_SHORT: Tuple[str, ...] = ("Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс")
+
+HOURS: Tuple[str, str, str] = ("час", "часа", "часов")
+
+DATE_STRINGS_CACHE_SIZE = 1024  # дат с готовыми строками (около трёх лет)
+
+
+# ====================== РАЗБОР ======================
+
+def parse_iso_date(value: str) -> date:
+    """'YYYY-MM-DD' -> date (ValueError при неверном формате)"""
+    if len(value) != 10 or value[4] != '-' or value[7] != '-':
+        raise ValueError(f"Invalid date: {value!r}")
+    return date(int(value[:4]), int(value[5:7]), int(value[8:]))
+
+
+def parse_short_date(value: str) -> date:
+    """'DD.MM.YYYY' -> date (ValueError при неверном формате)"""
+    if len(value) != 10 or value[2] != '.' or value[5] != '.':
+        raise ValueError(f"Invalid date: {value!r}")
+    return date(int(value[6:]), int(value[3:5]), int(value[:2]))
+
+
+def parse_time(value: str) -> int:
+    """'HH:MM' -> минута от начала дня"""
+    hours, minutes = value.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def format_time(minutes: int) -> str:
+    """Минута от начала дня -> 'HH:MM'"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def to_date(value: DateLike) -> date:
+    """Привести 'YYYY-MM-DD', date или datetime к date"""
+    if isinstance(value, str):
+        return parse_iso_date(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+# ====================== СТРОКИ ДЛЯ ПОКАЗА ======================
+
+class DateStrings(NamedTuple):
+    """Готовые варианты показа одной даты"""
+    appointment: str  # "17 мая, пятница"
+    long: str         # "17 мая 2024"
+    short: str        # "17.05.2024"
+    button: str       # "Пт, 17.05"
+    weekday: str      # "Пятница"
+
+
+@lru_cache(maxsize=DATE_STRINGS_CACHE_SIZE)
+def _date_strings(day: date) -> DateStrings:
+    month = MONTHS_GENITIVE[day.month - 1]
+    weekday = day.weekday()
+    return DateStrings(
+        appointment=f"{day.day} {month}, {WEEKDAYS[weekday]}",
+        long=f"{day.day} {month} {day.year}",
+        short=f"{day.day:02d}.{day.month:02d}.{day.year}",
+        button=f"{WEEKDAYS_SHORT[weekday]}, {day.day:02d}.{day.month:02d}",
+        weekday=WEEKDAYS[weekday].capitalize(),
+    )
+
+
+@lru_cache(maxsize=DATE_STRINGS_CACHE_SIZE)
+def _iso_date_strings(value: str) -> DateStrings:
+    # Даты из БД приходят строками - кэшируем и сам разбор
+    return _date_strings(parse_iso_date(value))
+
+
+def date_strings(value: DateLike) -> DateStrings:
+    """Все строки для показа даты (из кэша)"""
+    if isinstance(value, str):
+        return _iso_date_strings(value)
+    return _date_strings(to_date(value))
+
+
+def format_appointment_date(value: DateLike) -> str:
+    """Дата записи, например «17 мая, пятница»"""
+    return date_strings(value).appointment
+
+
+def format_long_date(value: DateLike) -> str:
+    """Полная дата, например «17 мая 2024»"""
+    return date_strings(value).long
+
+
+def format_short_date(value: DateLike) -> str:
+    """Дата цифрами, например «17.05.2024»"""
+    return date_strings(value).short
+
+
+def format_day_button(value: DateLike) -> str:
+    """Подпись кнопки выбора дня, например «Пт, 17.05»"""
+    return date_strings(value).button
+
+
+def format_weekday(value: DateLike) -> str:
+    """День недели с заглавной буквы, например «Пятница»"""
+    return date_strings(value).weekday
+
+
+def format_month_title(year: int, month: int) -> str:
+    """Заголовок календаря, например «Май 2024»"""
+    return f"{MONTHS[month - 1].capitalize()} {year}"
+
+
+def plural(count: int, forms: Tuple[str, str, str]) -> str:
+    """Форма слова для числа: plural(2, HOURS) -> "часа", plural(5, HOURS) -> "часов" """
+    count = abs(count) % 100
+    if 11 <= count <= 14:
+        return forms[2]
+    count %= 10
+    if count == 1:
+        return forms[0]
+    if 2 <= count <= 4:
+        return forms[1]
+    return forms[2]
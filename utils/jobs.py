@@ -0,0 +1,136 @@
+"""Фоновые задачи бота: запускаются в on_startup, останавливаются в on_shutdown"""
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional
+from aiogram import Bot
+from config import config
+from database.async_queries import (
+    get_async_session,
+    materialize_schedule,
+    archive_old_rows,
+    get_daily_agenda
+)
+from utils.date_utils import get_shop_datetime
+from utils.notifications import send_daily_schedule_to_barbers
+from utils.reminders import ReminderScheduler
+from utils.sender import send_queue
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+_tasks: List[asyncio.Task] = []
+
+# Планировщик напоминаний (создаётся в start_background_jobs)
+reminder_scheduler: Optional[ReminderScheduler] = None
+
+
+async def _run_periodically(
+        name: str,
+        job: Callable[[], Awaitable],
+        interval: int
+):
+    """Запускать job каждые interval секунд (ошибки логируются, цикл продолжается)"""
+    while True:
+        try:
+            await job()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in background job {name}: {e}")
+        await asyncio.sleep(interval)
+
+
+def _seconds_until(at: str, now: datetime = None) -> float:
+    """Секунд до ближайшего наступления времени at ('HH:MM') по времени барбершопа"""
+    now = now or get_shop_datetime()
+    hour, minute = map(int, at.split(':'))
+    moment = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if moment <= now:
+        moment += timedelta(days=1)
+    return (moment - now).total_seconds()
+
+
+async def _run_daily(
+        name: str,
+        job: Callable[[], Awaitable],
+        at: str
+):
+    """Запускать job каждый день в at ('HH:MM')"""
+    while True:
+        await asyncio.sleep(_seconds_until(at))
+        try:
+            await job()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in background job {name}: {e}")
+
+
+async def materialize_schedule_horizon() -> int:
+    """Достроить расписание по шаблонам на SCHEDULE_HORIZON_DAYS дней вперед"""
+    today = datetime.now().date()
+    async with get_async_session() as session:
+        created = await materialize_schedule(
+            session,
+            today,
+            today + timedelta(days=config.SCHEDULE_HORIZON_DAYS)
+        )
+
+    if created:
+        logger.info(f"Schedule materialized: {created} new slots")
+    return created
+
+
+async def archive_past_rows() -> dict:
+    """Перенести записи и слоты старше ARCHIVE_AFTER_DAYS в архивную БД"""
+    async with get_async_session() as session:
+        moved = await archive_old_rows(session)
+
+    if any(moved.values()):
+        logger.info(f"Archived rows: {moved}")
+    return moved
+
+
+async def send_morning_agenda(bot: Bot) -> dict:
+    """Разослать барберам их записи на сегодня"""
+    async with get_async_session() as session:
+        agenda = await get_daily_agenda(session, get_shop_datetime().strftime("%Y-%m-%d"))
+
+    results = await send_daily_schedule_to_barbers(bot, agenda)
+    if results:
+        logger.info(f"Morning agenda sent: {results}")
+    return results
+
+
+def start_background_jobs(bot: Bot):
+    """Запустить фоновые задачи"""
+    global reminder_scheduler
+    send_queue.start()
+    reminder_scheduler = ReminderScheduler(bot)
+    _tasks.append(asyncio.create_task(reminder_scheduler.run()))
+
+    _tasks.append(asyncio.create_task(_run_periodically(
+        "materialize_schedule",
+        materialize_schedule_horizon,
+        config.SCHEDULE_MATERIALIZE_INTERVAL
+    )))
+    _tasks.append(asyncio.create_task(_run_daily(
+        "send_morning_agenda",
+        lambda: send_morning_agenda(bot),
+        config.AGENDA_SEND_TIME
+    )))
+    if config.ARCHIVE_DB_PATH:
+        _tasks.append(asyncio.create_task(_run_periodically(
+            "archive_past_rows",
+            archive_past_rows,
+            config.ARCHIVE_INTERVAL
+        )))
+
+
+async def stop_background_jobs():
+    """Остановить фоновые задачи"""
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+    await send_queue.stop()
@@ -1,14 +1,65 @@
 from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError
 from aiogram.types import Message, ParseMode, InlineKeyboardMarkup, InlineKeyboardButton
-from datetime import datetime
-from typing import List, Dict, Optional
+from itertools import groupby
+from typing import Iterable, List, Dict, Optional, Tuple
 from config import config
+from database.async_queries import get_async_session, get_blocked_chats, block_chat
 from database.models import Appointment, Barber
+from database.queries import AgendaRow
+from utils.formatting import HOURS, format_long_date, plural
+from utils.sender import Priority, send_message
+import asyncio
 import logging
-import pytz
 
 logger = logging.getLogger(__name__)
 
+# Результат доставки одному получателю рассылки
+DELIVERED = "delivered"
+FAILED = "failed"
+BLOCKED = "blocked"  # бот заблокирован: сейчас или в одной из прошлых рассылок
+
+
+async def broadcast(
+        bot: Bot,
+        messages: Dict[int, str],
+        priority: Priority = Priority.NORMAL,
+        **kwargs
+) -> Dict[int, str]:
+    """
+    Разослать сообщения {chat_id: текст} параллельно и вернуть статус по каждому чату.
+
+    Одновременно отправляется не больше BROADCAST_CONCURRENCY сообщений, так что
+    рассылка занимает время одного запроса, а не сумму запросов по всем получателям.
+    Чаты, заблокировавшие бота, запоминаются в blocked_chats и дальше пропускаются.
+    """
+    if not messages:
+        return {}
+
+    async with get_async_session() as session:
+        blocked = await get_blocked_chats(session, messages)
+
+    results = {chat_id: BLOCKED for chat_id in blocked}
+    pending = {chat_id: text for chat_id, text in messages.items() if chat_id not in blocked}
+    semaphore = asyncio.Semaphore(config.BROADCAST_CONCURRENCY)
+
+    async def deliver(chat_id: int, text: str) -> str:
+        async with semaphore:
+            try:
+                await send_message(bot, chat_id, text, priority=priority, **kwargs)
+                return DELIVERED
+            except TelegramForbiddenError as e:
+                async with get_async_session() as session:
+                    await block_chat(session, chat_id, str(e))
+                return BLOCKED
+            except Exception as e:
+                logger.error(f"Error sending message to {chat_id}: {e}")
+                return FAILED
+
+    statuses = await asyncio.gather(*(deliver(chat_id, text) for chat_id, text in pending.items()))
+    results.update(zip(pending, statuses))
+    return results
+
 
 async def send_welcome_message(bot: Bot, chat_id: int):
     """Отправка приветственного сообщения новому пользователю"""
@@ -23,9 +74,11 @@ async def send_welcome_message(bot: Bot, chat_id: int):
             "🔔 Напоминания о записи\n\n"
             "Нажмите /start чтобы начать."
         )
-        await bot.send_message(
-            chat_id=chat_id,
-            text=text,
+        await send_message(
+            bot,
+            chat_id,
+            text,
+            priority=Priority.HIGH,
             parse_mode=ParseMode.MARKDOWN
         )
     except Exception as e:
@@ -40,19 +93,20 @@ async def send_appointment_confirmation(
 ):
     """Отправка подтверждения записи"""
     try:
-        appointment_date = datetime.strptime(appointment.date, "%Y-%m-%d")
         text = (
             "✅ *Запись подтверждена*\n\n"
-            f"📅 *Дата:* {appointment_date.strftime('%d %B %Y')}\n"
+            f"📅 *Дата:* {format_long_date(appointment.date)}\n"
             f"⏰ *Время:* {appointment.time_slot}\n"
             f"🧔 *Барбер:* {barber.name}\n"
             f"✂️ *Услуга:* {appointment.service.name}\n"
             f"💵 *Стоимость:* {appointment.service.price} руб.\n\n"
             "Вы можете отменить запись в разделе 'Мои записи'."
         )
-        await bot.send_message(
-            chat_id=chat_id,
-            text=text,
+        await send_message(
+            bot,
+            chat_id,
+            text,
+            priority=Priority.HIGH,
             parse_mode=ParseMode.MARKDOWN
         )
     except Exception as e:
@@ -64,56 +118,50 @@ async def send_reminder(
         chat_id: int,
         appointment: Appointment,
         hours_before: int = 24
-):
-    """Отправка напоминания о записи"""
+) -> bool:
+    """Отправка напоминания о записи (True - сообщение ушло)"""
     try:
-        appointment_date = datetime.strptime(appointment.date, "%Y-%m-%d")
-        time_part = appointment.time_slot.split('-')[0]
-        appointment_datetime = datetime.strptime(
-            f"{appointment.date} {time_part}",
-            "%Y-%m-%d %H:%M"
-        ).replace(tzinfo=pytz.timezone(config.TIMEZONE))
-
         text = (
             "🔔 *Напоминание о записи*\n\n"
-            f"У вас запись *через {hours_before} час(а/ов)*:\n"
-            f"📅 *Дата:* {appointment_date.strftime('%d %B %Y')}\n"
+            f"У вас запись *через {hours_before} {plural(hours_before, HOURS)}*:\n"
+            f"📅 *Дата:* {format_long_date(appointment.date)}\n"
             f"⏰ *Время:* {appointment.time_slot}\n"
             f"🧔 *Барбер:* {appointment.barber.name}\n"
             f"✂️ *Услуга:* {appointment.service.name}\n\n"
             "Пожалуйста, не опаздывайте!"
         )
-        await bot.send_message(
-            chat_id=chat_id,
-            text=text,
+        await send_message(
+            bot,
+            chat_id,
+            text,
+            priority=Priority.NORMAL,
             parse_mode=ParseMode.MARKDOWN
         )
+        return True
     except Exception as e:
         logger.error(f"Error sending reminder: {e}")
+        return False
 
 
 async def notify_admins(
         bot: Bot,
         message: str,
         exclude_ids: List[int] = None
-):
-    """Отправка уведомления всем администраторам"""
+) -> Dict[int, str]:
+    """Отправка уведомления всем администраторам (статус доставки по каждому)"""
     try:
         if not exclude_ids:
             exclude_ids = []
 
-        for admin_id in config.ADMIN_IDS:
-            if admin_id not in exclude_ids:
-                try:
-                    await bot.send_message(
-                        chat_id=admin_id,
-                        text=f"👨‍💻 *Админ-уведомление:*\n\n{message}",
-                        parse_mode=ParseMode.MARKDOWN
-                    )
-                except Exception as e:
-                    logger.error(f"Error notifying admin {admin_id}: {e}")
+        text = f"👨‍💻 *Админ-уведомление:*\n\n{message}"
+        return await broadcast(
+            bot,
+            {admin_id: text for admin_id in config.ADMIN_IDS if admin_id not in exclude_ids},
+            parse_mode=ParseMode.MARKDOWN
+        )
     except Exception as e:
         logger.error(f"Error in notify_admins: {e}")
+        return {}
 
 
 async def notify_appointment_cancellation(
@@ -127,52 +175,70 @@ async def notify_appointment_cancellation(
     try:
         text = (
             "❌ *Запись отменена*\n\n"
-            f"📅 Дата: {appointment.date}\n"
+            f"📅 Дата: {format_long_date(appointment.date)}\n"
             f"⏰ Время: {appointment.time_slot}\n"
             f"🧔 Барбер: {barber.name}\n"
         )
         if reason:
             text += f"\nПричина: {reason}"
 
-        await bot.send_message(
-            chat_id=client_id,
-            text=text,
+        await send_message(
+            bot,
+            client_id,
+            text,
+            priority=Priority.HIGH,
             parse_mode=ParseMode.MARKDOWN
         )
     except Exception as e:
         logger.error(f"Error sending cancellation notification: {e}")
 
 
+# Шаблон утреннего расписания: f-строка компилируется один раз вместе с модулем
+_AGENDA_HEADER = "📅 *Ваше расписание на сегодня*\n\n"
+_AGENDA_FOOTER = "\n\nУдачного рабочего дня!"
+
+
+def _agenda_line(row: AgendaRow) -> str:
+    return f"⏰ {row.time_slot} - {row.service_name} (ID {row.user_id})"
+
+
+def _agenda_message(sections: List[Tuple[str, str]]) -> str:
+    """Сообщение в чат: записи одного барбера или, если чат общий, по разделу на барбера"""
+    if len(sections) == 1:
+        body = sections[0][1]
+    else:
+        body = "\n\n".join(f"🧔 *{name}*\n{lines}" for name, lines in sections)
+    return _AGENDA_HEADER + body + _AGENDA_FOOTER
+
+
 async def send_daily_schedule_to_barbers(
         bot: Bot,
-        schedule: Dict[int, List[Appointment]]
-):
-    """Отправка расписания барберам на день"""
+        agenda: Iterable[AgendaRow]
+) -> Dict[int, str]:
+    """
+    Отправка расписания барберам на день (статус доставки по каждому чату).
+
+    agenda - строки get_daily_agenda(), упорядоченные по барберу: сообщения
+    собираются за один проход без дополнительных запросов. Барберы с общим
+    чатом получают одно сообщение с разделом на каждого.
+    """
     try:
-        for barber_id, appointments in schedule.items():
-            if not appointments:
-                continue
-
-            barber_appointments = []
-            for app in appointments:
-                barber_appointments.append(
-                    f"⏰ {app.time_slot} - {app.service.name} "
-                    f"({app.client_name or f'ID {app.user_id}'})"
-                )
-
-            text = (
-                    "📅 *Ваше расписание на сегодня*\n\n" +
-                    "\n".join(barber_appointments) +
-                    "\n\nУдачного рабочего дня!"
-            )
-
-            await bot.send_message(
-                chat_id=barber_id,
-                text=text,
-                parse_mode=ParseMode.MARKDOWN
-            )
+        sections: Dict[int, List[Tuple[str, str]]] = {}
+        for (_, telegram_id, name), rows in groupby(
+                agenda, key=lambda row: (row.barber_id, row.telegram_id, row.barber_name)
+        ):
+            sections.setdefault(telegram_id, []).append((name, "\n".join(map(_agenda_line, rows))))
+
+        messages = {telegram_id: _agenda_message(parts) for telegram_id, parts in sections.items()}
+        return await broadcast(
+            bot,
+            messages,
+            priority=Priority.BULK,
+            parse_mode=ParseMode.MARKDOWN
+        )
     except Exception as e:
         logger.error(f"Error sending daily schedule: {e}")
+        return {}
 
 
 async def send_feedback_request(
@@ -198,9 +264,11 @@ async def send_feedback_request(
             InlineKeyboardButton("⭐ 5", callback_data="rate_5")
         )
 
-        await bot.send_message(
-            chat_id=chat_id,
-            text=text,
+        await send_message(
+            bot,
+            chat_id,
+            text,
+            priority=Priority.BULK,
             reply_markup=keyboard,
             parse_mode=ParseMode.MARKDOWN
         )
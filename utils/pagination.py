@@ -0,0 +1,55 @@
+"""
+Курсоры постраничного вывода записей и их упаковка в callback_data.
+
+Курсор - ключ последней/первой показанной строки (date, start_min, id),
+страница выбирается условием по ключу, а не OFFSET, поэтому её стоимость
+не зависит от того, сколько записей было до неё.
+
+callback_data кнопок: "apg:<список>:<n|p>:<курсор>", например
+"apg:d20241015:n:20241015.630.1234" - не длиннее 64 байт, которые
+допускает Telegram.
+"""
+from typing import NamedTuple, Optional, Tuple
+
+Cursor = Tuple[str, int, int]
+
+PAGE_CALLBACK_PREFIX = "apg"
+CALLBACK_DATA_LIMIT = 64  # байт, ограничение Telegram
+
+
+class PageRequest(NamedTuple):
+    """Разобранная callback_data кнопки листания"""
+    listing: str
+    backward: bool
+    cursor: Cursor
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    """(date 'YYYY-MM-DD', start_min, id) -> 'YYYYMMDD.start.id'"""
+    day, start_min, appointment_id = cursor
+    return f"{day.replace('-', '')}.{start_min}.{appointment_id}"
+
+
+def decode_cursor(token: str) -> Cursor:
+    """Обратное преобразование encode_cursor"""
+    day, start_min, appointment_id = token.split('.')
+    return f"{day[:4]}-{day[4:6]}-{day[6:]}", int(start_min), int(appointment_id)
+
+
+def page_callback(listing: str, backward: bool, cursor: Cursor) -> str:
+    """callback_data кнопки листания списка listing"""
+    data = f"{PAGE_CALLBACK_PREFIX}:{listing}:{'p' if backward else 'n'}:{encode_cursor(cursor)}"
+    if len(data.encode()) > CALLBACK_DATA_LIMIT:
+        raise ValueError(f"Callback data too long: {data}")
+    return data
+
+
+def parse_page_callback(data: str) -> Optional[PageRequest]:
+    """Разобрать callback_data кнопки листания (None - чужая или битая кнопка)"""
+    try:
+        prefix, listing, direction, token = data.split(':')
+        if prefix != PAGE_CALLBACK_PREFIX or direction not in ('n', 'p'):
+            return None
+        return PageRequest(listing, direction == 'p', decode_cursor(token))
+    except ValueError:
+        return None
@@ -0,0 +1,186 @@
+"""
+Планировщик напоминаний о записях.
+
+Предстоящие записи лежат в min-куче по времени отправки напоминания
+(начало записи минус REMINDER_HOURS_BEFORE). Задача спит ровно до
+ближайшего срока - без опроса БД; новая запись или отмена будит её через
+asyncio.Event, только если меняется ближайший срок. Добавление - O(log n),
+отмена - O(1): запись удаляется из словаря, а устаревший элемент кучи
+пропускается при извлечении.
+
+Перед отправкой в БД ставится reminder_sent_at (условный UPDATE), поэтому
+после перезапуска уже отправленные напоминания не загружаются и не уходят
+повторно. Недоставленное напоминание возвращается в кучу с растущей
+задержкой (REMINDER_RETRY_DELAY, 2x, ...), пока запись не началась.
+
+Время записи - местное время барбершопа (config.TIMEZONE), а не сервера.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from aiogram import Bot
+from config import config
+from database import events
+from database.async_queries import (
+    get_async_session,
+    get_appointment_by_id,
+    get_pending_reminders,
+    mark_reminder_sent
+)
+from utils.date_utils import SHOP_TZ
+from utils.formatting import parse_iso_date
+from utils.notifications import send_reminder
+import asyncio
+import heapq
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def appointment_start(date: str, start_min: int) -> float:
+    """Начало записи (timestamp): date и start_min - местное время барбершопа"""
+    midnight = datetime.combine(parse_iso_date(date), datetime.min.time(), tzinfo=SHOP_TZ)
+    return (midnight + timedelta(minutes=start_min)).timestamp()
+
+
+def reminder_time(date: str, start_min: int) -> float:
+    """Время отправки напоминания (timestamp) для записи на date в start_min"""
+    return appointment_start(date, start_min) - config.REMINDER_HOURS_BEFORE * 3600
+
+
+class ReminderScheduler:
+    """Куча напоминаний и задача, отправляющая их в срок"""
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self._heap: List[Tuple[float, int]] = []
+        # appointment_id -> актуальное время отправки (всё прочее в куче - устаревшее)
+        self._pending: Dict[int, float] = {}
+        self._wakeup = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # appointment_id -> число неудачных попыток отправки подряд
+        self._failures: Dict[int, int] = {}
+        self.sent = 0
+        self.retried = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def schedule(self, appointment_id: int, fire_at: float):
+        """Запланировать (или перенести) напоминание"""
+        self._pending[appointment_id] = fire_at
+        heapq.heappush(self._heap, (fire_at, appointment_id))
+        # Будим задачу, только если новое напоминание стало ближайшим
+        if self._heap[0] == (fire_at, appointment_id):
+            self._wakeup.set()
+
+    def cancel(self, appointment_id: int):
+        """Снять напоминание (элемент кучи станет устаревшим)"""
+        self._pending.pop(appointment_id, None)
+        self._failures.pop(appointment_id, None)
+
+    def next_deadline(self) -> Optional[float]:
+        """Ближайший актуальный срок (устаревшие элементы вершины удаляются)"""
+        while self._heap:
+            fire_at, appointment_id = self._heap[0]
+            if self._pending.get(appointment_id) == fire_at:
+                return fire_at
+            heapq.heappop(self._heap)
+        return None
+
+    def pop_due(self, now: float) -> List[int]:
+        """Извлечь все напоминания со сроком не позже now"""
+        due = []
+        while True:
+            fire_at = self.next_deadline()
+            if fire_at is None or fire_at > now:
+                return due
+            _, appointment_id = heapq.heappop(self._heap)
+            del self._pending[appointment_id]
+            due.append(appointment_id)
+
+    # ---------- подписки на события БД ----------
+
+    def _threadsafe(self, callback, *args):
+        # Запросы могут выполняться и вне цикла событий бота
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(callback, *args)
+
+    def on_appointment_created(self, appointment):
+        fire_at = reminder_time(appointment.date, appointment.start_min)
+        self._threadsafe(self.schedule, appointment.id, fire_at)
+
+    def on_appointment_canceled(self, appointment):
+        self._threadsafe(self.cancel, appointment.id)
+
+    # ---------- основной цикл ----------
+
+    async def load(self) -> int:
+        """Загрузить из БД все неотправленные напоминания по предстоящим записям"""
+        async with get_async_session() as session:
+            rows = await get_pending_reminders(session)
+
+        now = time.time()
+        for appointment_id, date, start_min in rows:
+            if appointment_start(date, start_min) > now:  # по прошедшим записям не напоминаем
+                self.schedule(appointment_id, reminder_time(date, start_min))
+        return len(self)
+
+    async def run(self):
+        """Спать до ближайшего срока, отправить созревшие напоминания, повторить"""
+        self._loop = asyncio.get_running_loop()
+        events.subscribe(events.APPOINTMENT_CREATED, self.on_appointment_created)
+        events.subscribe(events.APPOINTMENT_CANCELED, self.on_appointment_canceled)
+        try:
+            logger.info(f"Reminders loaded: {await self.load()}")
+            while True:
+                self._wakeup.clear()
+                deadline = self.next_deadline()
+                timeout = None if deadline is None else max(0.0, deadline - time.time())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    continue  # ближайший срок изменился - пересчитываем
+                except asyncio.TimeoutError:
+                    pass
+
+                for appointment_id in self.pop_due(time.time()):
+                    try:
+                        await self._send(appointment_id)
+                    except Exception as e:
+                        logger.error(f"Error sending reminder {appointment_id}: {e}")
+        finally:
+            events.unsubscribe(events.APPOINTMENT_CREATED, self.on_appointment_created)
+            events.unsubscribe(events.APPOINTMENT_CANCELED, self.on_appointment_canceled)
+            self._loop = None
+
+    async def _send(self, appointment_id: int):
+        async with get_async_session() as session:
+            # Забираем напоминание до отправки - второй раз оно не уйдёт
+            if not await mark_reminder_sent(session, appointment_id):
+                return
+            appointment = await get_appointment_by_id(session, appointment_id)
+            if appointment is None:
+                # Запись удалили или перенесли в архив после отметки - напоминать не о чем
+                self._failures.pop(appointment_id, None)
+                logger.info(f"Reminder {appointment_id} skipped: appointment not found")
+                return
+
+            start = appointment_start(appointment.date, appointment.start_min)
+            hours_left = max(1, round((start - time.time()) / 3600))
+            if await send_reminder(self.bot, appointment.user_id, appointment, hours_left):
+                self._failures.pop(appointment_id, None)
+                self.sent += 1
+                return
+
+            # Не доставлено - снимаем отметку и пробуем ещё раз, пока запись не началась
+            await mark_reminder_sent(session, appointment_id, sent=False)
+
+        failures = self._failures.get(appointment_id, 0) + 1
+        retry_at = time.time() + config.REMINDER_RETRY_DELAY * 2 ** (failures - 1)
+        if retry_at < start:
+            self._failures[appointment_id] = failures
+            self.retried += 1
+            self.schedule(appointment_id, retry_at)
+        else:
+            self._failures.pop(appointment_id, None)
+            logger.warning(f"Reminder {appointment_id} dropped after {failures} failed attempts")
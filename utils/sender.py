@@ -0,0 +1,292 @@
+"""
+Очередь исходящих сообщений бота.
+
+Все отправки идут через одну очередь с приоритетами (HIGH - подтверждения
+и отмены, NORMAL - напоминания и уведомления, BULK - рассылки) и двумя
+уровнями ограничения скорости: общий token bucket на бота и по одному на
+чат. Сообщение в «перегретый» чат откладывается, не задерживая остальные.
+
+Ответ 429 (TelegramRetryAfter) приостанавливает всю очередь на retry_after
+секунд и возвращает сообщение в очередь; сетевые ошибки и 5xx повторяются
+с экспоненциальной задержкой до SEND_MAX_RETRIES раз. Прочие ошибки
+(бот заблокирован, неверный запрос) возвращаются отправителю сразу.
+
+    message = await send_message(bot, chat_id, text, priority=Priority.HIGH)
+"""
+from collections import deque
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from aiogram import Bot
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+from config import config
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+LATENCY_WINDOW = 1000  # последних отправок для метрик задержки
+CHAT_BUCKETS_MAX = 10000  # при превышении забываются простаивающие чаты
+
+
+class Priority(IntEnum):
+    """Полоса очереди: меньшее значение отправляется раньше"""
+    HIGH = 0
+    NORMAL = 1
+    BULK = 2
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity про запас"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Через сколько секунд будет доступен токен (0 - уже есть)"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class _Outgoing:
+    """Сообщение в очереди"""
+
+    __slots__ = ("call", "chat_id", "priority", "seq", "future", "enqueued", "attempts")
+
+    def __init__(self, call: Callable[[], Awaitable], chat_id: int, priority: Priority, seq: int):
+        self.call = call
+        self.chat_id = chat_id
+        self.priority = priority
+        self.seq = seq  # порядок постановки: при равном приоритете раньше уходит раньше поставленное
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueued = time.monotonic()
+        self.attempts = 0
+
+
+class SendQueue:
+    """Очередь с приоритетами, общим и початовыми лимитами и повторами"""
+
+    def __init__(
+            self,
+            rate: float = config.SEND_RATE,
+            burst: int = config.SEND_BURST,
+            chat_rate: float = config.SEND_CHAT_RATE,
+            chat_burst: int = config.SEND_CHAT_BURST,
+            concurrency: int = config.SEND_CONCURRENCY
+    ):
+        self._bucket = TokenBucket(rate, burst)
+        self._chat_rate = chat_rate
+        self._chat_burst = chat_burst
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self._concurrency = asyncio.Semaphore(concurrency)
+
+        # Готовые к отправке: (приоритет, номер постановки, сообщение)
+        self._ready: List[Tuple[int, int, _Outgoing]] = []
+        # Отложенные (лимит чата, повтор): (не раньше, приоритет, номер постановки, сообщение)
+        self._delayed: List[Tuple[float, int, int, _Outgoing]] = []
+        self._seq = itertools.count()
+        self._paused_until = 0.0  # до этого момента действует retry_after
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight: set = set()
+
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.flood_waits = 0
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    # ---------- постановка в очередь ----------
+
+    def submit(
+            self,
+            call: Callable[[], Awaitable],
+            chat_id: int,
+            priority: Priority = Priority.NORMAL
+    ) -> asyncio.Future:
+        """Поставить вызов API в очередь; future получит его результат или исключение"""
+        self.start()
+        item = _Outgoing(call, chat_id, priority, next(self._seq))
+        self._push_ready(item)
+        return item.future
+
+    def _push_ready(self, item: _Outgoing):
+        heapq.heappush(self._ready, (item.priority, item.seq, item))
+        self._wakeup.set()
+
+    def _push_delayed(self, item: _Outgoing, not_before: float):
+        heapq.heappush(self._delayed, (not_before, item.priority, item.seq, item))
+        self._wakeup.set()
+
+    # ---------- запуск и остановка ----------
+
+    def start(self):
+        """Запустить диспетчер (повторный вызов ничего не делает)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._dispatch())
+
+    async def stop(self):
+        """Остановить диспетчер; недоставленные сообщения получают CancelledError"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+        for entry in self._ready + self._delayed:
+            entry[-1].future.cancel()
+        self._ready.clear()
+        self._delayed.clear()
+        logger.info(f"Send queue stopped: {self.stats()}")
+
+    # ---------- диспетчер ----------
+
+    def _chat_bucket(self, chat_id: int, now: float) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= CHAT_BUCKETS_MAX:
+                # Полное ведро ничем не отличается от нового - его можно забыть
+                for idle in [key for key, value in self._chat_buckets.items() if value.is_full(now)]:
+                    del self._chat_buckets[idle]
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self._chat_rate, self._chat_burst)
+        return bucket
+
+    def _next_delay(self, now: float) -> Optional[float]:
+        """Сколько ждать до следующего возможного действия (None - очередь пуста)"""
+        if self._ready:
+            return max(0.0, self._paused_until - now, self._bucket.delay(now))
+        if self._delayed:
+            return max(0.0, self._delayed[0][0] - now)
+        return None
+
+    async def _dispatch(self):
+        while True:
+            now = time.monotonic()
+            while self._delayed and self._delayed[0][0] <= now:
+                item = heapq.heappop(self._delayed)[-1]
+                heapq.heappush(self._ready, (item.priority, item.seq, item))
+
+            delay = self._next_delay(now)
+            if delay is None or delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            item = heapq.heappop(self._ready)[-1]
+            if item.future.done():  # отправитель перестал ждать
+                continue
+
+            chat_delay = self._chat_bucket(item.chat_id, now).delay(now)
+            if chat_delay > 0:
+                self._push_delayed(item, now + chat_delay)
+                continue
+
+            self._bucket.take(now)
+            self._chat_buckets[item.chat_id].take(now)
+            await self._concurrency.acquire()
+            task = asyncio.create_task(self._deliver(item))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _deliver(self, item: _Outgoing):
+        try:
+            item.attempts += 1
+            result = await item.call()
+        except TelegramRetryAfter as e:
+            # Флуд-лимит: пауза для всей очереди, сообщение уходит после неё
+            self.flood_waits += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+            logger.warning(f"Flood limit hit, pausing sends for {e.retry_after}s")
+            self._push_delayed(item, self._paused_until)
+        except (TelegramNetworkError, TelegramServerError) as e:
+            if item.attempts > config.SEND_MAX_RETRIES:
+                self._fail(item, e)
+            else:
+                self.retried += 1
+                backoff = config.SEND_RETRY_BACKOFF * 2 ** (item.attempts - 1)
+                self._push_delayed(item, time.monotonic() + backoff)
+        except Exception as e:
+            self._fail(item, e)
+        else:
+            self.sent += 1
+            self._latencies.append(time.monotonic() - item.enqueued)
+            if not item.future.done():
+                item.future.set_result(result)
+        finally:
+            self._concurrency.release()
+
+    def _fail(self, item: _Outgoing, error: Exception):
+        self.failed += 1
+        if not item.future.done():
+            item.future.set_exception(error)
+
+    # ---------- метрики ----------
+
+    def depth(self) -> Dict[str, int]:
+        """Число ожидающих сообщений по полосам (вместе с отложенными)"""
+        depth = {priority.name.lower(): 0 for priority in Priority}
+        for entry in itertools.chain(self._ready, self._delayed):
+            depth[entry[-1].priority.name.lower()] += 1
+        return depth
+
+    def stats(self) -> Dict[str, Any]:
+        """Глубина очереди, счётчики и задержка от постановки до доставки (мс)"""
+        latencies = sorted(self._latencies)
+        latency = {"avg": 0.0, "p95": 0.0, "max": 0.0}
+        if latencies:
+            latency = {
+                "avg": round(sum(latencies) / len(latencies) * 1000, 1),
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+                "max": round(latencies[-1] * 1000, 1),
+            }
+        return {
+            "depth": self.depth(),
+            "delayed": len(self._delayed),
+            "in_flight": len(self._in_flight),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "flood_waits": self.flood_waits,
+            "latency_ms": latency,
+        }
+
+
+send_queue = SendQueue()
+
+
+async def send_message(
+        bot: Bot,
+        chat_id: int,
+        text: str,
+        priority: Priority = Priority.NORMAL,
+        **kwargs
+):
+    """Отправить сообщение через очередь и дождаться результата (исключения пробрасываются)"""
+    return await send_queue.submit(
+        lambda: bot.send_message(chat_id=chat_id, text=text, **kwargs),
+        chat_id,
+        priority
+    )
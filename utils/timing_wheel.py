@@ -0,0 +1,63 @@
+"""
+Колесо таймеров (hashed timing wheel) для массового истечения сроков.
+
+Время разбито на тики длиной tick секунд, тик попадает в ячейку
+номер тика % slots. Постановка и отмена таймера - O(1) (словарь ячейки
+плюс индекс ключ -> ячейка), продвижение колеса просматривает только
+наступившие ячейки, а не все таймеры. Срок дальше одного оборота колеса
+допустим: такой таймер просто переживает лишние обороты в своей ячейке.
+"""
+from typing import Dict, Hashable, List, Optional
+import time
+
+
+class TimingWheel:
+    """Таймеры «ключ -> срок» с продвижением по тикам"""
+
+    def __init__(self, tick: float, slots: int, now: Optional[float] = None):
+        self.tick = tick
+        self._slots: List[Dict[Hashable, float]] = [{} for _ in range(slots)]
+        self._where: Dict[Hashable, int] = {}
+        # Последний обработанный тик (номер от начала эпохи)
+        self._cursor = int((time.time() if now is None else now) // tick) - 1
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._where
+
+    def schedule(self, key: Hashable, deadline: float):
+        """Поставить (или перенести) таймер key на момент deadline"""
+        self.cancel(key)
+        # Срок в уже пройденном тике сработает при ближайшем продвижении
+        tick = max(int(deadline // self.tick), self._cursor + 1)
+        slot = tick % len(self._slots)
+        self._slots[slot][key] = deadline
+        self._where[key] = slot
+
+    def cancel(self, key: Hashable):
+        """Снять таймер (если он есть)"""
+        slot = self._where.pop(key, None)
+        if slot is not None:
+            del self._slots[slot][key]
+
+    def advance(self, now: Optional[float] = None) -> List[Hashable]:
+        """Продвинуть колесо до now и вернуть ключи с истёкшим сроком"""
+        now = time.time() if now is None else now
+        # Обрабатываем только целиком прошедшие тики: срок срабатывает с опозданием до tick
+        target = int(now // self.tick) - 1
+        expired = []
+
+        # После долгой паузы достаточно одного полного оборота
+        first = max(self._cursor + 1, target - len(self._slots) + 1)
+        for tick in range(first, target + 1):
+            slot = self._slots[tick % len(self._slots)]
+            due = [key for key, deadline in slot.items() if deadline <= now]
+            for key in due:
+                del slot[key]
+                del self._where[key]
+            expired.extend(due)
+
+        self._cursor = max(self._cursor, target)
+        return expired